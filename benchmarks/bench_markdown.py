@@ -0,0 +1,138 @@
+"""
+Throughput benchmarks for the markdown parser.
+
+Run ``python -m benchmarks.bench_markdown`` to time every case and print lines parsed per second. Save the results
+with ``--output`` and compare a later run against them with ``--baseline``; the run fails when any case got slower
+than ``--max-regression`` allows. Results are only comparable between runs on the same machine, so CI benchmarks the
+base commit and the head commit one after the other on the same runner.
+"""
+
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import click
+
+from benchmarks import corpora
+from nogisync.markdown import parse_md, process_inline_formatting
+
+RESULTS_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_MAX_REGRESSION = 0.15
+
+
+@dataclass
+class BenchmarkCase:
+    """One function timed against one corpus"""
+
+    name: str
+    function: Callable[[str], object]
+    text: str
+
+    @property
+    def lines(self) -> int:
+        return self.text.count("\n") + 1
+
+
+def parse_lines(text: str) -> None:
+    """Formats every line of ``text`` on its own, the way the block parser calls the inline parser"""
+    for line in text.split("\n"):
+        process_inline_formatting(line)
+
+
+def get_cases() -> list[BenchmarkCase]:
+    return [
+        BenchmarkCase("parse_md/long_document", parse_md, corpora.generate_long_document()),
+        BenchmarkCase("parse_md/nested_lists", parse_md, corpora.generate_nested_lists()),
+        BenchmarkCase("parse_md/wide_table", parse_md, corpora.generate_wide_table()),
+        BenchmarkCase("parse_md/code_and_equations", parse_md, corpora.generate_code_and_equations()),
+        BenchmarkCase("parse_md/adversarial_emphasis", parse_md, corpora.generate_adversarial_emphasis()),
+        BenchmarkCase("process_inline_formatting/inline_heavy", parse_lines, corpora.generate_inline_heavy()),
+        BenchmarkCase(
+            "process_inline_formatting/adversarial_emphasis", parse_lines, corpora.generate_adversarial_emphasis()
+        ),
+    ]
+
+
+def run_case(case: BenchmarkCase, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Times a case and returns its throughput.
+
+    The fastest of ``repeat`` runs is kept, since slower runs only measure noise from the rest of the machine.
+    """
+    case.function(case.text)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.function(case.text)
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+    return {"lines": case.lines, "seconds": seconds, "lines_per_second": case.lines / seconds}
+
+
+def compare_results(baseline: dict, results: dict, max_regression: float = DEFAULT_MAX_REGRESSION) -> list[str]:
+    """Returns a message for every case whose throughput dropped by more than ``max_regression`` of the baseline"""
+    regressions = []
+    for name, result in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        change = result["lines_per_second"] / before["lines_per_second"] - 1
+        if change < -max_regression:
+            regressions.append(
+                f"{name}: {result['lines_per_second']:,.0f} lines/s is {-change:.0%} below the baseline of "
+                f"{before['lines_per_second']:,.0f} lines/s"
+            )
+    return regressions
+
+
+@click.command()
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), help="Write the results to this JSON file")
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Fail if throughput dropped compared to the results in this JSON file",
+)
+@click.option(
+    "--max-regression",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_MAX_REGRESSION,
+    show_default=True,
+    help="Largest allowed drop in lines per second, as a fraction of the baseline",
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=DEFAULT_REPEAT, show_default=True)
+@click.option("--case", "case_names", multiple=True, help="Only run the cases whose name starts with this")
+def main(output: Path | None, baseline: Path | None, max_regression: float, repeat: int, case_names: tuple) -> None:
+    """
+    Benchmark the markdown parser on synthetic corpora
+    """
+    results: dict = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for case in get_cases():
+        if case_names and not case.name.startswith(case_names):
+            continue
+        result = run_case(case, repeat)
+        results["results"][case.name] = result
+        print(f"{case.name:<50} {result['lines']:>7} lines {result['lines_per_second']:>12,.0f} lines/s")
+
+    if output:
+        output.write_text(json.dumps(results, indent=2))
+
+    if baseline:
+        regressions = compare_results(json.loads(baseline.read_text()), results, max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} benchmark(s) regressed by more than {max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+End-to-end load test of a sync run against the in-process fake Notion API.
+
+Run ``python -m benchmarks.bench_sync`` to sync a generated tree of markdown files three times: into an empty
+parent page, again after editing some of the files, and once more without a manifest. Each run reports the total
+number of requests, the requests per endpoint, how many were rejected with 429, and the wall-clock time.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks import corpora
+from benchmarks.fake_notion import FakeNotion, use_fake_notion
+from nogisync.cli import DEFAULT_CONCURRENCY, SyncOptions, sync_path
+from nogisync.ratelimit import DEFAULT_RATE_LIMIT
+
+DEFAULT_FILES = 1_000
+DEFAULT_LATENCY = 0.02
+DEFAULT_RATE_LIMIT_PROBABILITY = 0.01
+# The fake has no real rate limit, so by default the client is not the bottleneck and runs measure request counts
+DEFAULT_CLIENT_RATE_LIMIT = 1_000.0
+DEFAULT_EDIT_SHARE = 0.1
+
+
+def generate_tree(root: Path, files: int = DEFAULT_FILES, seed: int = corpora.SEED) -> list[Path]:
+    """Writes ``files`` markdown files into a few levels of directories below ``root`` and returns their paths"""
+    rng = random.Random(seed)
+    directories = [Path(".")]
+    for section in range(max(1, files // 100)):
+        directories.append(Path(f"section_{section}"))
+        directories.extend(Path(f"section_{section}", f"topic_{topic}") for topic in range(3))
+
+    paths = []
+    for number in range(files):
+        path = root / rng.choice(directories) / f"page_{number}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = corpora.generate_long_document(rng.randint(20, 200), seed=number)
+        # Half of the files name their page in front matter, the others are named after the file. Every file has
+        # front matter, since the front matter reader mistakes a body with two dividers for front matter otherwise.
+        front_matter = f"---\ntitle: Page {number}\n---\n" if number % 2 else "---\ntags: docs\n---\n"
+        path.write_text(front_matter + body)
+        paths.append(path)
+    return paths
+
+
+def edit_files(paths: list[Path], share: float = DEFAULT_EDIT_SHARE, seed: int = corpora.SEED) -> int:
+    """Changes one paragraph in a share of the files, the way a typical commit touches docs, and returns how many"""
+    rng = random.Random(seed)
+    edited = rng.sample(paths, int(len(paths) * share))
+    for path in edited:
+        lines = path.read_text().split("\n")
+        # Skip the three lines of front matter
+        position = rng.randrange(3, len(lines) + 1)
+        lines.insert(position, f"Edited {corpora.get_words(rng, 6)}")
+        path.write_text("\n".join(lines))
+    return len(edited)
+
+
+async def run_sync(fake: FakeNotion, parent_page_id: str, path: Path, options: SyncOptions) -> dict:
+    """Runs one sync against ``fake`` and returns what it cost"""
+    fake.reset_stats()
+    start = time.perf_counter()
+    with use_fake_notion(fake), contextlib.redirect_stdout(io.StringIO()):
+        await sync_path("token", parent_page_id, path, options)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "total_requests": fake.total_requests,
+        "rate_limited": fake.rate_limited,
+        "requests": dict(sorted(fake.requests.items())),
+    }
+
+
+async def run_load_test(
+    files: int = DEFAULT_FILES,
+    latency: float = DEFAULT_LATENCY,
+    rate_limit_probability: float = DEFAULT_RATE_LIMIT_PROBABILITY,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_limit: float = DEFAULT_CLIENT_RATE_LIMIT,
+) -> dict:
+    """Syncs a generated tree of ``files`` markdown files and returns the cost of each run"""
+    fake = FakeNotion(latency=latency, rate_limit_probability=rate_limit_probability)
+    parent_page_id = fake.add_page("Docs")
+    results = {}
+    with TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir, "docs")
+        paths = generate_tree(root, files)
+        options = SyncOptions(
+            concurrency=concurrency, rate_limit=rate_limit, manifest_path=Path(tmp_dir, "manifest.json")
+        )
+
+        results["initial"] = await run_sync(fake, parent_page_id, root, options)
+        edited = edit_files(paths)
+        results[f"edited_{edited}"] = await run_sync(fake, parent_page_id, root, options)
+        options.manifest_path = None
+        results["without_manifest"] = await run_sync(fake, parent_page_id, root, options)
+    return results
+
+
+@click.command()
+@click.option("--files", type=click.IntRange(min=1), default=DEFAULT_FILES, show_default=True)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LATENCY,
+    show_default=True,
+    help="Seconds the fake API takes to answer each request",
+)
+@click.option(
+    "--rate-limit-probability",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_RATE_LIMIT_PROBABILITY,
+    show_default=True,
+    help="Share of requests the fake API rejects with 429",
+)
+@click.option("--concurrency", type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_CLIENT_RATE_LIMIT,
+    show_default=True,
+    help="Requests per second the client allows itself",
+)
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), help="Write the results to this JSON file")
+def main(
+    files: int,
+    latency: float,
+    rate_limit_probability: float,
+    concurrency: int,
+    rate_limit: float,
+    output: Path | None,
+) -> None:
+    """
+    Sync a generated markdown tree against a fake Notion API and report the requests it took
+    """
+    results = asyncio.run(run_load_test(files, latency, rate_limit_probability, concurrency, rate_limit))
+    for name, result in results.items():
+        # At Notion's real rate limit, the request count rather than the local wall time decides how long a run takes
+        estimate = result["total_requests"] / DEFAULT_RATE_LIMIT
+        print(
+            f"{name}: {result['total_requests']} requests ({result['rate_limited']} rate limited) in "
+            f"{result['seconds']:.1f}s, about {estimate / 60:.1f} min at {DEFAULT_RATE_LIMIT:g} requests/s"
+        )
+        for endpoint, count in result["requests"].items():
+            print(f"  {endpoint:<25} {count:>7}")
+
+    if output:
+        output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Synthetic markdown corpora for the parser benchmarks.
+
+Every generator is seeded, so the same arguments give the same text on every machine and every commit.
+"""
+
+import random
+
+SEED = 1729
+
+WORDS = [
+    "notion", "sync", "page", "block", "markdown", "parser", "github", "action", "token", "request", "rate", "limit",
+    "cache", "index", "hierarchy", "manifest", "title", "content", "table", "list", "code", "equation", "link", "text",
+]  # fmt: skip
+LANGUAGES = ["python", "bash", "json", "yaml", "typescript"]
+
+
+def get_words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def get_inline_line(rng: random.Random, spans: int = 6) -> str:
+    """A line of prose with bold, italic, code, strikethrough, equation and link spans mixed in"""
+    parts = []
+    for _ in range(spans):
+        text = get_words(rng, rng.randint(1, 3))
+        parts.append(get_words(rng, rng.randint(2, 5)))
+        parts.append(
+            rng.choice(
+                [
+                    f"**{text}**",
+                    f"*{text}*",
+                    f"_{text}_",
+                    f"**_{text}_**",
+                    f"`{text}`",
+                    f"~{text}~",
+                    f"${text}^2$",
+                    f"[{text}](https://example.com/{rng.randint(0, 999)})",
+                    f"**bold with *{text}* inside**",
+                ]
+            )
+        )
+    return " ".join(parts)
+
+
+def generate_long_document(lines: int = 10_000, seed: int = SEED) -> str:
+    """A long document mixing headings, paragraphs, quotes, lists, dividers, code and images"""
+    rng = random.Random(seed)
+    output: list[str] = []
+    while len(output) < lines:
+        kind = rng.random()
+        if kind < 0.05:
+            output.append(f"{'#' * rng.randint(1, 3)} {get_words(rng, 4)}")
+        elif kind < 0.45:
+            output.append(get_inline_line(rng, rng.randint(1, 4)))
+        elif kind < 0.55:
+            output.append(f"> {get_inline_line(rng, 2)}")
+        elif kind < 0.75:
+            output.append(f"- {get_inline_line(rng, 1)}")
+            output.append(f"  - {get_inline_line(rng, 1)}")
+        elif kind < 0.85:
+            output.append(f"{rng.randint(1, 9)}. {get_inline_line(rng, 1)}")
+        elif kind < 0.88:
+            output.append("---")
+        elif kind < 0.93:
+            output.extend([f"```{rng.choice(LANGUAGES)}", *(get_words(rng, 6) for _ in range(4)), "```"])
+        elif kind < 0.96:
+            output.append(f"![{get_words(rng, 2)}](https://example.com/{rng.randint(0, 999)}.png)")
+        else:
+            output.append("")
+    return "\n".join(output[:lines])
+
+
+def generate_nested_lists(items: int = 2_000, max_depth: int = 6, seed: int = SEED) -> str:
+    """Bulleted and numbered lists that nest up to ``max_depth`` levels and switch type between levels"""
+    rng = random.Random(seed)
+    output = []
+    depth = 0
+    for _ in range(items):
+        depth = rng.randint(0, min(depth + 1, max_depth - 1))
+        marker = "-" if rng.random() < 0.5 else f"{rng.randint(1, 9)}."
+        output.append(f"{' ' * depth}{marker} {get_inline_line(rng, 1)}")
+    return "\n".join(output)
+
+
+def generate_wide_table(columns: int = 40, rows: int = 500, seed: int = SEED) -> str:
+    """A table with a header row, a delimiter row and ``rows`` rows of ``columns`` cells"""
+    rng = random.Random(seed)
+    header = "| " + " | ".join(f"Column {i}" for i in range(columns)) + " |"
+    delimiter = "|" + "|".join("---" for _ in range(columns)) + "|"
+    body = ["| " + " | ".join(get_words(rng, 2) for _ in range(columns)) + " |" for _ in range(rows)]
+    return "\n".join([header, delimiter, *body])
+
+
+def generate_inline_heavy(lines: int = 5_000, seed: int = SEED) -> str:
+    """Paragraphs that are nothing but dense inline formatting"""
+    rng = random.Random(seed)
+    return "\n".join(get_inline_line(rng, 12) for _ in range(lines))
+
+
+def generate_code_and_equations(blocks: int = 1_000, seed: int = SEED) -> str:
+    """Many fenced code blocks and ``$$`` equation blocks separated by short paragraphs"""
+    rng = random.Random(seed)
+    output = []
+    for _ in range(blocks):
+        if rng.random() < 0.5:
+            body = [get_words(rng, 8) for _ in range(rng.randint(2, 10))]
+            output.extend([f"```{rng.choice(LANGUAGES)}", *body, "```"])
+        else:
+            output.extend(["$$", f"\\sum_{{i=0}}^{{{rng.randint(1, 99)}}} x_i^2 + \\frac{{a}}{{b}}", "$$"])
+        output.append(get_words(rng, 6))
+    return "\n".join(output)
+
+
+def generate_adversarial_emphasis(lines: int = 2_000, width: int = 200, seed: int = SEED) -> str:
+    """Lines full of unmatched and interleaved ``*``, ``_``, ``~``, ``$`` and backtick markers"""
+    rng = random.Random(seed)
+    markers = ["*", "**", "_", "__", "~", "`", "$", "[", "](", " "]
+    return "\n".join(
+        "a" + "".join(rng.choice(markers) + rng.choice("abc ") for _ in range(width // 2)) for _ in range(lines)
+    )
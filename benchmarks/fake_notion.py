@@ -0,0 +1,359 @@
+"""
+In-process stand-in for the Notion endpoints nogisync uses.
+
+``FakeNotion`` is an httpx transport, so a real ``RateLimitedClient`` runs against it unchanged and every request
+goes through the same pacing, retries and pagination as in production. It keeps pages and blocks in memory, answers
+with Notion-shaped JSON, and can add latency to every request and reject some with 429 to exercise back-off.
+"""
+
+import asyncio
+import contextlib
+import functools
+import itertools
+import json
+import random
+from collections import Counter
+from collections.abc import Iterator
+from unittest.mock import patch
+from urllib.parse import unquote
+
+import httpx
+
+from nogisync import notion
+from nogisync.stats import ENDPOINTS
+
+MAX_PAGE_SIZE = 100
+# Limits on requests that create blocks: the length of any children array, the blocks in the whole request, the
+# levels of blocks and the size of the body
+MAX_APPEND_BLOCKS = 100
+MAX_REQUEST_BLOCKS = 1000
+MAX_NESTING_DEPTH = 2
+MAX_BODY_BYTES = 500_000
+
+DEFAULT_ANNOTATIONS = {
+    "bold": False,
+    "italic": False,
+    "strikethrough": False,
+    "underline": False,
+    "code": False,
+    "color": "default",
+}
+
+
+class NotionError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def validate_rows(rows: list[dict], table_width: int, path: str) -> None:
+    """Rejects children of a table that are not rows exactly as wide as the table"""
+    for i, row in enumerate(rows):
+        if row["type"] != "table_row":
+            raise NotionError(400, "validation_error", f"{path}[{i}] should be a table_row")
+        if len(row["table_row"]["cells"]) != table_width:
+            raise NotionError(400, "validation_error", f"{path}[{i}].table_row.cells.length should be {table_width}")
+
+
+def validate_children(request: httpx.Request, children: list[dict]) -> None:
+    """Rejects children the way Notion does when they break one of its limits on a single request"""
+    if len(request.content) > MAX_BODY_BYTES:
+        raise NotionError(400, "validation_error", f"Request body too large ({len(request.content)} bytes)")
+
+    count = 0
+
+    def check(blocks: list[dict], path: str, depth: int) -> None:
+        nonlocal count
+        if len(blocks) > MAX_APPEND_BLOCKS:
+            raise NotionError(400, "validation_error", f"{path}.length should be ≤ {MAX_APPEND_BLOCKS}")
+        count += len(blocks)
+        for i, block in enumerate(blocks):
+            block_type = block["type"]
+            nested = block[block_type].get("children")
+            if block_type == "table":
+                if not nested:
+                    raise NotionError(400, "validation_error", f"{path}[{i}].table.children should be defined")
+                validate_rows(nested, block["table"]["table_width"], f"{path}[{i}].table.children")
+            if nested is None:
+                continue
+            if depth == MAX_NESTING_DEPTH:
+                raise NotionError(400, "validation_error", f"{path}[{i}].{block_type}.children should be not present")
+            check(nested, f"{path}[{i}].{block_type}.children", depth + 1)
+
+    check(children, "body.children", 1)
+    if count > MAX_REQUEST_BLOCKS:
+        raise NotionError(400, "validation_error", f"Request has {count} blocks, more than {MAX_REQUEST_BLOCKS}")
+
+
+def normalize_rich_text(rich_text: list[dict]) -> list[dict]:
+    """Fills in the defaults Notion adds to rich text it stores"""
+    items = []
+    for item in rich_text:
+        item = dict(item)
+        if item.get("type", "text") == "text":
+            text = {"link": None, **item.get("text", {})}
+            item.update(
+                type="text",
+                text=text,
+                annotations={**DEFAULT_ANNOTATIONS, **item.get("annotations", {})},
+                plain_text=text.get("content", ""),
+                href=(text["link"] or {}).get("url"),
+            )
+        else:
+            item.setdefault("annotations", dict(DEFAULT_ANNOTATIONS))
+            item.setdefault("plain_text", item.get("equation", {}).get("expression", ""))
+            item.setdefault("href", None)
+        items.append(item)
+    return items
+
+
+class FakeNotion(httpx.AsyncBaseTransport):
+    """
+    In-memory Notion workspace served over an httpx transport.
+
+    :param latency: Seconds every request takes before it is answered.
+    :param rate_limit_probability: Share of requests rejected with 429, picked with a seeded random generator.
+    :param retry_after: Seconds sent in the ``Retry-After`` header of rejected requests.
+    :param page_size: Largest number of results returned per page of a paginated endpoint.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        retry_after: float = 0.0,
+        page_size: int = MAX_PAGE_SIZE,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+
+        # Every page and block by ID, and the ordered child IDs of every page and block
+        self.pages: dict[str, dict] = {}
+        self.blocks: dict[str, dict] = {}
+        self.children: dict[str, list[str]] = {}
+
+        # Requests answered per endpoint, and requests rejected with 429
+        self.requests: Counter[str] = Counter()
+        self.rate_limited = 0
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def reset_stats(self) -> None:
+        self.requests.clear()
+        self.rate_limited = 0
+
+    def _new_id(self) -> str:
+        return f"00000000-0000-4000-8000-{next(self._ids):012d}"
+
+    def add_page(self, title: str, parent_id: str | None = None) -> str:
+        """Creates a page directly, e.g. the parent page a sync starts from, and returns its ID"""
+        page_id = self._new_id()
+        self.pages[page_id] = {"id": page_id, "title": title, "parent_id": parent_id, "archived": False}
+        self.children[page_id] = []
+        if parent_id is not None:
+            self.blocks[page_id] = {
+                "id": page_id,
+                "type": "child_page",
+                "child_page": {"title": title},
+                "parent_id": parent_id,
+            }
+            self.children[parent_id].append(page_id)
+        return page_id
+
+    def get_child_titles(self, page_id: str) -> list[str]:
+        """Returns the titles of the pages nested directly below a page"""
+        return [self.pages[child]["title"] for child in self.children[page_id] if child in self.pages]
+
+    def get_block_types(self, page_id: str) -> list[str]:
+        return [self.blocks[child]["type"] for child in self.children[page_id]]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.url.path.removeprefix("/v1/")
+        for method, pattern, endpoint in ENDPOINTS:
+            match = pattern.fullmatch(path)
+            if match and request.method == method:
+                break
+        else:
+            return self._error(NotionError(400, "invalid_request_url", f"Invalid request URL: {request.method} {path}"))
+
+        if self.rate_limit_probability and self._random.random() < self.rate_limit_probability:
+            self.rate_limited += 1
+            return httpx.Response(
+                429,
+                headers={"Retry-After": str(self.retry_after)},
+                json={"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+            )
+
+        self.requests[endpoint] += 1
+        body = json.loads(request.content) if request.content else {}
+        handler = getattr(self, "_" + endpoint.replace(".", "_"))
+        try:
+            return httpx.Response(200, json=handler(request, body, *(unquote(group) for group in match.groups())))
+        except NotionError as e:
+            return self._error(e)
+
+    @staticmethod
+    def _error(error: NotionError) -> httpx.Response:
+        return httpx.Response(
+            error.status, json={"object": "error", "status": error.status, "code": error.code, "message": str(error)}
+        )
+
+    def _paginate(self, items: list[dict], start_cursor: str | None, page_size: int | None) -> dict:
+        start = int(start_cursor or 0)
+        size = min(page_size or self.page_size, self.page_size)
+        end = start + size
+        return {
+            "object": "list",
+            "results": items[start:end],
+            "has_more": end < len(items),
+            "next_cursor": str(end) if end < len(items) else None,
+        }
+
+    def _get_page(self, page_id: str) -> dict:
+        page = self.pages.get(page_id)
+        if page is None:
+            raise NotionError(404, "object_not_found", f"Could not find page with ID: {page_id}")
+        return page
+
+    def _get_block(self, block_id: str) -> dict:
+        block = self.blocks.get(block_id)
+        if block is None or block.get("archived"):
+            raise NotionError(404, "object_not_found", f"Could not find block with ID: {block_id}")
+        return block
+
+    def _render_page(self, page: dict) -> dict:
+        title = normalize_rich_text([{"type": "text", "text": {"content": page["title"]}}])
+        parent = {"type": "page_id", "page_id": page["parent_id"]} if page["parent_id"] else {"type": "workspace"}
+        return {
+            "object": "page",
+            "id": page["id"],
+            "parent": parent,
+            "archived": page["archived"],
+            "properties": {"title": {"id": "title", "type": "title", "title": title}},
+        }
+
+    def _render_block(self, block: dict) -> dict:
+        rendered = {key: value for key, value in block.items() if key != "parent_id"}
+        rendered.update(object="block", has_children=bool(self.children.get(block["id"])), archived=False)
+        return rendered
+
+    def _add_blocks(self, parent_id: str, blocks: list[dict], after: str | None = None) -> list[str]:
+        siblings = self.children.setdefault(parent_id, [])
+        position = siblings.index(after) + 1 if after in siblings else len(siblings)
+        block_ids = []
+        for block in blocks:
+            block_type = block["type"]
+            payload = dict(block[block_type])
+            nested = payload.pop("children", [])
+            for key in ("rich_text", "caption"):
+                if key in payload:
+                    payload[key] = normalize_rich_text(payload[key])
+            if "cells" in payload:
+                payload["cells"] = [normalize_rich_text(cell) for cell in payload["cells"]]
+            block_id = self._new_id()
+            self.blocks[block_id] = {"id": block_id, "type": block_type, block_type: payload, "parent_id": parent_id}
+            self.children[block_id] = []
+            self._add_blocks(block_id, nested)
+            block_ids.append(block_id)
+        siblings[position:position] = block_ids
+        return block_ids
+
+    def _search(self, request: httpx.Request, body: dict) -> dict:
+        query = body.get("query", "").lower()
+        pages = [
+            self._render_page(page)
+            for page in self.pages.values()
+            if not page["archived"] and query in page["title"].lower()
+        ]
+        return self._paginate(pages, body.get("start_cursor"), body.get("page_size"))
+
+    def _pages_create(self, request: httpx.Request, body: dict) -> dict:
+        parent_id = body.get("parent", {}).get("page_id")
+        if parent_id not in self.pages:
+            raise NotionError(404, "object_not_found", f"Could not find page with ID: {parent_id}")
+        children = body.get("children", [])
+        validate_children(request, children)
+        title = "".join(item["text"]["content"] for item in body.get("properties", {}).get("title", []))
+        page_id = self.add_page(title, parent_id)
+        self._add_blocks(page_id, children)
+        return self._render_page(self.pages[page_id])
+
+    def _pages_retrieve(self, request: httpx.Request, body: dict, page_id: str) -> dict:
+        return self._render_page(self._get_page(page_id))
+
+    def _pages_update(self, request: httpx.Request, body: dict, page_id: str) -> dict:
+        page = self._get_page(page_id)
+        if "properties" in body:
+            page["title"] = "".join(item["text"]["content"] for item in body["properties"]["title"])
+            self.blocks[page_id]["child_page"]["title"] = page["title"]
+        if body.get("archived") and not page["archived"]:
+            page["archived"] = True
+            self.children[page["parent_id"]].remove(page_id)
+        return self._render_page(page)
+
+    def _pages_move(self, request: httpx.Request, body: dict, page_id: str) -> dict:
+        page = self._get_page(page_id)
+        parent_id = body["parent"]["page_id"]
+        self._get_page(parent_id)
+        self.children[page["parent_id"]].remove(page_id)
+        self.children[parent_id].append(page_id)
+        page["parent_id"] = parent_id
+        return self._render_page(page)
+
+    def _blocks_children_list(self, request: httpx.Request, body: dict, block_id: str) -> dict:
+        if block_id not in self.pages:
+            self._get_block(block_id)
+        children = [self._render_block(self.blocks[child]) for child in self.children.get(block_id, [])]
+        page_size = request.url.params.get("page_size")
+        return self._paginate(children, request.url.params.get("start_cursor"), int(page_size) if page_size else None)
+
+    def _blocks_children_append(self, request: httpx.Request, body: dict, block_id: str) -> dict:
+        parent = None if block_id in self.pages else self._get_block(block_id)
+        children = body.get("children", [])
+        validate_children(request, children)
+        if parent is not None and parent["type"] == "table":
+            validate_rows(children, parent["table"]["table_width"], "body.children")
+        after = body.get("after")
+        if after is not None and after not in self.children.get(block_id, []):
+            raise NotionError(400, "validation_error", f"Block {after} is not a child of {block_id}")
+        block_ids = self._add_blocks(block_id, children, after)
+        return {"object": "list", "results": [self._render_block(self.blocks[i]) for i in block_ids]}
+
+    def _blocks_update(self, request: httpx.Request, body: dict, block_id: str) -> dict:
+        block = self._get_block(block_id)
+        block_type = block["type"]
+        if block_type in body:
+            payload = dict(body[block_type])
+            for key in ("rich_text", "caption"):
+                if key in payload:
+                    payload[key] = normalize_rich_text(payload[key])
+            if "cells" in payload:
+                payload["cells"] = [normalize_rich_text(cell) for cell in payload["cells"]]
+            block[block_type] = {**block[block_type], **payload}
+        return self._render_block(block)
+
+    def _blocks_delete(self, request: httpx.Request, body: dict, block_id: str) -> dict:
+        block = self._get_block(block_id)
+        block["archived"] = True
+        self.children[block["parent_id"]].remove(block_id)
+        return {**self._render_block(block), "archived": True}
+
+
+@contextlib.contextmanager
+def use_fake_notion(fake: FakeNotion) -> Iterator[None]:
+    """Sends the requests of every Notion client the sync opens inside the block to ``fake``"""
+    get_client = functools.partial(notion.get_notion_client, transport=fake)
+    with patch.object(notion, "get_notion_client", get_client):
+        yield
@@ -0,0 +1,156 @@
+import itertools
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+# Notion's limits on a request that creates blocks: the length of any children array, the number of blocks in the
+# whole request, the levels of blocks (blocks and their children, but not grandchildren) and the size of the body.
+MAX_BLOCKS_PER_ARRAY = 100
+MAX_BLOCKS_PER_REQUEST = 1000
+MAX_NESTING_DEPTH = 2
+MAX_PAYLOAD_BYTES = 500_000
+# Room left in the body for everything besides the blocks, such as the parent and the title of a new page
+PAYLOAD_HEADROOM = 10_000
+# Blocks Notion only creates together with their first children, such as a table with its first rows
+NON_EMPTY_TYPES = {"table"}
+
+
+def get_children(block: dict) -> list[dict]:
+    return block.get(block.get("type", ""), {}).get("children", [])
+
+
+def without_children(block: dict) -> dict:
+    """Returns a copy of ``block`` without its nested children"""
+    block_type = block["type"]
+    return {**block, block_type: {key: value for key, value in block[block_type].items() if key != "children"}}
+
+
+def split_children(block: dict) -> tuple[dict, list[dict]]:
+    """
+    Splits off the children of a block that is too large to be sent with all of them, to be appended below it later.
+
+    Most blocks are sent without any children. Blocks that cannot be created empty keep as many of their first children
+    as fit into one request along with them.
+    """
+    children = get_children(block)
+    block = without_children(block)
+    if block["type"] not in NON_EMPTY_TYPES:
+        return block, children
+
+    size = get_size(block)
+    kept = 0
+    while kept < min(len(children), MAX_BLOCKS_PER_ARRAY, MAX_BLOCKS_PER_REQUEST - 1):
+        child = children[kept]
+        size += get_size(child)
+        if kept and (get_children(child) or size > MAX_PAYLOAD_BYTES - PAYLOAD_HEADROOM):
+            break
+        kept += 1
+    block_type = block["type"]
+    return {**block, block_type: {**block[block_type], "children": children[:kept]}}, children[kept:]
+
+
+def measure(block: dict) -> tuple[int, int, int]:
+    """Returns the levels of blocks, the number of blocks and the longest children array of a block and its children"""
+    depth = count = 1
+    widest = 0
+    children = get_children(block)
+    for child in children:
+        child_depth, child_count, child_widest = measure(child)
+        depth = max(depth, child_depth + 1)
+        count += child_count
+        widest = max(widest, child_widest)
+    return depth, count, max(widest, len(children))
+
+
+def get_size(block: dict) -> int:
+    """
+    Returns the bytes ``block`` takes up in a request body, including the separator before it.
+
+    Non-ASCII characters are counted as escapes, which is never less than what the HTTP client sends.
+    """
+    return len(json.dumps(block)) + 2
+
+
+@dataclass
+class Batch:
+    """Blocks sent in one request, with the children held back from some of them to be appended afterwards"""
+
+    blocks: list[dict] = field(default_factory=list)
+    # Children that did not fit into the request, by the position of their block in ``blocks``
+    deferred: dict[int, list[dict]] = field(default_factory=dict)
+    # Blocks in the request, nested ones included, and their size in bytes
+    count: int = 0
+    size: int = 0
+
+    def fits(self, count: int, size: int) -> bool:
+        return (
+            len(self.blocks) < MAX_BLOCKS_PER_ARRAY
+            and self.count + count <= MAX_BLOCKS_PER_REQUEST
+            and self.size + size <= MAX_PAYLOAD_BYTES - PAYLOAD_HEADROOM
+        )
+
+    def add(self, block: dict, count: int, size: int, deferred: list[dict] | None = None) -> None:
+        if deferred:
+            self.deferred[len(self.blocks)] = deferred
+        self.blocks.append(block)
+        self.count += count
+        self.size += size
+
+
+def iter_batches(blocks: Iterable[dict]) -> Iterator[Batch]:
+    """
+    Packs blocks into as few requests as Notion accepts, pulling from ``blocks`` only as each batch is needed.
+
+    A block whose children do not fit into one request, because they are nested too deep, too many or too large, is
+    sent without them, and its children are held back to be appended below it once it exists. A table is sent with
+    the rows that fit, and the rest of its rows are appended in batches.
+    """
+    batch = Batch()
+    for block in blocks:
+        deferred = None
+        depth, count, widest = measure(block)
+        size = get_size(block)
+        if count > 1 and (
+            depth > MAX_NESTING_DEPTH
+            or widest > MAX_BLOCKS_PER_ARRAY
+            or count > MAX_BLOCKS_PER_REQUEST
+            or size > MAX_PAYLOAD_BYTES - PAYLOAD_HEADROOM
+        ):
+            block, deferred = split_children(block)
+            count, size = measure(block)[1], get_size(block)
+
+        if batch.blocks and not batch.fits(count, size):
+            yield batch
+            batch = Batch()
+        batch.add(block, count, size, deferred)
+        # A full batch goes out straight away instead of waiting for the next block to be parsed
+        if len(batch.blocks) == MAX_BLOCKS_PER_ARRAY:
+            yield batch
+            batch = Batch()
+    if batch.blocks:
+        yield batch
+
+
+def split_first_batch(batches: Iterator[Batch]) -> tuple[list[dict], Iterator[Batch]]:
+    """
+    Takes the blocks that can be sent along with a new page from the first batch, and returns the batches left.
+
+    Creating a page does not return the IDs of its blocks, so the first batch only goes along up to its first block
+    with held back children; that block and the rest of the batch are appended to the page afterwards.
+    """
+    first = next(batches, None)
+    if first is None:
+        return [], batches
+    if not first.deferred:
+        return first.blocks, batches
+
+    position = min(first.deferred)
+    rest = Batch(first.blocks[position:], {i - position: children for i, children in first.deferred.items()})
+    return first.blocks[:position], itertools.chain([rest], batches)
+
+
+def count_requests(batches: Iterable[Batch]) -> int:
+    """Counts the append requests it takes to send ``batches``, including those for held back children"""
+    return sum(
+        1 + sum(count_requests(iter_batches(children)) for children in batch.deferred.values()) for batch in batches
+    )
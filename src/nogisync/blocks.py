@@ -0,0 +1,163 @@
+import itertools
+from dataclasses import dataclass
+from typing import Any
+
+LIST_ITEM_TYPES = {"bulleted_list_item", "numbered_list_item"}
+# Block types the parser has always emitted without ``"object": "block"``; kept so cached and parsed JSON match
+UNTAGGED_TYPES = {"divider", "equation"}
+
+
+@dataclass(frozen=True, slots=True)
+class Annotations:
+    """The formatting of a rich text run. Instances are shared, so get them from ``get_annotations``"""
+
+    bold: bool = False
+    italic: bool = False
+    strikethrough: bool = False
+    code: bool = False
+
+    def __reduce__(self) -> tuple:
+        # Unpickled runs, e.g. those sent back by the parse workers, share the annotations of this process again
+        return get_annotations, (self.bold, self.italic, self.strikethrough, self.code)
+
+    def to_notion(self) -> dict:
+        return {
+            "bold": self.bold,
+            "italic": self.italic,
+            "strikethrough": self.strikethrough,
+            "code": self.code,
+            "underline": False,
+            "color": "default",
+        }
+
+
+# Every combination of formatting exists once and is shared by all runs with that formatting
+ANNOTATIONS = {flags: Annotations(*flags) for flags in itertools.product((False, True), repeat=4)}
+PLAIN = ANNOTATIONS[False, False, False, False]
+
+
+def get_annotations(
+    bold: bool = False, italic: bool = False, strikethrough: bool = False, code: bool = False
+) -> Annotations:
+    """Returns the shared ``Annotations`` instance for this combination of formatting"""
+    return ANNOTATIONS[bold, italic, strikethrough, code]
+
+
+@dataclass(slots=True)
+class TextRun:
+    """A run of rich text with the same formatting and link"""
+
+    content: str
+    annotations: Annotations = PLAIN
+    link: str | None = None
+
+    def to_notion(self) -> dict:
+        if self.link is None and self.annotations is PLAIN:
+            return {"type": "text", "text": {"content": self.content}}
+        return {
+            "type": "text",
+            "text": {"content": self.content, "link": {"url": self.link} if self.link else None},
+            "annotations": self.annotations.to_notion(),
+            "plain_text": self.content,
+            "href": self.link,
+        }
+
+
+@dataclass(slots=True)
+class EquationRun:
+    """An inline equation"""
+
+    expression: str
+
+    def to_notion(self) -> dict:
+        return {"type": "equation", "equation": {"expression": self.expression}}
+
+
+RichText = TextRun | EquationRun
+
+
+def rich_text_from_notion(item: dict) -> RichText:
+    if item.get("type") == "equation":
+        return EquationRun(item["equation"]["expression"])
+    text = item["text"]
+    annotations = item.get("annotations", {})
+    return TextRun(
+        text["content"],
+        get_annotations(
+            annotations.get("bold", False),
+            annotations.get("italic", False),
+            annotations.get("strikethrough", False),
+            annotations.get("code", False),
+        ),
+        (text.get("link") or {}).get("url"),
+    )
+
+
+@dataclass(slots=True)
+class Block:
+    """
+    A parsed block, kept in a compact form until it is sent to Notion.
+
+    Only the fields of its type are set: rich text and children for text blocks, rich text and a language for code,
+    an expression for equations, a URL and caption for images, the width, header flag and rows of a table, and the
+    cells of a table row.
+    """
+
+    type: str
+    rich_text: list[RichText] | None = None
+    children: list["Block"] | None = None
+    language: str | None = None
+    expression: str | None = None
+    url: str | None = None
+    caption: str | None = None
+    table_width: int | None = None
+    has_column_header: bool | None = None
+    cells: list[list[RichText]] | None = None
+
+    def to_notion(self) -> dict:
+        """Serializes the block and its children into the JSON the Notion API takes"""
+        payload: dict[str, Any] = {}
+        if self.type == "image":
+            payload["external"] = {"url": self.url}
+            if self.caption:
+                payload["caption"] = [{"type": "text", "text": {"content": self.caption, "link": None}}]
+        elif self.type == "equation":
+            payload["expression"] = self.expression
+        elif self.type == "code":
+            payload["language"] = self.language
+        elif self.type == "table":
+            payload["table_width"] = self.table_width
+            payload["has_column_header"] = bool(self.has_column_header)
+            payload["has_row_header"] = False
+        elif self.type == "table_row":
+            payload["cells"] = [[run.to_notion() for run in cell] for cell in self.cells or []]
+        if self.rich_text is not None:
+            payload["rich_text"] = [run.to_notion() for run in self.rich_text]
+        if self.children:
+            payload["children"] = [child.to_notion() for child in self.children]
+
+        block = {"type": self.type, self.type: payload}
+        if self.type not in UNTAGGED_TYPES:
+            block["object"] = "block"
+        return block
+
+    @classmethod
+    def from_notion(cls, block: dict) -> "Block":
+        """Reads a block serialized with ``to_notion`` back, e.g. from the parse cache"""
+        block_type = block["type"]
+        payload = block[block_type]
+        caption = payload.get("caption")
+        return cls(
+            block_type,
+            [rich_text_from_notion(item) for item in payload["rich_text"]] if "rich_text" in payload else None,
+            [cls.from_notion(child) for child in payload["children"]] if "children" in payload else None,
+            payload.get("language"),
+            payload.get("expression"),
+            payload.get("external", {}).get("url"),
+            caption[0]["text"]["content"] if caption else None,
+            payload.get("table_width"),
+            payload.get("has_column_header"),
+            [[rich_text_from_notion(item) for item in cell] for cell in payload["cells"]]
+            if "cells" in payload
+            else None,
+        )
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+from nogisync.blocks import Block
+from nogisync.markdown import PARSER_VERSION, iter_blocks, parse_blocks
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+# Eviction frees space down to this share of the size limit, so it does not run again on the very next write
+EVICTION_TARGET = 0.8
+
+
+def get_cache_key(content: str) -> str:
+    """Returns the SHA-256 hex digest of a markdown body, which together with the parser version names its entry"""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed Notion blocks, keyed by the hash of the markdown body and the parser version.
+
+    Parsing is pure, so a body that was parsed before by the same parser version gives the same blocks. Entries are
+    JSON files sharded by the first two characters of their hash. Reading an entry marks it as recently used, and
+    once the cache grows past ``max_size`` bytes the least recently used entries are removed. Without a directory
+    the cache is disabled and every body is parsed.
+    """
+
+    def __init__(self, directory: Path | None, max_size: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        # Total size of the entries on disk, counted on the first write
+        self._size: int | None = None
+
+    def _get_path(self, content: str) -> Path:
+        key = get_cache_key(content)
+        return Path(self.directory or "") / key[:2] / f"{key}.v{PARSER_VERSION}.json"
+
+    def get(self, content: str) -> list[Block] | None:
+        """Returns the cached blocks of a markdown body, or None if it has not been parsed before"""
+        if self.directory is None:
+            return None
+
+        path = self._get_path(content)
+        try:
+            blocks = [Block.from_notion(block) for block in json.loads(path.read_bytes())]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, LookupError, TypeError, AttributeError) as e:
+            logging.warning("Ignoring unreadable parse cache entry %s: %s", path, e)
+            return None
+
+        try:
+            # The modification time doubles as the last use, which eviction sorts by
+            os.utime(path)
+        except OSError:
+            pass
+        return blocks
+
+    def put(self, content: str, blocks: list[Block]) -> None:
+        """Stores the blocks of a markdown body, evicting old entries if the cache grew too large"""
+        if self.directory is None:
+            return
+
+        path = self._get_path(content)
+        data = json.dumps([block.to_notion() for block in blocks], separators=(",", ":")).encode()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning("Could not write parse cache entry %s: %s", path, e)
+            return
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._list_entries())
+        else:
+            self._size += len(data)
+        if self._size > self.max_size:
+            self.evict()
+
+    def _list_entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in Path(self.directory or "").glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache is well below its size limit"""
+        entries = sorted(self._list_entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size * EVICTION_TARGET:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+    def parse(self, content: str) -> list[Block]:
+        """Parses a markdown body into blocks, reusing the cached blocks when there are any"""
+        blocks = self.get(content)
+        if blocks is None:
+            blocks = parse_blocks(content)
+            self.put(content, blocks)
+        return blocks
+
+    def iter_blocks(self, content: str) -> Iterator[Block]:
+        """Yields the blocks of a markdown body, streaming them from the parser when they are not cached yet"""
+        if self.directory is None:
+            yield from iter_blocks(content)
+            return
+
+        blocks = self.get(content)
+        if blocks is not None:
+            yield from blocks
+            return
+
+        blocks = []
+        for block in iter_blocks(content):
+            blocks.append(block)
+            yield block
+        self.put(content, blocks)
@@ -0,0 +1,75 @@
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+ADDED = "A"
+MODIFIED = "M"
+RENAMED = "R"
+DELETED = "D"
+
+
+class GitError(Exception):
+    """Raised when git cannot answer a question about the repository"""
+
+
+@dataclass(frozen=True)
+class FileChange:
+    """A markdown file that was added, modified, renamed or deleted between two commits"""
+
+    status: str
+    # Relative to the sync root. For deletions this is the path the file used to have.
+    path: Path
+    # For renames, the path the file had before
+    old_path: Path | None = None
+    # For renames, whether the content is byte-for-byte the same as before
+    content_changed: bool = True
+
+
+def run_git(root: Path, *args: str) -> str:
+    # The checkout inside the Action's container is owned by another user, which git refuses to read by default
+    result = subprocess.run(
+        ["git", "-c", "safe.directory=*", "-C", str(root), *args], capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise GitError(result.stderr.strip() or f"git {args[0]} failed with exit code {result.returncode}")
+    return result.stdout
+
+
+def get_changed_markdown_files(root: Path, since: str, until: str = "HEAD") -> list[FileChange]:
+    """
+    Lists the markdown files below ``root`` that changed between the commits ``since`` and ``until``.
+
+    Paths are relative to ``root``. Copies count as additions and type changes as modifications.
+    """
+    output = run_git(root, "diff", "--name-status", "-z", "--find-renames", "--relative", since, until, "--", "*.md")
+    fields = output.split("\0")
+
+    changes = []
+    position = 0
+    while position < len(fields) and fields[position]:
+        status = fields[position]
+        kind = status[0]
+        if kind in (RENAMED, "C"):
+            old_path, new_path = Path(fields[position + 1]), Path(fields[position + 2])
+            position += 3
+            if kind == RENAMED:
+                changes.append(FileChange(RENAMED, new_path, old_path, content_changed=status != "R100"))
+            else:
+                changes.append(FileChange(ADDED, new_path))
+            continue
+
+        path = Path(fields[position + 1])
+        position += 2
+        if kind == ADDED:
+            changes.append(FileChange(ADDED, path))
+        elif kind in (MODIFIED, "T"):
+            changes.append(FileChange(MODIFIED, path))
+        elif kind == DELETED:
+            changes.append(FileChange(DELETED, path))
+
+    return changes
+
+
+def read_file_at(root: Path, ref: str, relative_path: Path) -> str:
+    """Returns the content a file below ``root`` had at commit ``ref``"""
+    return run_git(root, "show", f"{ref}:./{relative_path.as_posix()}")
@@ -1,90 +1,953 @@
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import cast
 
 import click
-from frontmatter import Frontmatter
+import notion_client
 
-from nogisync import notion
+from nogisync import changes, ingest, mirror, notion, plan
+from nogisync.blocks import Block
+from nogisync.cache import ParseCache
+from nogisync.config import ConfigError, SyncRoot, get_manifest_path, load_config
+from nogisync.diff import KEEP, diff_blocks
+from nogisync.discovery import FileFinder
+from nogisync.hierarchy import (
+    find_directory_page,
+    find_directory_pages,
+    load_directory_pages,
+    resolve_directory_pages,
+)
+from nogisync.index import PageIndex
+from nogisync.manifest import ManifestEntry, SyncManifest, hash_content
+from nogisync.profiling import DISCOVERY, HIERARCHY, LOOKUP, PARSE, READ, phase, profile_run
+from nogisync.ratelimit import DEFAULT_RATE_LIMIT
+from nogisync.stats import RunStats, track_file
+
+DEFAULT_CONCURRENCY = 4
 
 
-def process_page_hierarchy(client, base_parent_id: str, relative_path: Path) -> str:
+async def process_page_hierarchy(
+    client: notion_client.AsyncClient, index: PageIndex, base_parent_id: str, relative_path: Path
+) -> str:
     """Creates/updates page hierarchy based on directory structure"""
-    current_parent_id = base_parent_id
-    path_parts = relative_path.parts[:-1]  # Exclude the markdown file itself
+    directory_ids = await resolve_directory_pages(client, index, base_parent_id, [relative_path])
+    return directory_ids[relative_path.parent]
 
-    for part in path_parts:
-        # Convert directory name to title case (e.g., "foo_lives_here" -> "Foo Lives Here")
-        page_title = " ".join(word.capitalize() for word in part.replace("-", "_").split("_"))
 
-        # Check if page exists under current parent
-        existing_page = notion.find_notion_page(client, page_title, parent_id=current_parent_id)
+@dataclass
+class SyncOptions:
+    """Options that tune how a sync run talks to Notion and what it remembers between runs"""
 
-        if existing_page:
-            current_parent_id = existing_page["id"]
-        else:
-            # Create new parent page
-            new_page = notion.create_notion_page(client, current_parent_id, page_title, "")
-            if new_page:
-                current_parent_id = new_page["id"]
+    concurrency: int = DEFAULT_CONCURRENCY
+    rate_limit: float = DEFAULT_RATE_LIMIT
+    http_timeout: float = notion.DEFAULT_HTTP_TIMEOUT
+    max_connections: int = notion.DEFAULT_MAX_CONNECTIONS
+    manifest_path: Path | None = None
+    # Directory of cached parse results shared between runs
+    cache_dir: Path | None = None
+    # Processes that parse the content of markdown files up front; with 0, files are parsed while they are uploaded
+    parse_workers: int = 0
+    # Only sync the markdown files git reports as changed since this commit
+    since: str | None = None
+    # Globs of the files to sync and of the files and directories to skip, and how many directory levels to descend
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    max_depth: int | None = None
+    # Archive every page below the parent page that no local markdown file or directory accounts for
+    mirror: bool = False
+    # Where to write the request statistics of the run as JSON, and append them as a Markdown report
+    stats_path: Path | None = None
+    summary_path: Path | None = None
+    # Print the time spent in each phase of the run, and write cProfile statistics of the run to profile_path
+    profile: bool = False
+    profile_path: Path | None = None
+
+
+@dataclass
+class MarkdownFile:
+    """A markdown file that needs to be synced, read and ready for upload"""
+
+    path: Path
+    relative_path: Path
+    content_hash: str
+    title: str
+    content: str
+    # The page this file was synced to by an earlier run, if the manifest knows it
+    page_id: str | None = None
+    # For renamed files, the path the file used to have and the title of its page
+    renamed_from: Path | None = None
+    previous_title: str | None = None
+    content_changed: bool = True
+    # The parsed blocks, when the file was parsed before uploading
+    blocks: list[Block] | None = None
+
+
+@dataclass
+class DeletedFile:
+    """A markdown file that was deleted since the last sync, and whose page should be archived"""
+
+    relative_path: Path
+    title: str
+    page_id: str | None = None
+
+
+def read_markdown_file(md_file: Path, relative_path: Path, data: ingest.Data, content_hash: str) -> MarkdownFile:
+    """Takes the title and content of a markdown file from its data, read with ``ingest.open_file``"""
+    document = ingest.parse_document(data, str(md_file))
+    return MarkdownFile(md_file, relative_path, content_hash, get_title(md_file, document.attributes), document.content)
+
+
+def parse_content(content: str, cache_dir: Path | None) -> list[Block]:
+    """Parses the content of a markdown file into blocks; runs in the parse worker processes"""
+    return ParseCache(cache_dir).parse(content)
+
+
+def parse_markdown_files(files: list[MarkdownFile], options: SyncOptions) -> Iterator[MarkdownFile]:
+    """
+    Parses markdown files up front with parse workers, yielding them in the order they were given.
+
+    Parsing is spread over a process pool, so it uses every core instead of one. Without parse workers, files are
+    yielded as they are and parsed while they are uploaded.
+    """
+    if options.parse_workers < 1 or not files:
+        yield from files
+        return
+
+    # Hand files to the workers in chunks so small files do not cost one round trip each
+    chunksize = max(1, len(files) // (options.parse_workers * 4))
+    with ProcessPoolExecutor(max_workers=options.parse_workers) as executor:
+        results = executor.map(
+            parse_content,
+            [markdown_file.content for markdown_file in files],
+            [options.cache_dir] * len(files),
+            chunksize=chunksize,
+        )
+        # The workers cannot report their phases, so waiting for them counts as parsing
+        for markdown_file in files:
+            with track_file(markdown_file.relative_path.as_posix()), phase(PARSE):
+                markdown_file.blocks = next(results)
+            yield markdown_file
+
+
+def read_title_at(path: Path, ref: str, relative_path: Path) -> str:
+    """Reads the title a markdown file had at an earlier commit"""
+    document = ingest.parse_document(changes.read_file_at(path, ref, relative_path).encode(), str(relative_path))
+    return get_title(relative_path, document.attributes)
+
+
+async def move_renamed_page(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    page_id: str,
+    immediate_parent_id: str,
+    markdown_file: MarkdownFile,
+) -> bool:
+    """Moves and retitles the page of a renamed file, returning whether it worked"""
+    renamed_from = cast(Path, markdown_file.renamed_from)
+    print(f"Moving page of {renamed_from} to {markdown_file.relative_path}")
+    try:
+        if renamed_from.parent != markdown_file.relative_path.parent:
+            await notion.move_notion_page(client, page_id, immediate_parent_id)
+        if markdown_file.previous_title != markdown_file.title:
+            await notion.rename_notion_page(client, page_id, markdown_file.title)
+    except notion_client.errors.APIResponseError as e:
+        logging.error(e)
+        return False
+    index.move(page_id, immediate_parent_id, markdown_file.title)
+    return True
+
+
+async def sync_file(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    immediate_parent_id: str | None,
+    markdown_file: MarkdownFile,
+    semaphore: asyncio.Semaphore,
+    manifest: SyncManifest,
+    cache: ParseCache | None = None,
+) -> None:
+    """Syncs a single markdown file to its page in Notion and records the result in the manifest"""
+    relative_path = markdown_file.relative_path
+    title = markdown_file.title
+
+    async with semaphore:
+        with track_file(relative_path.as_posix()):
+            print(f"Processing {relative_path}...")
+
+            # Go straight to the page synced last time, otherwise check if page exists under its immediate parent
+            page_id = markdown_file.page_id
+            if page_id is None and immediate_parent_id is not None:
+                page_id = index.get(immediate_parent_id, title)
+
+            block_ids = None
+            if markdown_file.renamed_from is not None:
+                previous_entry = manifest.get(markdown_file.renamed_from)
+                manifest.remove(markdown_file.renamed_from)
+                if previous_entry and not markdown_file.content_changed:
+                    block_ids = previous_entry.block_ids
+
+                if page_id and immediate_parent_id is not None:
+                    if not await move_renamed_page(client, index, page_id, immediate_parent_id, markdown_file):
+                        # Leave the old page alone and give the file a fresh page in its new place
+                        page_id = None
+                    elif not markdown_file.content_changed:
+                        manifest.record(
+                            relative_path, ManifestEntry(markdown_file.content_hash, title, page_id, block_ids)
+                        )
+                        return
+
+            created = False
+            if not page_id and immediate_parent_id is not None:
+
+                async def create_page() -> str | None:
+                    nonlocal created
+                    print(f"Creating new page: {title}")
+                    new_page = await notion.create_notion_page(
+                        client,
+                        cast(str, immediate_parent_id),
+                        title,
+                        markdown_file.content,
+                        cache=cache,
+                        blocks=markdown_file.blocks,
+                    )
+                    created = bool(new_page)
+                    return new_page["id"] if new_page else None
+
+                # Another file with the same title may be creating this page, in which case this one updates it
+                page_id = await index.get_or_create(immediate_parent_id, title, create_page)
+            if not page_id:
+                return
+
+            if not created:
+                print(f"Updating existing page: {title}")
+                block_ids = await notion.update_notion_page(
+                    client, page_id, markdown_file.content, cache=cache, blocks=markdown_file.blocks
+                )
+                if block_ids is None:
+                    # The stored page may have been deleted in Notion, so look the file up again on the next run
+                    manifest.remove(relative_path)
+                    return
+
+            manifest.record(relative_path, ManifestEntry(markdown_file.content_hash, title, page_id, block_ids))
+
+
+async def archive_deleted_file(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    parent_page_id: str,
+    deleted_file: DeletedFile,
+    semaphore: asyncio.Semaphore,
+    manifest: SyncManifest,
+) -> None:
+    """Archives the page of a markdown file that no longer exists"""
+    page_id = deleted_file.page_id
+    if page_id is None:
+        directory_id = find_directory_page(index, parent_page_id, deleted_file.relative_path.parent)
+        page_id = index.get(directory_id, deleted_file.title) if directory_id else None
+
+    if page_id is not None:
+        async with semaphore:
+            print(f"Archiving page of deleted file {deleted_file.relative_path}")
+            with track_file(deleted_file.relative_path.as_posix()):
+                archived = await notion.archive_notion_page(client, page_id)
+            if not archived:
+                return
+        index.remove(page_id)
+    manifest.remove(deleted_file.relative_path)
+
+
+async def archive_orphaned_page(
+    client: notion_client.AsyncClient, index: PageIndex, page_id: str, page_path: Path, semaphore: asyncio.Semaphore
+) -> None:
+    """Archives a page that has no markdown file or directory behind it any more"""
+    async with semaphore:
+        print(f"Archiving orphaned page {page_path}")
+        archived = await notion.archive_notion_page(client, page_id)
+    if archived:
+        index.remove(page_id)
+
+
+def list_local_files(path: Path, options: SyncOptions, markdown_files: list[Path]) -> list[Path]:
+    """
+    Returns the relative path of every markdown file below ``path`` that is synced.
+
+    ``markdown_files`` are the files considered for syncing, which are all of them unless only changes since a commit
+    were looked at.
+    """
+    if not options.since:
+        return markdown_files
+    finder = FileFinder(path, options.include, options.exclude, options.max_depth)
+    return [md_file.relative_to(path) for md_file in finder]
+
+
+def get_local_titles(
+    path: Path, relative_paths: list[Path], pending: list[MarkdownFile], manifest: SyncManifest
+) -> dict[Path, str]:
+    """
+    Works out the page title of every local markdown file.
+
+    Titles come from the files read for this sync, then from the manifest, and only files known to neither are read
+    again.
+    """
+    read_titles = {markdown_file.relative_path: markdown_file.title for markdown_file in pending}
+    titles = {}
+    for relative_path in relative_paths:
+        title = read_titles.get(relative_path)
+        if title is None:
+            entry = manifest.get(relative_path)
+            if entry:
+                title = entry.title
             else:
-                raise Exception(f"Failed to create new parent page: {page_title}")
+                md_file = path / relative_path
+                title = get_title(md_file, ingest.read_document(md_file).attributes)
+        titles[relative_path] = title
+    return titles
 
-    return current_parent_id
 
+def find_orphaned_pages(
+    index: PageIndex,
+    parent_page_id: str,
+    path: Path,
+    options: SyncOptions,
+    pending: list[MarkdownFile],
+    markdown_files: list[Path],
+    manifest: SyncManifest,
+) -> list[str]:
+    """Finds the pages ``--mirror`` archives, refusing to when no local markdown file was found at all"""
+    local_files = list_local_files(path, options, markdown_files)
+    if not local_files:
+        logging.warning("Not mirroring, since no markdown files were found below %s", path)
+        return []
+    titles = get_local_titles(path, local_files, pending, manifest)
+    page_ids = [entry.page_id for relative_path in local_files if (entry := manifest.get(relative_path))]
+    return mirror.find_orphaned_pages(index, parent_page_id, titles, page_ids)
 
-@click.command()
-@click.option("--token", "-t", type=str, help="Notion API token")
-@click.option("--parent-page-id", "-parentid", type=str, help="Notion parent page ID")
-@click.option(
-    "--path",
-    "-p",
-    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True, path_type=Path),
-    help="Path to the markdown files",
-)
-def main(token: str, parent_page_id: str, path: Path) -> None:
+
+def find_changed_files(
+    path: Path, options: SyncOptions, manifest: SyncManifest
+) -> tuple[list[MarkdownFile], dict[Path, changes.FileChange], list[DeletedFile], list[Path]]:
     """
-    Sync GitHub markdown files to Notion
+    Finds and reads the markdown files that changed since the last sync.
+
+    Every file is read once: it is hashed to tell whether it changed, and only a changed file is decoded and split
+    into front matter and content, from the same read.
+
+    Returns the changed files, the renames git reported, the deleted files and
+    every markdown file considered. Files left out by .gitignore, ``--include``, ``--exclude`` or ``--max-depth`` are
+    not considered.
     """
-    # Use rglob to recursively find all markdown files
-    markdown_files = list(Path(path).rglob("*.md"))
+    finder = FileFinder(path, options.include, options.exclude, options.max_depth)
+    renames: dict[Path, changes.FileChange] = {}
+    deleted_files = []
+    markdown_files: Iterable[Path]
+    if options.since:
+        # Ask git what changed instead of walking the whole tree
+        file_changes = [
+            change
+            for change in changes.get_changed_markdown_files(path, options.since)
+            if finder.is_selected(change.path)
+        ]
+        listed = {change.path for change in file_changes}
+        markdown_files = [path / change.path for change in file_changes if change.status != changes.DELETED]
+        # Files last synced by an older parser are synced again, even though git reports no change to them
+        markdown_files += [
+            path / outdated
+            for outdated in map(Path, manifest.get_outdated())
+            if outdated not in listed and (path / outdated).is_file() and finder.is_selected(outdated)
+        ]
+        for change in file_changes:
+            if change.status == changes.RENAMED:
+                renames[change.path] = change
+            elif change.status == changes.DELETED:
+                entry = manifest.get(change.path)
+                if entry:
+                    deleted_files.append(DeletedFile(change.path, entry.title, entry.page_id))
+                else:
+                    deleted_files.append(DeletedFile(change.path, read_title_at(path, options.since, change.path)))
+    else:
+        # Each file is hashed as soon as the walk finds it
+        markdown_files = finder
 
+    considered = []
+    changed_files = []
     for md_file in markdown_files:
+        considered.append(md_file)
         # Get relative path from source directory
         relative_path = md_file.relative_to(path)
 
-        # Read the markdown file
-        post = Frontmatter.read_file(md_file)
-        title = get_title(md_file, post)
-        content = get_content(md_file, post)
+        with ingest.open_file(md_file) as data:
+            content_hash = hash_content(data)
+            if relative_path not in renames and manifest.is_unchanged(relative_path, content_hash):
+                continue
+            with track_file(relative_path.as_posix()), phase(READ):
+                changed_files.append(read_markdown_file(md_file, relative_path, data, content_hash))
 
-        print(f"Processing {relative_path}...")
+    return changed_files, renames, deleted_files, considered
 
-        client = notion.get_notion_client(token)
 
-        # Process directory hierarchy and get the immediate parent page ID
-        immediate_parent_id = process_page_hierarchy(client, parent_page_id, relative_path)
+def collect_pending_files(
+    path: Path, options: SyncOptions, manifest: SyncManifest
+) -> tuple[list[MarkdownFile], list[DeletedFile], list[Path]]:
+    """
+    Works out which markdown files need syncing and which pages belong to deleted files.
 
-        # Check if page exists under its immediate parent
-        existing_page = notion.find_notion_page(client, title, parent_id=immediate_parent_id)
+    Also returns the relative paths of every markdown file considered.
+    """
+    with phase(DISCOVERY):
+        changed_files, renames, deleted_files, markdown_files = find_changed_files(path, options, manifest)
 
-        if existing_page:
-            print(f"Updating existing page: {title}")
-            notion.update_notion_page(client, existing_page["id"], content)
+    pending = []
+    for markdown_file in parse_markdown_files(changed_files, options):
+        relative_path = markdown_file.relative_path
+        rename = renames.get(relative_path)
+        if rename is not None and rename.old_path is not None:
+            # Renamed files keep their page, which is moved rather than recreated
+            markdown_file.renamed_from = rename.old_path
+            markdown_file.content_changed = rename.content_changed
+            entry = manifest.get(rename.old_path)
+            if entry:
+                markdown_file.page_id = entry.page_id
+                markdown_file.previous_title = entry.title
+            else:
+                markdown_file.previous_title = read_title_at(path, cast(str, options.since), rename.old_path)
         else:
-            print(f"Creating new page: {title}")
-            notion.create_notion_page(client, immediate_parent_id, title, content)
+            entry = manifest.get(relative_path)
+            # A new title means a different page, so only reuse the stored page while the title is the same
+            if entry and entry.title == markdown_file.title:
+                markdown_file.page_id = entry.page_id
+        pending.append(markdown_file)
+
+    return pending, deleted_files, [md_file.relative_to(path) for md_file in markdown_files]
+
+
+def get_indexed_paths(pending: list[MarkdownFile], deleted_files: list[DeletedFile]) -> list[Path]:
+    """
+    Returns the paths the index of the existing page tree is needed for: new files, files without a stored page and
+    renamed files at both their places, and deleted files without a stored page.
+    """
+    paths = []
+    for markdown_file in pending:
+        if markdown_file.page_id is None or markdown_file.renamed_from is not None:
+            paths.append(markdown_file.relative_path)
+        if markdown_file.page_id is None and markdown_file.renamed_from is not None:
+            paths.append(markdown_file.renamed_from)
+    return paths + [deleted_file.relative_path for deleted_file in deleted_files if deleted_file.page_id is None]
+
+
+def find_renamed_pages(index: PageIndex, parent_page_id: str, pending: list[MarkdownFile]) -> None:
+    """Finds the pages of renamed files the manifest does not know at their old place"""
+    for markdown_file in pending:
+        if markdown_file.page_id is None and markdown_file.renamed_from is not None:
+            directory_id = find_directory_page(index, parent_page_id, markdown_file.renamed_from.parent)
+            if directory_id:
+                markdown_file.page_id = index.get(directory_id, cast(str, markdown_file.previous_title))
+
+
+def report_stats(stats: RunStats, options: SyncOptions) -> None:
+    """Prints a one-line summary of the requests a run made and writes the detailed reports that were asked for"""
+    total = stats.total
+    print(
+        f"Made {total.calls} Notion requests, retried {total.retries}, waited {total.rate_limit_wait:.1f}s for the "
+        "rate limit"
+    )
+    if options.stats_path:
+        stats.write_json(options.stats_path)
+    if options.summary_path:
+        stats.append_markdown(options.summary_path)
+
+
+@dataclass
+class PendingRoot:
+    """A sync root with the files that need syncing, found before the run talks to Notion"""
+
+    root: SyncRoot
+    manifest: SyncManifest
+    pending: list[MarkdownFile]
+    deleted_files: list[DeletedFile]
+    markdown_files: list[Path]
+
+
+async def sync_path(token: str, parent_page_id: str, path: Path, options: SyncOptions | None = None) -> None:
+    """Syncs every new or changed markdown file below ``path``, working on several files at once"""
+    await sync_roots(token, [SyncRoot(path, parent_page_id)], options)
+
+
+async def sync_roots(token: str, roots: list[SyncRoot], options: SyncOptions | None = None) -> None:
+    """
+    Syncs several directories, each below its own parent page, in one run.
+
+    The roots share one client, and so one connection pool and one rate limit, as well as the page index, the parse
+    cache and the limit on files synced at once, so their files are scheduled together rather than one root after
+    another.
+    """
+    options = options or SyncOptions()
+    with profile_run(options.profile, options.profile_path):
+        await sync_changes(token, roots, options)
 
 
-def get_content(md_file: Path, post: dict) -> str:
-    content = post.get("body")
-    if not content:
-        with open(md_file, "r") as f:
-            content = f.read()
-    return content
+def collect_root(root: SyncRoot, options: SyncOptions, several: bool = False) -> PendingRoot:
+    """Loads the manifest of a root and works out which of its files need syncing"""
+    manifest = SyncManifest.load(root.manifest_path or options.manifest_path, root.parent_page_id)
+    pending, deleted_files, markdown_files = collect_pending_files(root.path, options, manifest)
+    where = f" in {root.path}" if several else ""
+    print(f"Syncing {len(pending)} of {len(markdown_files)} markdown files{where}...")
+    return PendingRoot(root, manifest, pending, deleted_files, markdown_files)
+
+
+async def sync_changes(token: str, roots: list[SyncRoot], options: SyncOptions) -> None:
+    """Syncs the markdown files below each root that changed since the last run and archives the deleted ones"""
+    pending_roots = [collect_root(root, options, len(roots) > 1) for root in roots]
+    pending_roots = [
+        pending_root
+        for pending_root in pending_roots
+        if pending_root.pending or pending_root.deleted_files or options.mirror
+    ]
+    if not pending_roots:
+        return
+
+    semaphore = asyncio.Semaphore(options.concurrency)
+    index = PageIndex()
+    cache = ParseCache(options.cache_dir)
+
+    stats = RunStats()
+    try:
+        # One client, and so one connection pool, serves hierarchy resolution, search and uploads for the whole run
+        async with notion.open_notion_client(
+            token, options.rate_limit, options.http_timeout, options.max_connections, stats=stats
+        ) as client:
+            await asyncio.gather(
+                *(sync_root(client, index, cache, semaphore, pending_root, options) for pending_root in pending_roots)
+            )
+    finally:
+        report_stats(stats, options)
+
+
+async def sync_root(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    cache: ParseCache,
+    semaphore: asyncio.Semaphore,
+    pending_root: PendingRoot,
+    options: SyncOptions,
+) -> None:
+    """Syncs the pending files of one root below its parent page, archiving the pages of deleted files"""
+    path, parent_page_id = pending_root.root.path, pending_root.root.parent_page_id
+    manifest, pending, deleted_files = pending_root.manifest, pending_root.pending, pending_root.deleted_files
+    # Files placed by path need their directory pages: new files, files without a stored page and renamed files
+    lookups = [
+        markdown_file.relative_path
+        for markdown_file in pending
+        if markdown_file.page_id is None or markdown_file.renamed_from is not None
+    ]
+
+    indexed_paths = get_indexed_paths(pending, deleted_files)
+    if options.mirror:
+        # Mirroring looks for orphans below the page of every local directory
+        indexed_paths += list_local_files(path, options, pending_root.markdown_files)
+    if indexed_paths:
+        with phase(LOOKUP):
+            # Index the pages of the directories involved once so lookups below are answered in memory
+            await load_directory_pages(client, index, parent_page_id, indexed_paths)
+            find_renamed_pages(index, parent_page_id, pending)
+
+    directory_ids: dict[Path, str] = {}
+    if lookups:
+        # Every directory page exists before any file is uploaded, so files only need a lookup in this map
+        with phase(HIERARCHY):
+            directory_ids = await resolve_directory_pages(client, index, parent_page_id, lookups, semaphore)
+
+    try:
+        await asyncio.gather(
+            *(
+                sync_file(
+                    client,
+                    index,
+                    directory_ids.get(markdown_file.relative_path.parent),
+                    markdown_file,
+                    semaphore,
+                    manifest,
+                    cache,
+                )
+                for markdown_file in pending
+            )
+        )
+        await asyncio.gather(
+            *(
+                archive_deleted_file(client, index, parent_page_id, deleted_file, semaphore, manifest)
+                for deleted_file in deleted_files
+            )
+        )
+        if options.mirror:
+            # The index now holds the pages of every local directory, including the pages created above
+            orphans = find_orphaned_pages(
+                index, parent_page_id, path, options, pending, pending_root.markdown_files, manifest
+            )
+            await asyncio.gather(
+                *(
+                    archive_orphaned_page(
+                        client, index, page_id, mirror.get_page_path(index, parent_page_id, page_id), semaphore
+                    )
+                    for page_id in orphans
+                )
+            )
+    finally:
+        # Keep whatever was synced, even if the run was cut short
+        manifest.save()
+
+
+async def plan_file(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    directory_ids: dict[Path, str],
+    markdown_file: MarkdownFile,
+    semaphore: asyncio.Semaphore,
+    cache: ParseCache,
+) -> plan.FilePlan:
+    """Works out what syncing a markdown file would do by diffing it against its page, if it has one"""
+    relative_path = markdown_file.relative_path
+    page_id = markdown_file.page_id
+    directory_id = directory_ids.get(relative_path.parent)
+    if page_id is None and directory_id is not None:
+        page_id = index.get(directory_id, markdown_file.title)
+
+    parsed = markdown_file.blocks if markdown_file.blocks is not None else cache.parse(markdown_file.content)
+    blocks = [block.to_notion() for block in parsed]
+    if page_id is None:
+        return plan.FilePlan(relative_path, plan.CREATE, plan.get_create_requests(blocks))
+
+    action = plan.UPDATE
+    requests: Counter[str] = Counter()
+    if markdown_file.renamed_from is not None:
+        action = plan.MOVE
+        requests["pages.move"] += markdown_file.renamed_from.parent != relative_path.parent
+        requests["pages.update"] += markdown_file.previous_title != markdown_file.title
+        if not markdown_file.content_changed:
+            return plan.FilePlan(relative_path, action, requests)
+
+    try:
+        async with semaphore:
+            remote_blocks = await notion.list_block_tree(client, page_id)
+    except notion_client.errors.APIResponseError as e:
+        # The stored page is gone, so the sync would fail to update it and create it again on the run after
+        logging.warning("Could not list the blocks of %s: %s", relative_path, e)
+        return plan.FilePlan(relative_path, plan.CREATE, plan.get_create_requests(blocks))
+
+    operations = diff_blocks(remote_blocks, blocks)
+    requests.update(plan.get_update_requests(remote_blocks, operations))
+    if action == plan.UPDATE and all(operation.kind == KEEP for operation in operations):
+        action = plan.UNCHANGED
+    return plan.FilePlan(relative_path, action, requests)
+
+
+async def plan_path(token: str, parent_page_id: str, path: Path, options: SyncOptions | None = None) -> plan.SyncPlan:
+    """
+    Works out what syncing ``path`` would do and prints it with the requests it would take, without changing anything
+    in Notion.
+
+    Files are discovered, parsed and diffed against their pages like in a sync, so the plan reads the page tree and
+    the blocks of every page that would be updated.
+    """
+    options = options or SyncOptions()
+    manifest = SyncManifest.load(options.manifest_path, parent_page_id)
+    pending, deleted_files, markdown_files = collect_pending_files(path, options, manifest)
+
+    sync_plan = plan.SyncPlan()
+    pending_paths = {markdown_file.relative_path for markdown_file in pending}
+    sync_plan.files += [
+        plan.FilePlan(relative_path, plan.UNCHANGED)
+        for relative_path in markdown_files
+        if relative_path not in pending_paths
+    ]
+
+    if pending or deleted_files or options.mirror:
+        semaphore = asyncio.Semaphore(options.concurrency)
+        index = PageIndex()
+        cache = ParseCache(options.cache_dir)
+        stats = RunStats()
+        async with notion.open_notion_client(
+            token, options.rate_limit, options.http_timeout, options.max_connections, stats=stats
+        ) as client:
+            indexed_paths = get_indexed_paths(pending, deleted_files)
+            if options.mirror:
+                indexed_paths += list_local_files(path, options, markdown_files)
+            if indexed_paths:
+                await load_directory_pages(client, index, parent_page_id, indexed_paths)
+                find_renamed_pages(index, parent_page_id, pending)
+                # The sync indexes the page tree with the same requests
+                sync_plan.shared_requests.update({name: calls.calls for name, calls in stats.endpoints.items()})
+
+            lookups = [
+                markdown_file.relative_path
+                for markdown_file in pending
+                if markdown_file.page_id is None or markdown_file.renamed_from is not None
+            ]
+            directory_ids, sync_plan.directories = find_directory_pages(index, parent_page_id, lookups)
+            sync_plan.shared_requests["pages.create"] += len(sync_plan.directories)
+
+            sync_plan.files += await asyncio.gather(
+                *(plan_file(client, index, directory_ids, markdown_file, semaphore, cache) for markdown_file in pending)
+            )
+
+        for deleted_file in deleted_files:
+            page_id = deleted_file.page_id
+            if page_id is None:
+                directory_id = find_directory_page(index, parent_page_id, deleted_file.relative_path.parent)
+                page_id = index.get(directory_id, deleted_file.title) if directory_id else None
+            if page_id is not None:
+                sync_plan.files.append(
+                    plan.FilePlan(deleted_file.relative_path, plan.ARCHIVE, Counter({"pages.update": 1}))
+                )
+                index.remove(page_id)
+
+        if options.mirror:
+            orphans = find_orphaned_pages(index, parent_page_id, path, options, pending, markdown_files, manifest)
+            sync_plan.orphans = [mirror.get_page_path(index, parent_page_id, page_id) for page_id in orphans]
+            sync_plan.shared_requests["pages.update"] += len(orphans)
+
+    print(sync_plan.to_text(options.rate_limit))
+    return sync_plan
+
+
+async def plan_roots(token: str, roots: list[SyncRoot], options: SyncOptions | None = None) -> list[plan.SyncPlan]:
+    """Works out what syncing each root would do, one root after another"""
+    options = options or SyncOptions()
+    plans = []
+    for root in roots:
+        if len(roots) > 1:
+            print(f"{root.path} -> {root.parent_page_id}")
+        root_options = replace(options, manifest_path=root.manifest_path or options.manifest_path)
+        plans.append(await plan_path(token, root.parent_page_id, root.path, root_options))
+    return plans
+
+
+def get_roots(
+    paths: tuple[Path, ...],
+    parent_page_ids: tuple[str, ...],
+    config_path: str | None,
+    manifest_path: Path | None,
+    mirror: bool,
+) -> list[SyncRoot]:
+    """Pairs every --path with its --parent-page-id and adds the roots of the config file"""
+    if len(paths) != len(parent_page_ids):
+        raise click.UsageError("Give one --parent-page-id for each --path")
+    roots = [SyncRoot(path, parent_page_id) for path, parent_page_id in zip(paths, parent_page_ids)]
+    # The Action passes an empty string when no config file was given
+    if config_path:
+        try:
+            roots += load_config(Path(config_path))
+        except ConfigError as e:
+            raise click.UsageError(str(e)) from e
+    if not roots:
+        raise click.UsageError("Give a --path and a --parent-page-id, or a --config file")
+
+    if mirror and len({root.parent_page_id for root in roots}) < len(roots):
+        # Each root would archive the pages of the others
+        raise click.UsageError("--mirror needs a different parent page for every path")
+    if manifest_path is not None and len(roots) > 1:
+        # One manifest describes one parent page, so roots without a manifest of their own get one next to it
+        for root in roots:
+            root.manifest_path = root.manifest_path or get_manifest_path(manifest_path, root)
+    return roots
+
+
+@click.command()
+@click.option("--token", "-t", type=str, help="Notion API token")
+@click.option(
+    "--parent-page-id",
+    "-parentid",
+    "parent_page_ids",
+    type=str,
+    multiple=True,
+    help="Notion parent page ID; give one for each --path, in the same order",
+)
+@click.option(
+    "--path",
+    "-p",
+    "paths",
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True, path_type=Path),
+    multiple=True,
+    help="Path to the markdown files. Can be given more than once to sync several directories in one run",
+)
+@click.option(
+    "--config",
+    "config_path",
+    type=click.Path(dir_okay=False),
+    help="TOML file listing more directories to sync in the same run, as [[roots]] tables with a path, a "
+    "parent_page_id and an optional manifest",
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    show_default=True,
+    help="Maximum number of markdown files synced at the same time",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_RATE_LIMIT,
+    show_default=True,
+    help="Maximum average number of Notion API requests per second",
+)
+@click.option(
+    "--http-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=notion.DEFAULT_HTTP_TIMEOUT,
+    show_default=True,
+    help="Seconds to wait for a Notion API response",
+)
+@click.option(
+    "--max-connections",
+    type=click.IntRange(min=1),
+    default=notion.DEFAULT_MAX_CONNECTIONS,
+    show_default=True,
+    help="Size of the keep-alive connection pool to the Notion API",
+)
+@click.option(
+    "--manifest",
+    "manifest_path",
+    type=click.Path(dir_okay=False),
+    help="JSON file recording what was synced; files unchanged since the last run are skipped",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Directory caching parsed markdown between runs, so unchanged content is not parsed again",
+)
+@click.option(
+    "--parse-workers",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Number of processes that parse markdown files before uploading; 0 parses each file as it is uploaded",
+)
+@click.option(
+    "--stats-file",
+    "stats_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="JSON file to write request counts, retries and latencies per Notion endpoint and per file to",
+)
+@click.option(
+    "--step-summary",
+    "summary_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    envvar="GITHUB_STEP_SUMMARY",
+    help="Markdown file to append a table of the run's Notion requests to; defaults to $GITHUB_STEP_SUMMARY",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print the time spent discovering, reading, parsing and uploading files, per phase and for the slowest files",
+)
+@click.option(
+    "--profile-output",
+    "profile_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also run the sync under cProfile and write its statistics to this .pstats file; implies --profile",
+)
+@click.option(
+    "--plan",
+    "dry_run",
+    is_flag=True,
+    help="Print which files would be created, updated, moved or archived and the requests and time it would take, "
+    "without changing anything in Notion",
+)
+@click.option(
+    "--include",
+    multiple=True,
+    help="Only sync markdown files matching this glob, relative to --path; a directory includes everything below it. "
+    "Can be given more than once",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    help="Skip files and directories matching this glob, relative to --path, besides those .gitignore files ignore. "
+    "Can be given more than once",
+)
+@click.option(
+    "--max-depth",
+    type=click.IntRange(min=0),
+    help="Only look this many directory levels below --path; 0 only syncs the files directly in it",
+)
+@click.option(
+    "--mirror",
+    is_flag=True,
+    help="After syncing, archive every page below --parent-page-id that no markdown file or directory accounts for, "
+    "including the pages of files left out by --include, --exclude or --max-depth",
+)
+@click.option(
+    "--since",
+    type=str,
+    help="Only sync markdown files changed since this git commit; renamed files move their page, deleted files "
+    "archive it",
+)
+def main(
+    token: str,
+    parent_page_ids: tuple[str, ...],
+    paths: tuple[Path, ...],
+    config_path: str | None,
+    concurrency: int,
+    rate_limit: float,
+    http_timeout: float,
+    max_connections: int,
+    manifest_path: str | None,
+    cache_dir: Path | None,
+    parse_workers: int,
+    stats_path: Path | None,
+    summary_path: Path | None,
+    profile: bool,
+    profile_path: Path | None,
+    dry_run: bool,
+    include: tuple[str, ...],
+    exclude: tuple[str, ...],
+    max_depth: int | None,
+    mirror: bool,
+    since: str | None,
+) -> None:
+    """
+    Sync GitHub markdown files to Notion
+    """
+    # The Action passes an empty string when no manifest was given
+    manifest = Path(manifest_path) if manifest_path else None
+    options = SyncOptions(
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        http_timeout=http_timeout,
+        max_connections=max_connections,
+        manifest_path=manifest,
+        cache_dir=cache_dir,
+        parse_workers=parse_workers,
+        # The Action passes an empty string when no commit was given
+        since=since or None,
+        include=include,
+        exclude=exclude,
+        max_depth=max_depth,
+        mirror=mirror,
+        stats_path=stats_path,
+        summary_path=summary_path,
+        profile=profile,
+        profile_path=profile_path,
+    )
+    roots = get_roots(paths, parent_page_ids, config_path, manifest, mirror)
+    try:
+        if dry_run:
+            asyncio.run(plan_roots(token, roots, options))
+        else:
+            asyncio.run(sync_roots(token, roots, options))
+    except changes.GitError as e:
+        raise click.ClickException(f"Could not list changed files: {e}") from e
 
 
-def get_title(md_file: Path, post: dict) -> str:
-    if post.get("attributes"):
-        return post.get("attributes", {}).get("title", md_file.stem)
+def get_title(md_file: Path, attributes: dict) -> str:
+    if attributes:
+        title = attributes.get("title", md_file.stem)
+        return md_file.stem if title is None else str(title)
     else:
         return " ".join(word.capitalize() for word in md_file.stem.replace("-", "_").split("_"))
 
@@ -0,0 +1,66 @@
+import hashlib
+import tomllib
+from dataclasses import dataclass
+from pathlib import Path
+
+
+class ConfigError(Exception):
+    """Raised when a config file cannot be read or describes no usable sync roots"""
+
+
+@dataclass
+class SyncRoot:
+    """A directory of markdown files and the Notion page it is synced below"""
+
+    path: Path
+    parent_page_id: str
+    # Where to keep the sync manifest of this root, if it has one of its own
+    manifest_path: Path | None = None
+
+
+def get_manifest_path(manifest_path: Path, root: SyncRoot) -> Path:
+    """
+    Returns a manifest path for one of several roots, next to the manifest path they were given together.
+
+    The name holds the parent page and a short hash of the root's path, since several roots may share a parent page.
+    """
+    path_hash = hashlib.sha256(root.path.as_posix().encode()).hexdigest()[:8]
+    return manifest_path.with_name(f"{manifest_path.stem}-{root.parent_page_id}-{path_hash}{manifest_path.suffix}")
+
+
+def load_config(path: Path) -> list[SyncRoot]:
+    """
+    Reads the sync roots from a TOML config file, with one ``[[roots]]`` table per directory:
+
+    .. code-block:: toml
+
+        [[roots]]
+        path = "docs/api"
+        parent_page_id = "..."
+        manifest = ".nogisync/api.json"  # optional
+
+    Relative paths are relative to the directory of the config file.
+    """
+    try:
+        data = tomllib.loads(path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+        raise ConfigError(f"Could not read {path}: {e}") from e
+
+    tables = data.get("roots")
+    if not isinstance(tables, list) or not tables:
+        raise ConfigError(f"{path} has no [[roots]]")
+
+    roots = []
+    for number, table in enumerate(tables, 1):
+        table = table if isinstance(table, dict) else {}
+        root_path, parent_page_id, manifest = table.get("path"), table.get("parent_page_id"), table.get("manifest")
+        if not isinstance(root_path, str) or not isinstance(parent_page_id, str) or not root_path or not parent_page_id:
+            raise ConfigError(f"Root {number} in {path} needs a path and a parent_page_id")
+        if manifest is not None and not isinstance(manifest, str):
+            raise ConfigError(f"The manifest of root {number} in {path} should be a path")
+
+        directory = (path.parent / root_path).resolve()
+        if not directory.is_dir():
+            raise ConfigError(f"Root {number} in {path}: {directory} is not a directory")
+        roots.append(SyncRoot(directory, parent_page_id, path.parent / manifest if manifest else None))
+    return roots
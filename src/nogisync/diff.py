@@ -0,0 +1,231 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import cast
+
+KEEP = "keep"
+UPDATE = "update"
+DELETE = "delete"
+INSERT = "insert"
+
+DEFAULT_ANNOTATIONS = {
+    "bold": False,
+    "italic": False,
+    "strikethrough": False,
+    "underline": False,
+    "code": False,
+    "color": "default",
+}
+
+# Blocks that hold other pages rather than content of this page. The diff never touches them.
+NESTED_PAGE_TYPES = {"child_page", "child_database"}
+
+# Block types whose content can be changed in place with a single blocks.update call
+UPDATABLE_TYPES = {
+    "paragraph",
+    "heading_1",
+    "heading_2",
+    "heading_3",
+    "quote",
+    "bulleted_list_item",
+    "numbered_list_item",
+    "to_do",
+    "code",
+    "equation",
+    "table_row",
+}
+
+# Settings two tables must share for the rows of one to be turned into the rows of the other
+TABLE_SETTINGS = ("table_width", "has_column_header", "has_row_header")
+
+
+@dataclass
+class BlockOperation:
+    """One step of turning the remote block list into the local one, in document order"""
+
+    kind: str
+    # The remote block kept, updated or deleted
+    block_id: str | None = None
+    # The new blocks to insert, or the single new content of an updated block
+    blocks: list[dict] = field(default_factory=list)
+    # The operations on the children of an updated block, which take the place of updating its own content
+    children: list["BlockOperation"] = field(default_factory=list)
+
+
+def normalize_rich_text(rich_text: list[dict]) -> list:
+    """
+    Reduces rich text to what is visible, so parsed and remote text compare equal.
+
+    Remote rich text carries defaults and extra keys the parser leaves out, and Notion may merge neighbouring runs
+    with the same formatting, so runs are compared with default annotations filled in and neighbours merged.
+    """
+    runs: list[list] = []
+    for item in rich_text:
+        if item.get("type") == "equation":
+            runs.append(["equation", item.get("equation", {}).get("expression")])
+            continue
+
+        text = item.get("text", {})
+        link = (text.get("link") or {}).get("url")
+        annotations = {**DEFAULT_ANNOTATIONS, **item.get("annotations", {})}
+        content = text.get("content", "")
+        if runs and runs[-1][0] == "text" and runs[-1][2] == link and runs[-1][3] == annotations:
+            runs[-1][1] += content
+        else:
+            runs.append(["text", content, link, annotations])
+    return runs
+
+
+def has_children(block: dict) -> bool:
+    return bool(block.get("has_children") or block.get(block.get("type", ""), {}).get("children"))
+
+
+def has_unlisted_children(block: dict) -> bool:
+    """Returns whether a remote block has children that were not listed along with it, so its content is unknown"""
+    return bool(block.get("has_children")) and "children" not in block.get(block.get("type", ""), {})
+
+
+def block_fingerprint(block: dict) -> str:
+    """Hashes the type and normalized content of a parsed or remote block, including the blocks nested in it"""
+    block_type = block.get("type", "")
+    payload = block.get(block_type, {})
+    content: dict = {
+        "type": block_type,
+        "rich_text": normalize_rich_text(payload.get("rich_text", [])),
+        "caption": normalize_rich_text(payload.get("caption", [])),
+        "children": [block_fingerprint(child) for child in payload.get("children", [])],
+    }
+    for key in ("language", "expression", "checked", *TABLE_SETTINGS):
+        if key in payload:
+            content[key] = payload[key]
+    if "external" in payload:
+        content["url"] = payload["external"].get("url")
+    if "cells" in payload:
+        content["cells"] = [normalize_rich_text(cell) for cell in payload["cells"]]
+
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def get_update_payload(block: dict) -> dict:
+    """Returns the keyword arguments for blocks.update that give a block the content of ``block``"""
+    block_type = block["type"]
+    return {block_type: {key: value for key, value in block[block_type].items() if key != "children"}}
+
+
+def can_update(remote_block: dict, block: dict) -> bool:
+    return (
+        remote_block.get("type") == block.get("type")
+        and block.get("type") in UPDATABLE_TYPES
+        and not has_children(remote_block)
+        and not has_children(block)
+    )
+
+
+def diff_table_rows(remote_block: dict, block: dict) -> list[BlockOperation] | None:
+    """
+    Works out the operations that turn the rows of a remote table into the rows of ``block``.
+
+    Returns ``None`` when the table has to be replaced instead: when it is not a table of the same shape, when its
+    rows were not listed, or when none of its rows would stay, since Notion keeps no table without rows.
+    """
+    if remote_block.get("type") != "table" or block.get("type") != "table" or has_unlisted_children(remote_block):
+        return None
+    remote_table, table = remote_block["table"], block["table"]
+    if any(remote_table.get(key) != table.get(key) for key in TABLE_SETTINGS):
+        return None
+    operations = diff_blocks(remote_table.get("children", []), table.get("children", []))
+    if not any(operation.kind in (KEEP, UPDATE) for operation in operations):
+        return None
+    return operations
+
+
+def diff_blocks(remote_blocks: list[dict], blocks: list[dict]) -> list[BlockOperation]:
+    """
+    Works out the operations that turn the remote children of a page into ``blocks``.
+
+    Blocks are matched on their fingerprint with a longest-common-subsequence diff. Matching blocks are kept,
+    replaced runs of the same types are updated in place, tables of the same shape row by row, and everything else
+    is deleted or inserted after the block before it. Blocks with children match when their children were listed
+    along with them (see :func:`nogisync.notion.list_block_tree`), otherwise they are always replaced.
+    """
+    remote_blocks = [block for block in remote_blocks if block.get("type") not in NESTED_PAGE_TYPES]
+    # Blocks whose children are unknown get a fingerprint nothing else shares, so they are always replaced
+    remote_keys = [
+        f"remote:{block['id']}" if has_unlisted_children(block) else block_fingerprint(block) for block in remote_blocks
+    ]
+    local_keys = [block_fingerprint(block) for block in blocks]
+
+    operations: list[BlockOperation] = []
+    # The local content of every remote block that stays, in case it has to be inserted again after all
+    remaining: dict[str, dict] = {}
+    matcher = SequenceMatcher(a=remote_keys, b=local_keys, autojunk=False)
+    for tag, remote_start, remote_end, local_start, local_end in matcher.get_opcodes():
+        remote_run = remote_blocks[remote_start:remote_end]
+        local_run = blocks[local_start:local_end]
+
+        if tag == "equal":
+            operations.extend(BlockOperation(KEEP, block["id"]) for block in remote_run)
+            remaining.update((remote_block["id"], block) for remote_block, block in zip(remote_run, local_run))
+            continue
+
+        updated = 0
+        if tag == "replace":
+            # Update pairs of blocks in place for as long as their types line up, and tables row by row
+            for remote_block, block in zip(remote_run, local_run):
+                if can_update(remote_block, block):
+                    operations.append(BlockOperation(UPDATE, remote_block["id"], [block]))
+                elif (rows := diff_table_rows(remote_block, block)) is not None:
+                    operations.append(BlockOperation(UPDATE, remote_block["id"], [block], rows))
+                else:
+                    break
+                remaining[remote_block["id"]] = block
+                updated += 1
+
+        operations.extend(BlockOperation(DELETE, block["id"]) for block in remote_run[updated:])
+        if local_run[updated:]:
+            operations.append(BlockOperation(INSERT, blocks=local_run[updated:]))
+
+    return anchor_leading_insert(operations, remaining)
+
+
+def get_anchor(operations: list[BlockOperation]) -> str | None:
+    """
+    Returns the deleted block that new blocks in front of the first remaining block are inserted after, if any.
+
+    Notion can only insert after an existing block or at the end of the page, so blocks that go in front of every
+    block that stays follow the last block deleted before them, which is only deleted once they are in.
+    """
+    first_remaining = next((i for i, op in enumerate(operations) if op.kind in (KEEP, UPDATE)), None)
+    if first_remaining is None or not any(op.kind == INSERT for op in operations[:first_remaining]):
+        return None
+    return next((op.block_id for op in reversed(operations[:first_remaining]) if op.kind == DELETE), None)
+
+
+def anchor_leading_insert(operations: list[BlockOperation], remaining: dict[str, dict]) -> list[BlockOperation]:
+    """
+    Makes sure new blocks in front of the first remaining block have a deleted block to be inserted after.
+
+    When nothing is deleted before them, the remaining blocks up to the first deleted block are deleted and inserted
+    again along with them, after that block. Only when nothing at all is deleted is the whole page rewritten.
+    """
+    first_insert = next((i for i, op in enumerate(operations) if op.kind == INSERT), None)
+    first_remaining = next((i for i, op in enumerate(operations) if op.kind in (KEEP, UPDATE)), None)
+    if first_insert is None or first_remaining is None or first_remaining < first_insert:
+        return operations
+    if any(op.kind == DELETE for op in operations[:first_insert]):
+        return operations
+
+    anchor = next((i for i, op in enumerate(operations) if op.kind == DELETE), len(operations))
+    leading = operations[:anchor]
+    # The inserted blocks that directly follow the anchor go right after the leading run
+    end = anchor + 1
+    while end < len(operations) and operations[end].kind == INSERT:
+        end += 1
+    inserted = [
+        block
+        for op in leading + operations[anchor + 1 : end]
+        for block in (op.blocks if op.kind == INSERT else [remaining[cast(str, op.block_id)]])
+    ]
+    deleted = [BlockOperation(DELETE, op.block_id) for op in leading if op.kind != INSERT]
+    return deleted + operations[anchor : anchor + 1] + [BlockOperation(INSERT, blocks=inserted)] + operations[end:]
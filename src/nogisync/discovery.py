@@ -0,0 +1,225 @@
+import logging
+import os
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+GITIGNORE = ".gitignore"
+MARKDOWN_SUFFIX = ".md"
+# Directories that never hold files to sync, skipped whether or not a .gitignore mentions them
+SKIPPED_DIRECTORIES = {".git"}
+
+
+def translate_glob(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regular expression over ``/`` separated paths.
+
+    ``*`` and ``?`` stay within one path segment, ``**/`` matches any number of directories, a trailing ``/**``
+    matches everything below a directory, and a backslash escapes the character after it.
+    """
+    parts = []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if pattern.startswith("**/", position) and (position == 0 or pattern[position - 1] == "/"):
+            parts.append("(?:.*/)?")
+            position += 3
+            continue
+        if pattern.startswith("/**", position) and position + 3 == len(pattern):
+            parts.append("/.*")
+            break
+        if char == "*":
+            # Any other run of asterisks is a regular asterisk
+            while position < len(pattern) and pattern[position] == "*":
+                position += 1
+            parts.append("[^/]*")
+            continue
+        if char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[position + 2 :]:
+            end = pattern.index("]", position + 2)
+            members = pattern[position + 1 : end]
+            if members.startswith("!"):
+                members = "^" + members[1:]
+            parts.append("[" + members.replace("\\", "\\\\") + "]")
+            position = end
+        elif char == "\\" and position + 1 < len(pattern):
+            position += 1
+            parts.append(re.escape(pattern[position]))
+        else:
+            parts.append(re.escape(char))
+        position += 1
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """A pattern from a .gitignore file or an --include/--exclude glob, with the directory it is relative to"""
+
+    regex: re.Pattern[str]
+    # The directory the pattern was written in, as a path prefix ending in ``/``, or empty for the top
+    base: str = ""
+    negated: bool = False
+    directory_only: bool = False
+
+    @classmethod
+    def parse(cls, pattern: str, base: str = "") -> "IgnoreRule | None":
+        """Parses one line of a .gitignore file, returning None for blank lines and comments"""
+        pattern = pattern.rstrip("\n\r")
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip(" ")
+        if not pattern or pattern.startswith("#"):
+            return None
+
+        negated = pattern.startswith("!")
+        if negated:
+            pattern = pattern[1:]
+        directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return None
+
+        # A pattern without a slash matches at any depth, one with a slash only relative to where it was written
+        anchored = "/" in pattern
+        regex = translate_glob(pattern.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        return cls(re.compile(regex), base, negated, directory_only)
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        return path.startswith(self.base) and self.regex.fullmatch(path, len(self.base)) is not None
+
+
+def parse_rules(lines: Iterable[str], base: str = "") -> list[IgnoreRule]:
+    return [rule for line in lines if (rule := IgnoreRule.parse(line, base)) is not None]
+
+
+def match_rules(rules: list[IgnoreRule], path: str, is_dir: bool) -> bool:
+    """Returns whether ``rules`` match ``path``, where the last rule that matches decides, like in a .gitignore"""
+    for rule in reversed(rules):
+        if rule.matches(path, is_dir):
+            return not rule.negated
+    return False
+
+
+def read_gitignore(directory: Path, base: str) -> list[IgnoreRule]:
+    try:
+        text = (directory / GITIGNORE).read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return []
+    return parse_rules(text.splitlines(), base)
+
+
+def find_git_root(directory: Path) -> Path | None:
+    """Returns the top of the git work tree ``directory`` is in, if it is in one"""
+    for candidate in (directory, *directory.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+class FileFinder:
+    """
+    Finds the markdown files to sync below ``root``.
+
+    Directories are walked with ``os.scandir`` and files are yielded as they are found. A directory that is ignored by
+    a .gitignore file, excluded or deeper than ``max_depth`` is skipped without reading what is inside it, so vendored
+    trees such as ``node_modules`` cost one directory entry each. The .gitignore files of the root's parent
+    directories up to the top of the git work tree count as well. Symbolic links to directories are not followed.
+
+    ``include`` and ``exclude`` are globs relative to the root, written like .gitignore patterns: a pattern without a
+    slash matches a name at any depth, and a pattern matching a directory matches everything below it. With
+    ``include``, only the markdown files matching one of its patterns are synced.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        max_depth: int | None = None,
+    ):
+        self.root = root
+        self.include = parse_rules(include)
+        self.exclude = parse_rules(exclude)
+        self.max_depth = max_depth
+
+        # .gitignore patterns are matched against paths relative to the top of the work tree, as git does
+        resolved = Path(root).resolve()
+        top = find_git_root(resolved) or resolved
+        self.prefix = "" if top == resolved else resolved.relative_to(top).as_posix() + "/"
+        self.outer_rules: list[IgnoreRule] = []
+        for directory in reversed(resolved.relative_to(top).parents):
+            # From the top of the work tree down to the root's parent
+            self.outer_rules += read_gitignore(top / directory, "" if directory == Path(".") else f"{directory}/")
+        # Rules of each directory below the root, for checking single paths
+        self._rules: dict[PurePosixPath, list[IgnoreRule]] = {}
+
+    def __iter__(self) -> Iterator[Path]:
+        return self._walk(self.root, "", 0, self.outer_rules, not self.include)
+
+    def _walk(
+        self, directory: Path, relative: str, depth: int, rules: list[IgnoreRule], included: bool
+    ) -> Iterator[Path]:
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError as e:
+            logging.warning("Skipping unreadable directory %s: %s", directory, e)
+            return
+
+        if any(entry.name == GITIGNORE for entry in entries):
+            rules = rules + read_gitignore(directory, self.prefix + relative)
+
+        for entry in entries:
+            path = relative + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in SKIPPED_DIRECTORIES or (self.max_depth is not None and depth >= self.max_depth):
+                    continue
+                if match_rules(rules, self.prefix + path, True) or match_rules(self.exclude, path, True):
+                    continue
+                yield from self._walk(
+                    Path(entry.path), path + "/", depth + 1, rules, included or match_rules(self.include, path, True)
+                )
+            elif entry.name.endswith(MARKDOWN_SUFFIX) and entry.is_file():
+                if match_rules(rules, self.prefix + path, False) or match_rules(self.exclude, path, False):
+                    continue
+                if included or match_rules(self.include, path, False):
+                    yield Path(entry.path)
+
+    def _get_rules(self, directory: PurePosixPath) -> list[IgnoreRule]:
+        """Returns the .gitignore rules that apply inside ``directory``, relative to the root"""
+        rules = self._rules.get(directory)
+        if rules is None:
+            if directory == PurePosixPath("."):
+                rules = self.outer_rules + read_gitignore(self.root, self.prefix)
+            else:
+                rules = self._get_rules(directory.parent) + read_gitignore(
+                    self.root / directory, f"{self.prefix}{directory}/"
+                )
+            self._rules[directory] = rules
+        return rules
+
+    def is_selected(self, relative_path: Path) -> bool:
+        """
+        Returns whether the walk would find the file at ``relative_path``, for files that are known without walking,
+        such as those git reports as changed
+        """
+        path = PurePosixPath(relative_path.as_posix())
+        if self.max_depth is not None and len(path.parts) - 1 > self.max_depth:
+            return False
+
+        included = not self.include
+        for directory in reversed(path.parents[:-1]):
+            rules = self._get_rules(directory.parent)
+            if match_rules(rules, f"{self.prefix}{directory}", True) or match_rules(self.exclude, str(directory), True):
+                return False
+            included = included or match_rules(self.include, str(directory), True)
+
+        rules = self._get_rules(path.parent)
+        if match_rules(rules, f"{self.prefix}{path}", False) or match_rules(self.exclude, str(path), False):
+            return False
+        return included or match_rules(self.include, str(path), False)
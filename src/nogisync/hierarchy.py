@@ -0,0 +1,140 @@
+import asyncio
+from collections.abc import Iterable
+from contextlib import nullcontext
+from pathlib import Path
+from typing import cast
+
+import notion_client
+
+from nogisync import notion
+from nogisync.index import PageIndex
+
+
+def get_directory_title(name: str) -> str:
+    """Converts a directory name to title case (e.g., "foo_lives_here" -> "Foo Lives Here")"""
+    return " ".join(word.capitalize() for word in name.replace("-", "_").split("_"))
+
+
+def plan_directories(relative_paths: Iterable[Path]) -> list[list[Path]]:
+    """
+    Collects every directory the given markdown files live in, grouped by depth.
+
+    The first level holds the directories directly below the sync root, the next level their sub-directories and so
+    on, so that every directory comes after its parent.
+    """
+    directories = {parent for relative_path in relative_paths for parent in relative_path.parents}
+    directories.discard(Path("."))
+
+    levels: dict[int, list[Path]] = {}
+    for directory in sorted(directories):
+        levels.setdefault(len(directory.parts), []).append(directory)
+    return [levels[depth] for depth in sorted(levels)]
+
+
+async def load_directory_pages(
+    client: notion_client.AsyncClient, index: PageIndex, base_parent_id: str, relative_paths: Iterable[Path]
+) -> None:
+    """
+    Indexes the pages below ``base_parent_id`` that the given files and their directories could be found at.
+
+    The walk lists the children of the root and then, level by level, of the pages that match a directory the files
+    live in, so it takes one request per existing directory page. File pages and pages no local directory accounts
+    for are indexed but never listed, since nothing the sync looks up or mirrors lives below them.
+    """
+    subdirectories: dict[Path, list[Path]] = {}
+    for level in plan_directories(relative_paths):
+        for directory in level:
+            subdirectories.setdefault(directory.parent, []).append(directory)
+
+    # Maps each page to list to the directories it stands for, since directories that share a title share a page
+    pages_to_list = {base_parent_id: [Path(".")]}
+    while pages_to_list:
+        child_pages = await asyncio.gather(*(notion.list_child_pages(client, page_id) for page_id in pages_to_list))
+        next_pages: dict[str, list[Path]] = {}
+        for (parent_id, directories), pages in zip(pages_to_list.items(), child_pages):
+            with_children = set()
+            for page in pages:
+                index.add(parent_id, page["child_page"]["title"], page["id"])
+                # Pages without any blocks cannot have sub-pages, so there is nothing below them to list
+                if page.get("has_children"):
+                    with_children.add(page["id"])
+            for directory in directories:
+                for subdirectory in subdirectories.get(directory, []):
+                    page_id = index.get(parent_id, get_directory_title(subdirectory.name))
+                    if page_id is not None and page_id in with_children:
+                        next_pages.setdefault(page_id, []).append(subdirectory)
+        pages_to_list = next_pages
+
+
+def find_directory_page(index: PageIndex, base_parent_id: str, directory: Path) -> str | None:
+    """Looks up the page of an existing directory in the index without creating anything"""
+    page_id: str | None = base_parent_id
+    for part in directory.parts:
+        page_id = index.get(page_id, get_directory_title(part)) if page_id else None
+    return page_id
+
+
+def find_directory_pages(
+    index: PageIndex, base_parent_id: str, relative_paths: Iterable[Path]
+) -> tuple[dict[Path, str], list[Path]]:
+    """
+    Looks up the page of every directory the given files live in without creating anything.
+
+    Returns the pages of the directories that exist, and the directories whose page would have to be created, with
+    one directory for each page when several would share it.
+    """
+    page_ids = {Path("."): base_parent_id}
+    missing: dict[tuple[str, str], Path] = {}
+    for level in plan_directories(relative_paths):
+        for directory in level:
+            key = (page_ids[directory.parent], get_directory_title(directory.name))
+            page_id = index.get(*key)
+            # Pages yet to be created get a stand-in ID so their sub-directories are also found missing
+            page_ids[directory] = page_id or f"new:{missing.setdefault(key, directory)}"
+    existing = {directory: page_id for directory, page_id in page_ids.items() if not page_id.startswith("new:")}
+    return existing, list(missing.values())
+
+
+async def resolve_directory_page(
+    client: notion_client.AsyncClient, index: PageIndex, parent_id: str, title: str
+) -> str:
+    """Finds or creates the page for a single directory under its parent"""
+
+    async def create() -> str:
+        new_page = await notion.create_notion_page(client, parent_id, title, "")
+        if not new_page:
+            raise Exception(f"Failed to create new parent page: {title}")
+        return new_page["id"]
+
+    return cast(str, await index.get_or_create(parent_id, title, create))
+
+
+async def resolve_directory_pages(
+    client: notion_client.AsyncClient,
+    index: PageIndex,
+    base_parent_id: str,
+    relative_paths: Iterable[Path],
+    semaphore: asyncio.Semaphore | None = None,
+) -> dict[Path, str]:
+    """
+    Resolves or creates the page of every directory the given files live in and maps each directory to its page ID.
+
+    Each directory is resolved exactly once. Directories of the same depth are resolved concurrently, and a level
+    only starts once the level above it exists.
+    """
+    directory_ids = {Path("."): base_parent_id}
+
+    async def resolve(parent_id: str, title: str) -> str:
+        async with semaphore or nullcontext():
+            return await resolve_directory_page(client, index, parent_id, title)
+
+    for level in plan_directories(relative_paths):
+        # Directories whose names only differ in separators share a title, so they also share a page
+        keys = {
+            directory: (directory_ids[directory.parent], get_directory_title(directory.name)) for directory in level
+        }
+        unique_keys = list(dict.fromkeys(keys.values()))
+        page_ids = dict(zip(unique_keys, await asyncio.gather(*(resolve(*key) for key in unique_keys))))
+        directory_ids.update((directory, page_ids[key]) for directory, key in keys.items())
+
+    return directory_ids
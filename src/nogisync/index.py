@@ -0,0 +1,82 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Iterator
+
+
+class PageIndex:
+    """
+    In-memory index of the Notion page tree below the sync root.
+
+    Pages are keyed by ``(parent_id, title)``, the same way the sync lays them out, so looking up a directory or a
+    file page costs no request. The index is loaded once per run by listing the pages of the local directories
+    (see :func:`nogisync.hierarchy.load_directory_pages`) and is kept up to date as the sync creates pages. Every
+    page is remembered with its place in the tree, including pages that share a title with an earlier sibling and so
+    cannot be looked up by it.
+    """
+
+    def __init__(self) -> None:
+        self._page_ids: dict[tuple[str, str], str] = {}
+        self._locations: dict[str, tuple[str, str]] = {}
+        # Pages being created, so that concurrent syncs wait for a page instead of creating it a second time
+        self._creating: dict[tuple[str, str], asyncio.Task[str | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._page_ids)
+
+    def get(self, parent_id: str, title: str) -> str | None:
+        """Returns the ID of the page called ``title`` directly below ``parent_id``"""
+        return self._page_ids.get((parent_id, title))
+
+    def add(self, parent_id: str, title: str, page_id: str) -> None:
+        """Records a page, keeping the first one seen when a parent has several pages with the same title"""
+        self._page_ids.setdefault((parent_id, title), page_id)
+        self._locations[page_id] = (parent_id, title)
+
+    async def get_or_create(
+        self, parent_id: str, title: str, create: Callable[[], Awaitable[str | None]]
+    ) -> str | None:
+        """
+        Returns the ID of the page called ``title`` directly below ``parent_id``, calling ``create`` if there is none.
+
+        While a page is being created, further calls for it wait for that page rather than creating another, even
+        when they come from other roots synced below the same parent. ``create`` returns the ID of the new page, or
+        ``None`` if it could not be created.
+        """
+        page_id = self.get(parent_id, title)
+        if page_id is not None:
+            return page_id
+
+        key = (parent_id, title)
+        task = self._creating.get(key)
+        if task is None:
+            task = self._creating[key] = asyncio.ensure_future(self._create(parent_id, title, create))
+        # The creation goes on for the other callers if this one is cancelled
+        return await asyncio.shield(task)
+
+    async def _create(self, parent_id: str, title: str, create: Callable[[], Awaitable[str | None]]) -> str | None:
+        try:
+            page_id = await create()
+            if page_id is not None:
+                self.add(parent_id, title, page_id)
+            return page_id
+        finally:
+            del self._creating[(parent_id, title)]
+
+    def remove(self, page_id: str) -> None:
+        """Forgets a page, e.g. after it was archived or before it is moved"""
+        location = self._locations.pop(page_id, None)
+        if location is not None and self._page_ids.get(location) == page_id:
+            del self._page_ids[location]
+
+    def get_location(self, page_id: str) -> tuple[str, str] | None:
+        """Returns the parent and the title of a page"""
+        return self._locations.get(page_id)
+
+    def pages(self) -> Iterator[tuple[str, str, str]]:
+        """Yields the ID, parent and title of every page in the index, duplicates included"""
+        for page_id, (parent_id, title) in self._locations.items():
+            yield page_id, parent_id, title
+
+    def move(self, page_id: str, parent_id: str, title: str) -> None:
+        """Records that a page now lives below ``parent_id`` under ``title``"""
+        self.remove(page_id)
+        self.add(parent_id, title, page_id)
@@ -0,0 +1,159 @@
+import codecs
+import logging
+import mmap
+import os
+import tomllib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+
+# Files at least this large are mapped into memory instead of being copied into a buffer
+MMAP_THRESHOLD = 1024 * 1024
+# Byte order marks and the encodings they stand for; the UTF-32 LE mark starts with the UTF-16 LE one, so it goes first
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# Encoding of files that have no byte order mark and are not valid UTF-8, as saved by older Windows editors
+FALLBACK_ENCODING = "cp1252"
+YAML_DELIMITER = b"---"
+TOML_DELIMITER = b"+++"
+WHITESPACE = b" \t\r\n"
+# The C loader is much faster, but only there when PyYAML was built against libyaml
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+Data = bytes | mmap.mmap
+
+
+@dataclass
+class Document:
+    """The front matter attributes and the body of a markdown file"""
+
+    content: str
+    attributes: dict = field(default_factory=dict)
+
+
+@contextmanager
+def open_file(path: Path) -> Iterator[Data]:
+    """Reads a file once, mapping it into memory instead of copying it when it is large"""
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < max(MMAP_THRESHOLD, 1):
+            yield file.read()
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def detect_encoding(data: Data) -> tuple[str, int]:
+    """Returns the encoding of a file from its byte order mark, and the length of the mark"""
+    for bom, encoding in BOMS:
+        if data[: len(bom)] == bom:
+            return encoding, len(bom)
+    return "utf-8", 0
+
+
+def decode(data: Data, encoding: str, start: int = 0, end: int | None = None, name: str = "") -> str:
+    """Decodes part of ``data`` straight from the buffer, without copying the bytes first"""
+    with memoryview(data) as view, view[start:end] as part:
+        try:
+            return str(part, encoding)
+        except UnicodeDecodeError as e:
+            logging.warning("%s is not valid %s (%s), reading it as %s", name, encoding, e, FALLBACK_ENCODING)
+            return str(part, FALLBACK_ENCODING, "replace")
+
+
+def find_line_end(data: Data, position: int) -> int:
+    """Returns where the line that ``position`` is on ends, after its line break"""
+    end = data.find(b"\n", position)
+    return len(data) if end == -1 else end + 1
+
+
+def find_front_matter(data: Data, start: int = 0) -> tuple[bytes, int, int, int] | None:
+    """
+    Finds front matter at the very top of a file: a line of ``---`` for YAML or ``+++`` for TOML, the front matter and
+    the same line again.
+
+    Returns the delimiter, where the front matter starts and ends, and where the body starts after the blank lines
+    below the front matter, or None if the file has no front matter.
+    """
+    delimiter = bytes(data[start : start + 3])
+    if delimiter not in (YAML_DELIMITER, TOML_DELIMITER):
+        return None
+    front_matter_start = find_line_end(data, start)
+    if data[start + 3 : front_matter_start].strip():
+        return None
+
+    position = front_matter_start
+    while position < len(data):
+        if data[position : position + 3] != delimiter:
+            position = data.find(b"\n" + delimiter, position)
+            if position == -1:
+                return None
+            position += 1
+        body_start = find_line_end(data, position)
+        if not data[position + 3 : body_start].strip():
+            while body_start < len(data) and data[body_start] in WHITESPACE:
+                body_start += 1
+            return delimiter, front_matter_start, position, body_start
+        position = body_start
+    return None
+
+
+def parse_front_matter(text: str, delimiter: bytes, name: str = "") -> dict | None:
+    """
+    Parses YAML or TOML front matter, returning None if it is unreadable or not a mapping, since then it is more
+    likely content between two horizontal rules
+    """
+    try:
+        attributes = tomllib.loads(text) if delimiter == TOML_DELIMITER else yaml.load(text, Loader=YamlLoader)
+    except (yaml.YAMLError, tomllib.TOMLDecodeError) as e:
+        logging.warning("Reading what looks like front matter in %s as content: %s", name, e)
+        return None
+    if attributes is None:
+        # Nothing between the delimiters
+        return {}
+    return attributes if isinstance(attributes, dict) else None
+
+
+def parse_document(data: Data, name: str = "") -> Document:
+    """
+    Splits the front matter off the content of a markdown file and parses it.
+
+    The encoding is taken from the byte order mark, and files without one are read as UTF-8. Front matter is found on
+    the raw bytes, so the body is decoded once, straight from the file's buffer, and files without front matter are
+    never handed to a YAML parser. Line breaks are normalized to ``\\n``.
+    """
+    encoding, start = detect_encoding(data)
+    if encoding != "utf-8":
+        # Front matter is looked for in UTF-8, so the rare files in wider encodings are converted first
+        data = decode(data, encoding, start, name=name).encode()
+        start = 0
+
+    attributes: dict = {}
+    body_start = start
+    front_matter = find_front_matter(data, start)
+    if front_matter is not None:
+        delimiter, front_matter_start, front_matter_end, end = front_matter
+        text = decode(data, "utf-8", front_matter_start, front_matter_end, name)
+        parsed = parse_front_matter(text, delimiter, name)
+        if parsed is not None:
+            # Front matter that is not a mapping stays in the body, with the lines around it
+            attributes, body_start = parsed, end
+
+    content = decode(data, "utf-8", body_start, name=name)
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return Document(content, attributes)
+
+
+def read_document(path: Path) -> Document:
+    """Reads a markdown file and splits off its front matter"""
+    with open_file(path) as data:
+        return parse_document(data, str(path))
@@ -0,0 +1,96 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from pathlib import Path, PurePath
+
+from nogisync.markdown import PARSER_VERSION
+
+MANIFEST_VERSION = 1
+
+
+def hash_content(data: bytes | mmap.mmap) -> str:
+    """Returns the SHA-256 hex digest used to detect changed markdown files"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """What was synced for one markdown file during the last successful run"""
+
+    content_hash: str
+    title: str
+    page_id: str
+    # IDs of the blocks written by the last update, or None when they are not known (e.g. for newly created pages)
+    block_ids: list[str] | None = None
+    # The parser that produced the blocks; files parsed by an older parser are synced again even if unchanged
+    parser_version: int | None = PARSER_VERSION
+
+
+class SyncManifest:
+    """
+    Sync state kept between runs in a JSON file, keyed by the path of each markdown file relative to the sync root.
+
+    The file is small and self-contained so it can be restored and saved with ``actions/cache``. A manifest written
+    for a different parent page, or by an incompatible version, is ignored and the run starts from scratch.
+    """
+
+    def __init__(self, path: Path | None, parent_page_id: str, entries: dict[str, ManifestEntry] | None = None):
+        self.path = path
+        self.parent_page_id = parent_page_id
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: Path | None, parent_page_id: str) -> "SyncManifest":
+        """Loads the manifest at ``path``, starting empty if there is none or it cannot be used"""
+        if path is None or not path.exists():
+            return cls(path, parent_page_id)
+
+        try:
+            data = json.loads(path.read_text())
+            if data.get("version") != MANIFEST_VERSION or data.get("parent_page_id") != parent_page_id:
+                return cls(path, parent_page_id)
+            # Entries written before parser versions were recorded count as parsed by an older parser
+            entries = {
+                key: ManifestEntry(**{"parser_version": None, **entry}) for key, entry in data.get("files", {}).items()
+            }
+        except (ValueError, TypeError, AttributeError) as e:
+            logging.warning("Ignoring unreadable sync manifest %s: %s", path, e)
+            return cls(path, parent_page_id)
+        return cls(path, parent_page_id, entries)
+
+    def get(self, relative_path: PurePath) -> ManifestEntry | None:
+        return self.entries.get(relative_path.as_posix())
+
+    def is_unchanged(self, relative_path: PurePath, content_hash: str) -> bool:
+        """Returns whether the file was synced before with exactly this content, parsed by the current parser"""
+        entry = self.get(relative_path)
+        return entry is not None and entry.content_hash == content_hash and entry.parser_version == PARSER_VERSION
+
+    def get_outdated(self) -> list[PurePath]:
+        """Returns the files that were last synced with blocks from an older parser"""
+        return [PurePath(key) for key, entry in self.entries.items() if entry.parser_version != PARSER_VERSION]
+
+    def record(self, relative_path: PurePath, entry: ManifestEntry) -> None:
+        self.entries[relative_path.as_posix()] = entry
+
+    def remove(self, relative_path: PurePath) -> None:
+        self.entries.pop(relative_path.as_posix(), None)
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so an interrupted run never leaves a truncated file behind"""
+        if self.path is None:
+            return
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "parent_page_id": self.parent_page_id,
+            "files": {key: dataclasses.asdict(entry) for key, entry in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        os.replace(tmp_path, self.path)
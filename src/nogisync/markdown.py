@@ -1,24 +1,29 @@
 import re
+import unicodedata
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import cast
+
+from nogisync.blocks import LIST_ITEM_TYPES, PLAIN, Annotations, Block, EquationRun, RichText, TextRun, get_annotations
 
 NOTION_CONTENT_MAX_LENGTH = 2000
 
+# Bump whenever the blocks produced for the same markdown change, so cached parse results are not reused
+PARSER_VERSION = 2
 
-def replace_part(parts, pattern, replace_function) -> list:
-    # Process italic matches
-    new_text_parts = []
-    for part in parts:
-        if isinstance(part, str):
-            matches = list(re.finditer(pattern, part))
-            prev_end = 0
-            for match in matches:
-                if prev_end != match.start():
-                    new_text_parts.append(part[prev_end : match.start()])
-                new_text_parts.append(replace_function(match))
-                prev_end = match.end()
-            new_text_parts.append(part[prev_end:])
-        else:
-            new_text_parts.append(part)
-    return new_text_parts
+# Characters that may start inline markup. Everything between them is copied as plain text in one slice.
+INLINE_SPECIAL_PATTERN = re.compile(r"[`$~*_\[\]]")
+BACKTICK_RUN_PATTERN = re.compile(r"`+")
+DELIMITER_RUN_PATTERN = re.compile(r"\*+|_+|~+")
+# Pipes between table cells; a pipe escaped as ``\|`` belongs to the cell
+TABLE_CELL_SEPARATOR_PATTERN = re.compile(r"(?<!\\)\|")
+# Cells of the row below a table's header, such as ``---``, ``:---`` or ``:---:``
+TABLE_DELIMITER_CELL_PATTERN = re.compile(r":?-+:?")
+
+# Annotations switched on by each emphasis delimiter; strikethrough uses single or double tildes alike
+STRONG = "bold"
+EMPHASIS = "italic"
+STRIKETHROUGH = "strikethrough"
 
 
 def replace_content_that_is_too_long(content) -> str:
@@ -27,203 +32,256 @@ def replace_content_that_is_too_long(content) -> str:
     return content
 
 
+@dataclass(slots=True)
+class Delimiter:
+    """A run of ``*``, ``_`` or ``~`` that may open or close emphasis"""
+
+    char: str
+    count: int
+    can_open: bool
+    can_close: bool
+    # Annotations this run opens or closes once matched, in the order they were matched
+    opens: list[str] = field(default_factory=list)
+    closes: list[str] = field(default_factory=list)
+
+
+def is_punctuation(char: str) -> bool:
+    return unicodedata.category(char)[0] in "PS"
+
+
+def get_delimiter(text: str, start: int, end: int) -> Delimiter:
+    """Classifies a delimiter run by the characters around it, following the CommonMark flanking rules"""
+    char = text[start]
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    left_flanking = not after.isspace() and (not is_punctuation(after) or before.isspace() or is_punctuation(before))
+    right_flanking = not before.isspace() and (not is_punctuation(before) or after.isspace() or is_punctuation(after))
+    if char == "_":
+        # Underscores inside words, as in snake_case, are never emphasis
+        can_open = left_flanking and (not right_flanking or is_punctuation(before))
+        can_close = right_flanking and (not left_flanking or is_punctuation(after))
+    else:
+        can_open, can_close = left_flanking, right_flanking
+    return Delimiter(char, end - start, can_open, can_close)
+
+
+def match_delimiters(delimiters: list[Delimiter]) -> None:
+    """
+    Pairs up emphasis delimiters, innermost first.
+
+    Each closer looks back for the nearest opener of the same character. When it finds none, the stack height is
+    remembered for that character so later closers do not search the same openers again, which keeps text with many
+    unmatched delimiters linear.
+    """
+    stack: list[Delimiter] = []
+    openers_bottom: dict[str, int] = {}
+    for delimiter in delimiters:
+        while delimiter.can_close and delimiter.count:
+            bottom = min(openers_bottom.get(delimiter.char, 0), len(stack))
+            position = next((i for i in range(len(stack) - 1, bottom - 1, -1) if stack[i].char == delimiter.char), None)
+            if position is None:
+                openers_bottom[delimiter.char] = len(stack)
+                break
+
+            opener = stack[position]
+            if delimiter.char == "~":
+                used, annotation = min(opener.count, delimiter.count), STRIKETHROUGH
+            elif opener.count >= 2 and delimiter.count >= 2:
+                used, annotation = 2, STRONG
+            else:
+                used, annotation = 1, EMPHASIS
+            opener.count -= used
+            delimiter.count -= used
+            opener.opens.append(annotation)
+            delimiter.closes.append(annotation)
+
+            # Delimiters between a matched pair can no longer be matched and stay plain text
+            del stack[position + 1 :]
+            if not opener.count:
+                stack.pop()
+
+        if delimiter.can_open and delimiter.count:
+            stack.append(delimiter)
+
+
+def tokenize_inline(text: str) -> list[tuple]:
+    """
+    Splits a line into plain text, code spans, equations, link boundaries and emphasis delimiters in a single pass.
+
+    Code spans and equations are literal, so markup inside them is left alone. Emphasis inside a link is matched as
+    soon as the link closes, so it never pairs with delimiters outside the link.
+    """
+    tokens: list[tuple] = []
+    delimiters: list[Delimiter] = []
+    # Open brackets as (token index, number of delimiters before the bracket)
+    brackets: list[tuple[int, int]] = []
+    # Once a closing marker is missing after some position, it is missing after every later one too
+    missing_from: dict[str, int] = {}
+
+    def find(marker: str, start: int) -> int:
+        if start >= missing_from.get(marker, len(text) + 1):
+            return -1
+        position = text.find(marker, start)
+        if position == -1:
+            missing_from[marker] = start
+        return position
+
+    position = 0
+    while position < len(text):
+        match = INLINE_SPECIAL_PATTERN.search(text, position)
+        if not match:
+            tokens.append(("text", text[position:]))
+            break
+        start = match.start()
+        if start > position:
+            tokens.append(("text", text[position:start]))
+
+        char = text[start]
+        if char == "`":
+            run = cast(re.Match, BACKTICK_RUN_PATTERN.match(text, start)).group()
+            end = find(run, start + len(run))
+            if end == -1:
+                tokens.append(("text", run))
+                position = start + len(run)
+            else:
+                tokens.append(("code", text[start + len(run) : end]))
+                position = end + len(run)
+        elif char == "$":
+            end = find("$", start + 1)
+            if end == -1 or end == start + 1:
+                tokens.append(("text", "$" if end == -1 else "$$"))
+                position = start + 1 if end == -1 else end + 1
+            else:
+                tokens.append(("equation", text[start + 1 : end]))
+                position = end + 1
+        elif char == "[":
+            brackets.append((len(tokens), len(delimiters)))
+            tokens.append(("text", "["))
+            position = start + 1
+        elif char == "]":
+            end = find(")", start + 2) if text.startswith("(", start + 1) else -1
+            if brackets and end > start + 2:
+                opener, delimiters_before = brackets.pop()
+                tokens[opener] = ("link_open", text[start + 2 : end])
+                tokens.append(("link_close", None))
+                match_delimiters(delimiters[delimiters_before:])
+                del delimiters[delimiters_before:]
+                # Links cannot contain other links
+                brackets.clear()
+                position = end + 1
+            else:
+                tokens.append(("text", "]"))
+                position = start + 1
+        else:
+            end = cast(re.Match, DELIMITER_RUN_PATTERN.match(text, start)).end()
+            delimiter = get_delimiter(text, start, end)
+            delimiters.append(delimiter)
+            tokens.append(("delimiter", delimiter))
+            position = end
+
+    match_delimiters(delimiters)
+    return tokens
+
+
+def get_text_run(content: str, annotations: Annotations, link: str | None) -> TextRun:
+    if link is None and annotations is PLAIN:
+        return TextRun(content)
+    return TextRun(replace_content_that_is_too_long(content), annotations, link)
+
+
+def get_rich_text(text) -> list[RichText]:
+    """
+    Process inline formatting in Markdown text into rich text runs.
+    """
+    rich_text: list[RichText] = []
+    active = {STRONG: 0, EMPHASIS: 0, STRIKETHROUGH: 0}
+    link = None
+    # Text of the run being built, joined once the run ends; adding to one string would copy it every time
+    pending: list[str] = []
+
+    def annotations(code: bool = False) -> Annotations:
+        return get_annotations(active[STRONG] > 0, active[EMPHASIS] > 0, active[STRIKETHROUGH] > 0, code)
+
+    def flush() -> None:
+        if pending:
+            rich_text.append(get_text_run("".join(pending), annotations(), link))
+            pending.clear()
+
+    for kind, value in tokenize_inline(text):
+        if kind == "text":
+            pending.append(value)
+        elif kind == "delimiter":
+            if value.closes:
+                flush()
+                for annotation in value.closes:
+                    active[annotation] -= 1
+            # Unmatched characters of a closer follow the emphasis it closed, those of an opener precede it
+            if value.count:
+                pending.append(value.char * value.count)
+            if value.opens:
+                flush()
+                for annotation in value.opens:
+                    active[annotation] += 1
+        elif kind == "code":
+            flush()
+            rich_text.append(get_text_run(value, annotations(code=True), link))
+        elif kind == "equation":
+            flush()
+            rich_text.append(EquationRun(value))
+        elif kind == "link_open":
+            flush()
+            link = value
+        elif kind == "link_close":
+            flush()
+            link = None
+    flush()
+    return rich_text
+
+
 def process_inline_formatting(text) -> list[dict]:
     """
     Process inline formatting in Markdown text and convert it to Notion rich text formatting.
     """
+    return [run.to_notion() for run in get_rich_text(text)]
 
-    # Regular expressions for bold and italic markdown
-    code_pattern = r"`(.+?)`"
-    bold_pattern = r"(\*\*(.+?)\*\*)|(__(.+?)__)"
-    overline_pattern = r"\~(.+?)\~"
-    inline_katex_pattern = r"\$(.+?)\$"
-    italic_pattern = r"(\*(.+?)\*)|(_(.+?)_)"
-    link_pattern = r"\[(.+?)\]\((.+?)\)"
-    bold_italic_pattern = r"(__\*(.+?)\*__)|(\*\*_(.+?)_\*\*)"
-
-    def replace_katex(match) -> dict:
-        return {"type": "equation", "equation": {"expression": match.group(1)}}
-
-    def replace_bolditalic(match) -> dict:
-        content = match.group(2) or match.group(4)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": None},
-            "annotations": {
-                "bold": True,
-                "italic": True,
-                "strikethrough": False,
-                "underline": False,
-                "code": False,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": None,
-        }
-
-    # Replace markdown with Notion rich text formatting
-    def replace_code(match) -> dict:
-        content = match.group(1)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": None},
-            "annotations": {
-                "bold": False,
-                "italic": False,
-                "strikethrough": False,
-                "underline": False,
-                "code": True,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": None,
-        }
-
-    # Replace markdown with Notion rich text formatting
-    def replace_overline(match) -> dict:
-        content = match.group(1)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": None},
-            "annotations": {
-                "bold": False,
-                "italic": False,
-                "strikethrough": True,
-                "underline": False,
-                "code": False,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": None,
-        }
-
-    # Replace markdown with Notion rich text formatting
-    def replace_bold(match) -> dict:
-        content = match.group(2) or match.group(4)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": None},
-            "annotations": {
-                "bold": True,
-                "italic": False,
-                "strikethrough": False,
-                "underline": False,
-                "code": False,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": None,
-        }
-
-    def replace_italic(match) -> dict:
-        content = match.group(2) or match.group(4)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": None},
-            "annotations": {
-                "bold": False,
-                "italic": True,
-                "strikethrough": False,
-                "underline": False,
-                "code": False,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": None,
-        }
-
-    def replace_link(match) -> dict:
-        content = match.group(1)
-        content = replace_content_that_is_too_long(content)
-        return {
-            "type": "text",
-            "text": {"content": content, "link": {"url": match.group(2)}},
-            "annotations": {
-                "bold": False,
-                "italic": False,
-                "strikethrough": False,
-                "underline": False,
-                "code": False,
-                "color": "default",
-            },
-            "plain_text": content,
-            "href": match.group(2),
-        }
-
-    # Apply the replacements for bold and italic formatting
-    text_parts = []
-
-    # Process bold italic matches
-    matches = list(re.finditer(bold_italic_pattern, text))
-    prev_end = 0
-    for match in matches:
-        if prev_end != match.start():
-            text_parts.append(text[prev_end : match.start()])
-        text_parts.append(replace_bolditalic(match))
-        prev_end = match.end()
-    text_parts.append(text[prev_end:])
-
-    text_parts = replace_part(text_parts, bold_pattern, replace_bold)
-    text_parts = replace_part(text_parts, italic_pattern, replace_italic)
-    text_parts = replace_part(text_parts, inline_katex_pattern, replace_katex)
-    text_parts = replace_part(text_parts, overline_pattern, replace_overline)
-    text_parts = replace_part(text_parts, code_pattern, replace_code)
-    text_parts = replace_part(text_parts, link_pattern, replace_link)
-
-    # Remove empty strings from the list and return the processed text parts
-    return [
-        ({"type": "text", "text": {"content": part}} if isinstance(part, str) else part)
-        for part in text_parts
-        if part != ""
-    ]
-
-
-# katex
-def convert_markdown_table_to_latex(text) -> str:
-    split_column = text.split("\n")
-    has_header = False
-    # Check if the second line is a delimiter
-    if re.match(r"\|\s*-+\s*\|", split_column[1]):
-        # Remove the delimiter line
-        split_column.pop(1)
-        has_header = True
-    table_content = ""
-    for i, row in enumerate(split_column):
-        modified_content = re.findall(r"(?<=\|).*?(?=\|)", row)
-        new_text = ""
-        for j, cell in enumerate(modified_content):
-            cell_text = f"\\textsf{{{cell.strip()}}}"
-            if i == 0 and has_header:
-                cell_content = process_inline_formatting(cell.strip())[0]["text"]["content"]
-                cell_text = f"\\textsf{{\\textbf{{{cell_content}}}}}"
-            if j == len(modified_content) - 1:
-                cell_text += " \\\\\\hline\n"
-            else:
-                cell_text += " & "
-            new_text += cell_text
-        table_content += new_text
 
-    count_column = len(split_column[0].split("|"))
+def split_table_row(line: str) -> list[str] | None:
+    """
+    Splits a table row such as ``| a | b |`` into its cells, or returns None if the line is not a table row.
+    """
+    if not line.startswith("|") or TABLE_CELL_SEPARATOR_PATTERN.search(line, 1) is None:
+        return None
+    cells = TABLE_CELL_SEPARATOR_PATTERN.split(line.rstrip()[1:])
+    if not cells[-1]:
+        # The pipe closing the row
+        cells.pop()
+    return [cell.strip().replace("\\|", "|") for cell in cells]
 
-    table_column = "|c" * count_column
-    add_table = f"\\def\\arraystretch{{1.4}}\\begin{{array}}{{{table_column}|}}\\hline\n{table_content}\\end{{array}}"
 
-    return add_table
+def is_table_delimiter(cells: list[str]) -> bool:
+    return all(TABLE_DELIMITER_CELL_PATTERN.fullmatch(cell) for cell in cells)
 
 
-def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
+def get_table_row(cells: list[str], table_width: int) -> Block:
     """
-    Parse Markdown text and convert it into a list of Notion blocks.
+    Converts the cells of a table row into a ``table_row`` block. Notion needs every row to be as wide as the table,
+    so missing cells are added empty and extra cells are dropped.
+    """
+    cells = cells[:table_width] + [""] * (table_width - len(cells))
+    return Block("table_row", cells=[get_rich_text(cell) for cell in cells])
+
+
+def iter_markdown_blocks(markdown) -> Iterator[Block]:
+    """
+    Parse Markdown text and yield its top-level blocks as soon as they are complete.
+
+    A block is complete once the parser has moved past it and no later line can still nest below it, so callers can
+    start uploading the first blocks of a document while the rest is being parsed.
 
     :param markdown: The Markdown text to be parsed.
     :type markdown: str
-    :return: A list of Notion blocks representing the parsed Markdown content.
-    :rtype: list
+    :return: An iterator over the blocks representing the parsed Markdown content.
+    :rtype: Iterator
     """
 
     # Detect code blocks enclosed within triple backticks
@@ -263,51 +321,51 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
     markdown = latex_block_pattern.sub(replace_latex_blocks, markdown)
 
     lines = markdown.split("\n")
-    blocks: list[dict] = []
+    blocks: list[Block] = []
 
-    # Initialize variables to keep track of the current table
-    current_table: list[str] = []
-    in_table = False
+    # The table being read and its rows, added to the blocks once a line that is not a table row ends it
+    table: Block | None = None
+    table_rows: list[Block] = []
+    table_width = 0
 
     current_indent = 0
     stack = [blocks]
 
     indented_code_accumulator = []
     for line in lines:
-        # Check if the line is a table row (e.g., "| Header 1 | Header 2 |" or "| Content 1 | Content 2 |")
-        is_table_row = re.match(r"\|\s*[^-|]+\s*\|", line)
-        # Check if the line is a table delimiter (e.g., "|---|---|")
-        is_table_delimiter = re.match(r"\|\s*[-]+\s*\|\s*[-]+\s*\|", line)
-
-        # If we find table row or delimiter, add the line to the current table
-        if is_table_row or is_table_delimiter:
-            current_table.append(line)
-            in_table = True
-            continue
-        elif in_table and (not is_table_row and not is_table_delimiter):
-            # If we find a non-table line and we're in a table, end the current table
-            in_table = False
-            # Process the current table
-            table_str = "\n".join(current_table)
-            # katex
-            latex_table = convert_markdown_table_to_latex(table_str)
-            # Create Notion equation block with LaTeX table expression
-            equation_block = {"type": "equation", "equation": {"expression": latex_table}}
-            blocks.append(equation_block)
-            # Reset the current table
-            current_table = []
+        # Only the last top-level block can still gain nested list items, and only while no list is open below it
+        if len(stack) == 1 and len(blocks) > 1:
+            yield from blocks[:-1]
+            del blocks[:-1]
+
+        # Table rows (e.g., "| Header 1 | Header 2 |"), and the delimiter row below the header (e.g., "|---|:---:|")
+        cells = split_table_row(line)
+        if cells is not None and is_table_delimiter(cells):
+            if table is not None:
+                # Only the delimiter right below the first row makes that row the header
+                if len(table_rows) == 1:
+                    table.has_column_header = True
+                continue
+            # A delimiter without a row above it is not a table
+            cells = None
+        if cells is not None:
+            if table is None:
+                # The first row sets the width of the table
+                table_width, table_rows = len(cells), []
+                table = Block("table", children=table_rows, table_width=table_width, has_column_header=False)
+            table_rows.append(get_table_row(cells, table_width))
             continue
+        if table is not None:
+            # The line after a table ends it and is parsed like any other line
+            blocks.append(table)
+            table = None
 
         list_match = re.match(numbered_list_pattern_nested, line)
         if list_match:
             indent = len(list_match.group(1))
             line = line[len(list_match.group(0)) :]
 
-            item = {
-                "object": "block",
-                "type": "numbered_list_item",
-                "numbered_list_item": {"rich_text": process_inline_formatting(line)},
-            }
+            item = Block("numbered_list_item", get_rich_text(line))
 
             while indent < current_indent:
                 # If the indentation is less than the current level, go back one level in the stack
@@ -319,20 +377,16 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
                 stack[-1].append(item)
             else:  # indent > current_indent
                 # Nested item, add it as a child of the previous item
-                previous_parent = stack[-1][-1]
-                if "bulleted_list_item" in previous_parent:
-                    previous_parent_list_item_type = "bulleted_list_item"
-                elif "numbered_list_item" in previous_parent:
-                    previous_parent_list_item_type = "numbered_list_item"
-                else:
-                    raise ValueError("Previous parent is not a list item")
-
-                if "children" not in previous_parent[previous_parent_list_item_type]:
-                    previous_parent[previous_parent_list_item_type]["children"] = []
-                previous_parent[previous_parent_list_item_type]["children"].append(item)
-                stack.append(
-                    previous_parent[previous_parent_list_item_type]["children"]
-                )  # Add a new level to the stack
+                previous_parent = stack[-1][-1] if stack[-1] else None
+                if previous_parent is None or previous_parent.type not in LIST_ITEM_TYPES:
+                    # An indented item with no list item above it starts a list of its own
+                    stack[-1].append(item)
+                    continue
+
+                if previous_parent.children is None:
+                    previous_parent.children = []
+                previous_parent.children.append(item)
+                stack.append(previous_parent.children)  # Add a new level to the stack
                 current_indent += 1
 
             continue
@@ -342,11 +396,7 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
             indent = len(list_match.group(1))
             line = line[len(list_match.group(0)) :]
 
-            item = {
-                "object": "block",
-                "type": "bulleted_list_item",
-                "bulleted_list_item": {"rich_text": process_inline_formatting(line)},
-            }
+            item = Block("bulleted_list_item", get_rich_text(line))
 
             while indent < current_indent:
                 # If the indentation is less than the current level, go back one level in the stack
@@ -358,24 +408,25 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
                 stack[-1].append(item)
             else:  # indent > current_indent
                 # Nested item, add it as a child of the previous item
-                previous_parent = stack[-1][-1]
-                if "bulleted_list_item" in previous_parent:
-                    previous_parent_list_item_type = "bulleted_list_item"
-                elif "numbered_list_item" in previous_parent:
-                    previous_parent_list_item_type = "numbered_list_item"
-                else:
-                    raise ValueError("Previous parent is not a list item")
-
-                if "children" not in previous_parent[previous_parent_list_item_type]:
-                    previous_parent[previous_parent_list_item_type]["children"] = []
-                previous_parent[previous_parent_list_item_type]["children"].append(item)
-                stack.append(
-                    previous_parent[previous_parent_list_item_type]["children"]
-                )  # Add a new level to the stack
+                previous_parent = stack[-1][-1] if stack[-1] else None
+                if previous_parent is None or previous_parent.type not in LIST_ITEM_TYPES:
+                    # An indented item with no list item above it starts a list of its own
+                    stack[-1].append(item)
+                    continue
+
+                if previous_parent.children is None:
+                    previous_parent.children = []
+                previous_parent.children.append(item)
+                stack.append(previous_parent.children)  # Add a new level to the stack
                 current_indent += 1
 
             continue
 
+        # Any other non-empty line ends the open list, so later items start a new list instead of nesting in it
+        if line.strip() and len(stack) > 1:
+            del stack[1:]
+            current_indent = 0
+
         if line.startswith("    "):  # Check if the line is indented
             indented_code_accumulator.append(line[4:])  # Remove the leading spaces
             continue
@@ -383,16 +434,7 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
             if indented_code_accumulator:  # Check if there are accumulated lines
                 code_block = "\n".join(indented_code_accumulator)
                 blocks.append(
-                    {
-                        "object": "block",
-                        "type": "code",
-                        "code": {
-                            "language": "plain text",
-                            "rich_text": [
-                                {"type": "text", "text": {"content": replace_content_that_is_too_long(code_block)}}
-                            ],
-                        },
-                    }
+                    Block("code", [TextRun(replace_content_that_is_too_long(code_block))], language="plain text")
                 )
                 # Clear the accumulator
                 indented_code_accumulator = []
@@ -407,95 +449,58 @@ def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
             content = re.sub(heading_pattern, "", line)
             if 1 <= heading_level <= 3:
                 block_type = f"heading_{heading_level}"
-                blocks.append(
-                    {
-                        "object": "block",
-                        "type": block_type,
-                        block_type: {"rich_text": process_inline_formatting(content)},
-                    }
-                )
+                blocks.append(Block(block_type, get_rich_text(content)))
 
         # Check for horizontal line and create divider blocks
         elif re.match(horizontal_line_pattern, line):
-            blocks.append({"divider": {}, "type": "divider"})
+            blocks.append(Block("divider"))
 
         # Check for blockquote and create blockquote blocks
         elif blockquote_match:
-            blocks.append(
-                {
-                    "object": "block",
-                    "type": "quote",
-                    "quote": {"rich_text": process_inline_formatting(blockquote_match.group(1))},
-                }
-            )
+            blocks.append(Block("quote", get_rich_text(blockquote_match.group(1))))
 
         # Check for code blocks and create code blocks
         elif line.startswith("CODE_BLOCK_"):
             code_block_index = int(line[len("CODE_BLOCK_") :])
             language, code_block = code_blocks[code_block_index]
-            blocks.append(
-                {
-                    "object": "block",
-                    "type": "code",
-                    "code": {
-                        "language": language,
-                        "rich_text": [
-                            {"type": "text", "text": {"content": replace_content_that_is_too_long(code_block)}}
-                        ],
-                    },
-                }
-            )
+            blocks.append(Block("code", [TextRun(replace_content_that_is_too_long(code_block))], language=language))
 
         # Check for katex blocks
         elif line.startswith("LATEX_BLOCK_"):
             latex_block_index = int(line[len("LATEX_BLOCK_") :])
             latex_content = latex_blocks[latex_block_index]
-            blocks.append({"type": "equation", "equation": {"expression": latex_content}})
+            blocks.append(Block("equation", expression=latex_content))
 
         # Image blocks
         elif image_match:
-            block: dict = {
-                "object": "block",
-                "type": "image",
-                "image": {
-                    "external": {
-                        "url": image_match.group(2),
-                    }
-                },
-            }
-            caption = image_match.group(1)
-            if caption:
-                block["image"]["caption"] = [{"type": "text", "text": {"content": caption, "link": None}}]
-            blocks.append(block)
+            blocks.append(Block("image", url=image_match.group(2), caption=image_match.group(1) or None))
 
         # Create paragraph blocks for other lines
         elif line.strip():
-            blocks.append(
-                {"object": "block", "type": "paragraph", "paragraph": {"rich_text": process_inline_formatting(line)}}
-            )
+            blocks.append(Block("paragraph", get_rich_text(line)))
 
-    # If there's an unfinished table at the end of the lines, process it
-    if in_table:
-        table_str = "\n".join(current_table)
-        latex_table = convert_markdown_table_to_latex(table_str)
-        equation_block = {"type": "equation", "equation": {"expression": latex_table}}
-        blocks.append(equation_block)
+    # If there's an unfinished table at the end of the lines, add it
+    if table is not None:
+        blocks.append(table)
 
     # Add any remaining indented lines as a code block
     if indented_code_accumulator:
         code_block = "\n".join(indented_code_accumulator)
-        blocks.append(
-            {
-                "object": "block",
-                "type": "code",
-                "code": {
-                    "language": "plain text",
-                    "rich_text": [{"type": "text", "text": {"content": replace_content_that_is_too_long(code_block)}}],
-                },
-            }
-        )
+        blocks.append(Block("code", [TextRun(replace_content_that_is_too_long(code_block))], language="plain text"))
+
+    yield from blocks
+
+
+def parse_markdown_to_notion_blocks(markdown) -> list[dict]:
+    """
+    Parse Markdown text and convert it into a list of Notion blocks.
 
-    return blocks
+    :param markdown: The Markdown text to be parsed.
+    :type markdown: str
+    :return: A list of Notion blocks representing the parsed Markdown content.
+    :rtype: list
+    """
+    return [block.to_notion() for block in iter_markdown_blocks(markdown)]
 
 
 def parse_md(markdown_text):
@@ -504,3 +509,24 @@ def parse_md(markdown_text):
     """
     # Parse the transformed Markdown to create Notion blocks
     return parse_markdown_to_notion_blocks(markdown_text.strip())
+
+
+def iter_md(markdown_text) -> Iterator[dict]:
+    """
+    Parse Markdown text into Notion blocks lazily, yielding each top-level block once it is complete.
+    """
+    return (block.to_notion() for block in iter_blocks(markdown_text))
+
+
+def parse_blocks(markdown_text) -> list[Block]:
+    """
+    Parse Markdown text into blocks that are only serialized to Notion JSON when they are sent.
+    """
+    return list(iter_blocks(markdown_text))
+
+
+def iter_blocks(markdown_text) -> Iterator[Block]:
+    """
+    Parse Markdown text into blocks lazily, yielding each top-level block once it is complete.
+    """
+    return iter_markdown_blocks(markdown_text.strip())
@@ -0,0 +1,39 @@
+from collections.abc import Iterable
+from pathlib import Path
+
+from nogisync.hierarchy import find_directory_pages
+from nogisync.index import PageIndex
+
+
+def find_orphaned_pages(
+    index: PageIndex, base_parent_id: str, titles: dict[Path, str], page_ids: Iterable[str] = ()
+) -> list[str]:
+    """
+    Finds the pages below ``base_parent_id`` that no local markdown file or directory accounts for.
+
+    ``titles`` maps the relative path of every local markdown file to the title of its page, and ``page_ids`` are the
+    pages the manifest knows the files by. Only pages directly below the root or below the page of a local directory
+    are orphans: the sync never creates pages anywhere else, so pages kept below a file's page are left alone. An
+    orphan is returned without the pages below it, since archiving it takes them along.
+
+    Everything is answered from the index, so the check costs no requests besides the walk that loaded it.
+    """
+    directory_ids, _ = find_directory_pages(index, base_parent_id, titles)
+    directories = set(directory_ids.values())
+    kept = directories | set(page_ids)
+    for relative_path, title in titles.items():
+        directory_id = directory_ids.get(relative_path.parent)
+        page_id = index.get(directory_id, title) if directory_id else None
+        if page_id is not None:
+            kept.add(page_id)
+
+    return [page_id for page_id, parent_id, _ in index.pages() if parent_id in directories and page_id not in kept]
+
+
+def get_page_path(index: PageIndex, base_parent_id: str, page_id: str) -> Path:
+    """Returns the titles of a page and the pages above it, up to the root, as a path"""
+    titles = []
+    while page_id != base_parent_id and (location := index.get_location(page_id)) is not None:
+        page_id, title = location
+        titles.append(title)
+    return Path(*reversed(titles))
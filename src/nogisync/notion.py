@@ -1,25 +1,331 @@
+import asyncio
 import logging
-from typing import cast
+import time
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from typing import Any, cast
 
+import httpx
 import notion_client
+from notion_client.errors import APIErrorCode, HTTPResponseError, RequestTimeoutError
+from notion_client.helpers import async_iterate_paginated_api
 
-from nogisync.markdown import parse_md
+from nogisync.batching import Batch, iter_batches, split_first_batch
+from nogisync.blocks import Block
+from nogisync.cache import ParseCache
+from nogisync.diff import (
+    DELETE,
+    INSERT,
+    KEEP,
+    NESTED_PAGE_TYPES,
+    UPDATE,
+    BlockOperation,
+    diff_blocks,
+    get_anchor,
+    get_update_payload,
+)
+from nogisync.markdown import iter_blocks, parse_blocks
+from nogisync.profiling import APPEND, DIFF, LOOKUP, PARSE, TEARDOWN, phase, timed
+from nogisync.ratelimit import DEFAULT_RATE_LIMIT, TokenBucket
+from nogisync.stats import RunStats, get_endpoint
 
+# 429 means the request was rejected before Notion acted on it, and 503 means Notion is overloaded; both are safe to
+# send again. Anything else is surfaced to the caller.
+RETRYABLE_STATUS_CODES = {429, 503}
+MAX_RETRIES = 5
 
-def get_notion_client(token: str) -> notion_client.Client:
-    """Get a Notion client."""
-    return notion_client.Client(auth=token)
+DEFAULT_HTTP_TIMEOUT = 60.0
+DEFAULT_MAX_CONNECTIONS = 10
+# Idle connections are kept open this long so consecutive requests skip the TCP and TLS handshakes.
+KEEPALIVE_EXPIRY = 30.0
 
+# Notion returns at most this many blocks per list request.
+MAX_PAGE_SIZE = 100
 
-def get_notion_parent_page(client: notion_client.Client, parent_page_id: str) -> dict | None:
+# Block deletions are independent of each other, so they are sent this many at a time. The shared token bucket
+# still decides how fast they actually go out.
+DELETE_CONCURRENCY = 10
+# Rounds of deletions before giving up on the blocks that keep failing
+DELETE_ROUNDS = 3
+# Print teardown progress every this many deleted blocks
+DELETE_PROGRESS_INTERVAL = 100
+
+
+def get_retry_after(headers: httpx.Headers) -> float | None:
+    """Read the number of seconds to wait from a ``Retry-After`` header."""
+    try:
+        return max(float(headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+class RateLimitedClient(notion_client.AsyncClient):
+    """
+    Async Notion client that sends every request through a shared token bucket.
+
+    Every SDK endpoint ends up in ``request``, so pacing and retries apply to all Notion calls of a run. Rate-limited
+    responses slow the bucket down and are retried after the server's ``Retry-After``; other retryable failures are
+    retried with exponential back-off. With ``stats``, every response, retry and rate limiter wait is recorded there.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        limiter: TokenBucket | None = None,
+        max_retries: int = MAX_RETRIES,
+        stats: RunStats | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter or TokenBucket(DEFAULT_RATE_LIMIT)
+        self.max_retries = max_retries
+        self.stats = stats
+
+    def _record(self, endpoint: str, waited: float, seconds: float, error: bool = False) -> None:
+        if self.stats:
+            self.stats.record_wait(endpoint, waited)
+            self.stats.record_request(endpoint, seconds, error)
+
+    async def request(
+        self,
+        path: str,
+        method: str,
+        query: dict[Any, Any] | None = None,
+        body: dict[Any, Any] | None = None,
+        auth: str | None = None,
+    ) -> Any:
+        endpoint = get_endpoint(method, path)
+        attempt = 0
+        while True:
+            waited = await self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = await super().request(path, method, query, body, auth)
+            except RequestTimeoutError:
+                self._record(endpoint, waited, time.perf_counter() - start, error=True)
+                raise
+            except HTTPResponseError as e:
+                self._record(endpoint, waited, time.perf_counter() - start, error=True)
+                if e.status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                if self.stats:
+                    self.stats.record_retry(endpoint, rate_limited=e.status == 429)
+                retry_after = get_retry_after(e.headers)
+                logging.warning(
+                    "%s %s failed with status %s, retrying (%s/%s)", method, path, e.status, attempt, self.max_retries
+                )
+                if e.status == 429:
+                    self.limiter.penalize(retry_after)
+                else:
+                    await asyncio.sleep(retry_after if retry_after is not None else 2 ** (attempt - 1))
+                continue
+
+            self._record(endpoint, waited, time.perf_counter() - start)
+            self.limiter.reward()
+            return response
+
+
+def get_notion_client(
+    token: str,
+    rate_limit: float = DEFAULT_RATE_LIMIT,
+    timeout: float = DEFAULT_HTTP_TIMEOUT,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    transport: httpx.AsyncBaseTransport | None = None,
+    stats: RunStats | None = None,
+) -> RateLimitedClient:
+    """
+    Get a Notion client backed by a single keep-alive connection pool.
+
+    ``transport`` replaces the network, e.g. to run against a local stand-in for the Notion API. Requests are
+    recorded in ``stats`` when it is given.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        transport=transport,
+    )
+    return RateLimitedClient(
+        auth=token,
+        timeout_ms=int(timeout * 1000),
+        client=http_client,
+        limiter=TokenBucket(rate_limit),
+        stats=stats,
+    )
+
+
+@asynccontextmanager
+async def open_notion_client(
+    token: str,
+    rate_limit: float = DEFAULT_RATE_LIMIT,
+    timeout: float = DEFAULT_HTTP_TIMEOUT,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    stats: RunStats | None = None,
+) -> AsyncIterator[RateLimitedClient]:
+    """Open the one Notion client of a run and close its connection pool when the run is over."""
+    client = get_notion_client(token, rate_limit, timeout, max_connections, stats=stats)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+async def get_notion_parent_page(client: notion_client.AsyncClient, parent_page_id: str) -> dict | None:
     """Get a Notion parent page."""
-    results = cast(dict, client.pages.retrieve(page_id=parent_page_id)).get("results")
+    results = cast(dict, await client.pages.retrieve(page_id=parent_page_id)).get("results")
     return results[0] if results else None
 
 
-def find_notion_page(client: notion_client.Client, title: str, parent_id: str | None = None) -> dict | None:
+async def list_blocks(client: notion_client.AsyncClient, block_id: str) -> list[dict]:
+    """List the child blocks of a page or block, following every page of results."""
+    return [
+        cast(dict, block)
+        async for block in async_iterate_paginated_api(
+            client.blocks.children.list, block_id=block_id, page_size=MAX_PAGE_SIZE
+        )
+    ]
+
+
+async def list_block_tree(client: notion_client.AsyncClient, block_id: str) -> list[dict]:
+    """
+    List the child blocks of a page or block along with the blocks nested in them, such as list items and table rows.
+
+    The children of each block are listed into its payload under ``children``, the way they are given when appending
+    blocks, so remote blocks with children can be compared with parsed ones. Pages and databases nested below are
+    not listed.
+    """
+    blocks = await list_blocks(client, block_id)
+    nested = [block for block in blocks if block.get("has_children") and block.get("type") not in NESTED_PAGE_TYPES]
+    children = await asyncio.gather(*(list_block_tree(client, block["id"]) for block in nested))
+    for block, block_children in zip(nested, children):
+        block.setdefault(block["type"], {})["children"] = block_children
+    return blocks
+
+
+async def list_child_pages(client: notion_client.AsyncClient, block_id: str) -> list[dict]:
+    """List the pages nested directly below a page, following every page of results."""
+    return [block for block in await list_blocks(client, block_id) if block.get("type") == "child_page"]
+
+
+async def append_batches(
+    client: notion_client.AsyncClient, block_id: str, batches: Iterable[Batch], after: str | None = None
+) -> list[str]:
+    """
+    Append batches of blocks to a page or block and return the IDs of the new top-level blocks.
+
+    Batches are awaited one after another so they land in order, and the children held back from a batch are
+    appended below their blocks before the next batch goes out. With ``after``, the blocks are inserted after that
+    block instead of at the end.
+    """
+    block_ids: list[str] = []
+    for batch in batches:
+        kwargs = {"after": block_ids[-1] if block_ids else after} if after else {}
+        response = await client.blocks.children.append(block_id=block_id, children=batch.blocks, **kwargs)
+        new_ids = [block["id"] for block in cast(dict, response).get("results", [])[: len(batch.blocks)]]
+        for position, children in batch.deferred.items():
+            await append_blocks(client, new_ids[position], children)
+        block_ids.extend(new_ids)
+    return block_ids
+
+
+async def append_blocks(
+    client: notion_client.AsyncClient, block_id: str, blocks: Iterable[dict], after: str | None = None
+) -> list[str]:
+    """
+    Append blocks to a page or block in as few requests as Notion accepts and return the IDs of the new blocks.
+
+    ``blocks`` may be a generator, in which case each batch is only read once the previous one has been sent.
+    """
+    return await append_batches(client, block_id, iter_batches(blocks), after)
+
+
+async def delete_blocks(
+    client: notion_client.AsyncClient,
+    block_ids: list[str],
+    concurrency: int = DELETE_CONCURRENCY,
+    rounds: int = DELETE_ROUNDS,
+) -> None:
+    """
+    Delete blocks concurrently, retrying the ones that failed.
+
+    Blocks that are already gone count as deleted. Failed deletions are tried again in up to ``rounds`` rounds, after
+    which the last error is raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(block_ids)
+    deleted = 0
+
+    async def delete(block_id: str) -> Exception | None:
+        nonlocal deleted
+        async with semaphore:
+            try:
+                await client.blocks.delete(block_id=block_id)
+            except notion_client.errors.APIResponseError as e:
+                if e.code != APIErrorCode.ObjectNotFound:
+                    return e
+            except (HTTPResponseError, RequestTimeoutError) as e:
+                return e
+        deleted += 1
+        if total > DELETE_PROGRESS_INTERVAL and (deleted % DELETE_PROGRESS_INTERVAL == 0 or deleted == total):
+            print(f"Deleted {deleted}/{total} blocks")
+        return None
+
+    pending = list(block_ids)
+    for attempt in range(1, rounds + 1):
+        errors = await asyncio.gather(*(delete(block_id) for block_id in pending))
+        failed = [(block_id, error) for block_id, error in zip(pending, errors) if error is not None]
+        if not failed:
+            return
+        pending = [block_id for block_id, _ in failed]
+        logging.warning("Failed to delete %s of %s blocks (round %s/%s)", len(failed), total, attempt, rounds)
+    raise failed[-1][1]
+
+
+async def apply_block_operations(
+    client: notion_client.AsyncClient, page_id: str, operations: list[BlockOperation]
+) -> list[str]:
+    """Apply a block diff to a page or block in document order and return the IDs of its blocks afterwards."""
+    # Insertions are anchored to blocks that stay, except for the ones in front of every block that stays, so every
+    # other deletion can go first and all at once
+    anchor = get_anchor(operations)
+    with phase(TEARDOWN):
+        await delete_blocks(
+            client, [cast(str, op.block_id) for op in operations if op.kind == DELETE and op.block_id != anchor]
+        )
+
+    block_ids: list[str] = []
+    # Insertions after the last remaining block are plain appends, earlier ones are anchored to the block before them
+    last_remaining = max((i for i, op in enumerate(operations) if op.kind in (KEEP, UPDATE)), default=-1)
+
+    with phase(APPEND):
+        for position, operation in enumerate(operations):
+            if operation.kind == INSERT:
+                after = (block_ids[-1] if block_ids else anchor) if position < last_remaining else None
+                block_ids.extend(await append_blocks(client, page_id, operation.blocks, after=after))
+                continue
+
+            block_id = cast(str, operation.block_id)
+            if operation.kind == KEEP:
+                block_ids.append(block_id)
+            elif operation.kind == UPDATE:
+                if operation.children:
+                    await apply_block_operations(client, block_id, operation.children)
+                else:
+                    await client.blocks.update(block_id=block_id, **get_update_payload(operation.blocks[0]))
+                block_ids.append(block_id)
+
+    if anchor is not None:
+        with phase(TEARDOWN):
+            await delete_blocks(client, [anchor])
+    return block_ids
+
+
+async def find_notion_page(client: notion_client.AsyncClient, title: str, parent_id: str | None = None) -> dict | None:
     """Find a Notion page by its title."""
-    response = cast(dict, client.search(query=title, filter={"value": "page", "property": "object"}))
+    response = cast(dict, await client.search(query=title, filter={"value": "page", "property": "object"}))
     results = response.get("results", [])
 
     for result in results:
@@ -31,27 +337,36 @@ def find_notion_page(client: notion_client.Client, title: str, parent_id: str |
     return None
 
 
-def create_notion_page(client: notion_client.Client, parent_page_id: str, title: str, content: str) -> dict:
-    """Create a new page in Notion."""
-    try:
-        blocks = parse_md(content)
-
-        # Create the page
-        new_page = cast(
-            dict,
-            client.pages.create(
-                parent={"page_id": parent_page_id},
-                properties={"title": [{"text": {"content": title}}]},
-                children=[],
-            ),
-        )
+async def create_notion_page(
+    client: notion_client.AsyncClient,
+    parent_page_id: str,
+    title: str,
+    content: str,
+    cache: ParseCache | None = None,
+    blocks: Iterable[Block] | None = None,
+) -> dict:
+    """
+    Create a new page in Notion.
 
-        # Add the blocks to the page
-        while len(blocks) > 100:
-            client.blocks.children.append(block_id=new_page["id"], children=blocks[:100])
-            blocks = blocks[100:]
-
-        client.blocks.children.append(block_id=new_page["id"], children=blocks)
+    The blocks are taken from ``blocks`` when the content was parsed already, otherwise from the parse cache when one
+    is given. Each block is serialized to Notion JSON only once its batch is about to be sent.
+    """
+    try:
+        with phase(APPEND):
+            if blocks is None:
+                blocks = cache.iter_blocks(content) if cache else iter_blocks(content)
+            # The first batch is sent along with the page, the rest is appended while the content is still parsed
+            payloads = (block.to_notion() for block in timed(blocks, PARSE))
+            children, batches = split_first_batch(iter_batches(payloads))
+            new_page = cast(
+                dict,
+                await client.pages.create(
+                    parent={"page_id": parent_page_id},
+                    properties={"title": [{"text": {"content": title}}]},
+                    children=children,
+                ),
+            )
+            await append_batches(client, new_page["id"], batches)
 
         return cast(dict, new_page)
     except notion_client.errors.APIResponseError as e:
@@ -59,20 +374,51 @@ def create_notion_page(client: notion_client.Client, parent_page_id: str, title:
         return {}
 
 
-def update_notion_page(client: notion_client.Client, page_id: str, content: str) -> None:
-    """Update an existing Notion page."""
+async def update_notion_page(
+    client: notion_client.AsyncClient,
+    page_id: str,
+    content: str,
+    cache: ParseCache | None = None,
+    blocks: list[Block] | None = None,
+) -> list[str] | None:
+    """
+    Update an existing Notion page and return the IDs of its blocks, or ``None`` if the update failed.
+
+    Only the blocks that differ from the parsed content are updated, deleted or inserted, so the number of requests
+    follows the size of the change rather than the size of the page. The blocks come from ``blocks`` when the
+    content was parsed already, otherwise from the parse cache when one is given.
+    """
+    try:
+        if blocks is None:
+            with phase(PARSE):
+                blocks = cache.parse(content) if cache else parse_blocks(content)
+        with phase(LOOKUP):
+            existing_blocks = await list_block_tree(client, page_id)
+        with phase(DIFF):
+            operations = diff_blocks(existing_blocks, [block.to_notion() for block in blocks])
+        return await apply_block_operations(client, page_id, operations)
+    except notion_client.errors.APIResponseError as e:
+        logging.error(e)
+        return None
+
+
+async def move_notion_page(client: notion_client.AsyncClient, page_id: str, parent_page_id: str) -> None:
+    """Move a page below another parent page, keeping its ID, content and links."""
+    await client.request(
+        path=f"pages/{page_id}/move", method="POST", body={"parent": {"type": "page_id", "page_id": parent_page_id}}
+    )
+
+
+async def rename_notion_page(client: notion_client.AsyncClient, page_id: str, title: str) -> None:
+    """Change the title of a page."""
+    await client.pages.update(page_id=page_id, properties={"title": [{"text": {"content": title}}]})
+
+
+async def archive_notion_page(client: notion_client.AsyncClient, page_id: str) -> bool:
+    """Archive a page, returning whether it worked."""
     try:
-        blocks = parse_md(content)
-        # First, delete existing blocks
-        existing_blocks = cast(dict, client.blocks.children.list(block_id=page_id)).get("results", [])
-        for block in existing_blocks:
-            client.blocks.delete(block_id=block["id"])
-
-        # Then add new blocks
-        while len(blocks) > 100:
-            client.blocks.children.append(block_id=page_id, children=blocks[:100])
-            blocks = blocks[100:]
-
-        client.blocks.children.append(block_id=page_id, children=blocks)
+        await client.pages.update(page_id=page_id, archived=True)
+        return True
     except notion_client.errors.APIResponseError as e:
         logging.error(e)
+        return False
@@ -0,0 +1,114 @@
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from nogisync import diff
+from nogisync.batching import count_requests, iter_batches, split_first_batch
+from nogisync.notion import MAX_PAGE_SIZE
+
+# What a sync would do with a markdown file
+CREATE = "create"
+UPDATE = "update"
+MOVE = "move"
+UNCHANGED = "unchanged"
+ARCHIVE = "archive"
+
+
+def count_pages(blocks: int) -> int:
+    """Returns the number of requests it takes to list ``blocks`` blocks"""
+    return max(1, math.ceil(blocks / MAX_PAGE_SIZE))
+
+
+def count_list_requests(blocks: list[dict]) -> int:
+    """Returns the number of requests it took to list ``blocks`` along with the blocks nested in them"""
+    return count_pages(len(blocks)) + sum(
+        count_list_requests(block[block["type"]]["children"])
+        for block in blocks
+        if block.get("has_children") and "children" in block.get(block.get("type", ""), {})
+    )
+
+
+def get_create_requests(blocks: list[dict]) -> Counter[str]:
+    """Counts the requests per endpoint that create a page with ``blocks``"""
+    _, batches = split_first_batch(iter_batches(blocks))
+    return Counter({"pages.create": 1, "blocks.children.append": count_requests(batches)})
+
+
+def get_update_requests(remote_blocks: list[dict], operations: list[diff.BlockOperation]) -> Counter[str]:
+    """Counts the requests per endpoint that list the remote blocks of a page and apply ``operations`` to it"""
+    return Counter({"blocks.children.list": count_list_requests(remote_blocks)}) + count_operation_requests(operations)
+
+
+def count_operation_requests(operations: list[diff.BlockOperation]) -> Counter[str]:
+    """Counts the requests per endpoint that apply ``operations``, including the ones on the rows of tables"""
+    requests: Counter[str] = Counter()
+    for operation in operations:
+        if operation.kind == diff.DELETE:
+            requests["blocks.delete"] += 1
+        elif operation.kind == diff.UPDATE and operation.children:
+            requests.update(count_operation_requests(operation.children))
+        elif operation.kind == diff.UPDATE:
+            requests["blocks.update"] += 1
+        elif operation.kind == diff.INSERT:
+            requests["blocks.children.append"] += count_requests(iter_batches(operation.blocks))
+    return requests
+
+
+@dataclass
+class FilePlan:
+    """What a sync would do with one markdown file, and the requests per endpoint it would take"""
+
+    relative_path: Path
+    action: str
+    requests: Counter[str] = field(default_factory=Counter)
+
+
+@dataclass
+class SyncPlan:
+    """What a sync run would do, worked out without changing anything in Notion"""
+
+    files: list[FilePlan] = field(default_factory=list)
+    # Directories whose page does not exist yet
+    directories: list[Path] = field(default_factory=list)
+    # Pages that ``--mirror`` would archive because no local file or directory accounts for them, by their titles
+    orphans: list[Path] = field(default_factory=list)
+    # Requests that belong to no single file, such as indexing the page tree and creating directory pages
+    shared_requests: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def requests(self) -> Counter[str]:
+        total = Counter(self.shared_requests)
+        for file in self.files:
+            total.update(file.requests)
+        return +total
+
+    def estimate_seconds(self, rate_limit: float) -> float:
+        """Estimates how long the sync takes, which the rate limit decides long before latency or concurrency do"""
+        return sum(self.requests.values()) / rate_limit
+
+    def to_text(self, rate_limit: float) -> str:
+        lines = []
+        for file in sorted(self.files, key=lambda file: file.relative_path):
+            counts = ", ".join(f"{count} {name}" for name, count in sorted((+file.requests).items()))
+            lines.append(f"{file.action:<10} {file.relative_path}" + (f": {counts}" if counts else ""))
+        for directory in self.directories:
+            lines.append(f"{'create':<10} {directory}/ (directory page)")
+        for orphan in self.orphans:
+            lines.append(f"{ARCHIVE:<10} {orphan} (orphaned page)")
+
+        actions = Counter(file.action for file in self.files)
+        lines.append(
+            f"Plan: {actions[CREATE]} to create, {actions[UPDATE]} to update, {actions[MOVE]} to move, "
+            f"{actions[ARCHIVE]} to archive, {actions[UNCHANGED]} unchanged, {len(self.directories)} directory pages "
+            "to create" + (f", {len(self.orphans)} orphaned pages to archive" if self.orphans else "")
+        )
+        requests = self.requests
+        lines.append(
+            f"Requests: {sum(requests.values())}"
+            + "".join(f"\n  {name:<24} {count:6}" for name, count in sorted(requests.items()))
+        )
+        estimate = timedelta(seconds=round(self.estimate_seconds(rate_limit)))
+        lines.append(f"Estimated duration: {estimate} at {rate_limit:g} requests per second")
+        return "\n".join(lines)
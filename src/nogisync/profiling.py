@@ -0,0 +1,130 @@
+import cProfile
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TypeVar
+
+from nogisync.stats import current_file
+
+T = TypeVar("T")
+
+# The phases of a sync run, in the order they happen
+DISCOVERY = "discovery"
+READ = "read"
+PARSE = "parse"
+HIERARCHY = "hierarchy"
+LOOKUP = "lookup"
+DIFF = "diff"
+TEARDOWN = "teardown"
+APPEND = "append"
+PHASES = (DISCOVERY, READ, PARSE, HIERARCHY, LOOKUP, DIFF, TEARDOWN, APPEND)
+
+# The profile of the running sync, if it was asked for
+active_profile: ContextVar["PhaseProfile | None"] = ContextVar("active_profile", default=None)
+# The innermost phase being timed, whose time is paused while a nested phase runs
+current_phase: ContextVar[str | None] = ContextVar("current_phase", default=None)
+
+
+class PhaseProfile:
+    """
+    Time spent in each phase of a sync run, in total and per markdown file.
+
+    Phases are timed on the wall clock and a nested phase is not counted in the phase around it, so parsing that
+    happens while blocks are appended only counts as parsing. Files are synced concurrently, so the phase times add
+    up to more than the run took whenever several files were in flight; ``--concurrency 1`` makes them add up.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.phases: dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.files: dict[str, dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        file = current_file.get()
+        if file is not None:
+            phases = self.files.setdefault(file, {})
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    def to_text(self, slowest_files: int = 10) -> str:
+        """Lists the time per phase and the files that took longest, with the phases they spent it in"""
+        total = sum(self.phases.values()) or 1.0
+        lines = [f"Profile of a {self.clock() - self.started:.2f}s run, time per phase summed over files:"]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<10} {seconds:8.2f}s {seconds / total:6.1%}")
+
+        files = sorted(self.files.items(), key=lambda item: -sum(item[1].values()))[:slowest_files]
+        if files:
+            lines.append("Slowest files:")
+        for file, phases in files:
+            breakdown = ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in sorted(phases.items(), key=lambda item: -item[1])
+            )
+            lines.append(f"  {sum(phases.values()):8.2f}s {file} ({breakdown})")
+        return "\n".join(lines)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Counts the time spent inside the block towards phase ``name`` of the active profile, if there is one"""
+    profile = active_profile.get()
+    if profile is None:
+        yield
+        return
+
+    parent = current_phase.get()
+    token = current_phase.set(name)
+    start = profile.clock()
+    try:
+        yield
+    finally:
+        seconds = profile.clock() - start
+        current_phase.reset(token)
+        profile.record(name, seconds)
+        if parent is not None:
+            profile.record(parent, -seconds)
+
+
+def timed(items: Iterable[T], name: str) -> Iterator[T]:
+    """Iterates over ``items``, counting the time spent producing each item towards phase ``name``"""
+    iterator = iter(items)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def profile_run(enabled: bool, pstats_path: Path | None = None) -> Iterator[PhaseProfile | None]:
+    """
+    Profiles the phases of the run inside the block and prints where the time went when it is over.
+
+    With ``pstats_path``, the block also runs under cProfile and its statistics are written to that file, to be read
+    with ``python -m pstats`` or a viewer such as snakeviz. Parse worker processes are not part of it.
+    """
+    if not enabled and pstats_path is None:
+        yield None
+        return
+
+    profile = PhaseProfile()
+    token = active_profile.set(profile)
+    profiler = cProfile.Profile() if pstats_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler:
+            profiler.disable()
+        active_profile.reset(token)
+        print(profile.to_text())
+        if profiler and pstats_path:
+            pstats_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(pstats_path)
+            print(f"Wrote cProfile statistics to {pstats_path}")
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+# Notion allows an average of three requests per second per integration, with short bursts above that.
+DEFAULT_RATE_LIMIT = 3.0
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every request of a run.
+
+    Callers wait in ``acquire`` until a token is available. Tokens refill at ``rate`` per second up to ``capacity``,
+    so bursts are allowed but the long-run request rate never exceeds ``rate``. After a 429 the bucket halves its
+    rate and blocks every caller until the server's ``Retry-After`` has passed; each success then grows the rate
+    back towards ``max_rate`` in small steps (additive increase, multiplicative decrease).
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE_LIMIT,
+        capacity: float | None = None,
+        min_rate: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now <= self._updated:
+            return
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Waits until a request may be sent and returns the number of seconds spent waiting"""
+        waited = 0.0
+        # The lock queues callers in arrival order, so nobody is starved while the bucket is empty.
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._refill(now)
+                delay = self._blocked_until - now
+                if delay <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        """Backs off after a rate-limited response"""
+        self.rate = max(self.rate / 2, self.min_rate)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self._blocked_until = max(self._blocked_until, self._clock() + pause)
+        # Start refilling from empty once the pause is over instead of bursting straight back in.
+        self._tokens = 0.0
+        self._updated = self._blocked_until
+
+    def reward(self) -> None:
+        """Recovers some of the rate lost to earlier back-offs after a successful response"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
@@ -0,0 +1,201 @@
+import bisect
+import json
+import math
+import re
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# (method, path pattern, endpoint name) of the Notion endpoints nogisync calls, with paths relative to /v1/
+ENDPOINTS = [
+    ("POST", re.compile(r"search"), "search"),
+    ("POST", re.compile(r"pages"), "pages.create"),
+    ("GET", re.compile(r"pages/(?P<id>[^/]+)"), "pages.retrieve"),
+    ("PATCH", re.compile(r"pages/(?P<id>[^/]+)"), "pages.update"),
+    ("POST", re.compile(r"pages/(?P<id>[^/]+)/move"), "pages.move"),
+    ("GET", re.compile(r"blocks/(?P<id>[^/]+)/children"), "blocks.children.list"),
+    ("PATCH", re.compile(r"blocks/(?P<id>[^/]+)/children"), "blocks.children.append"),
+    ("PATCH", re.compile(r"blocks/(?P<id>[^/]+)"), "blocks.update"),
+    ("DELETE", re.compile(r"blocks/(?P<id>[^/]+)"), "blocks.delete"),
+]
+OTHER_ENDPOINT = "other"
+
+# Upper bounds in seconds of the latency histogram buckets; the last bucket takes everything slower
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+# The markdown file whose requests are being made, set for each file while it is synced
+current_file: ContextVar[str | None] = ContextVar("current_file", default=None)
+
+
+def get_endpoint(method: str, path: str) -> str:
+    """Names the endpoint of a request, e.g. ``blocks.children.append``, so IDs do not split the statistics"""
+    path = path.split("?", 1)[0].strip("/")
+    for endpoint_method, pattern, name in ENDPOINTS:
+        if method == endpoint_method and pattern.fullmatch(path):
+            return name
+    return OTHER_ENDPOINT
+
+
+@contextmanager
+def track_file(name: str) -> Iterator[None]:
+    """Attributes every request made inside the block, including those of tasks it starts, to the file ``name``"""
+    token = current_file.set(name)
+    try:
+        yield
+    finally:
+        current_file.reset(token)
+
+
+@dataclass
+class LatencyHistogram:
+    """Counts of request latencies per bucket of ``LATENCY_BUCKETS``"""
+
+    counts: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, share: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in, capped by the slowest request"""
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "max_seconds": self.max,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.counts)},
+        }
+
+
+@dataclass
+class RequestStats:
+    """What the requests to one endpoint, or made for one file, cost"""
+
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    # Seconds spent waiting for the rate limiter before sending
+    rate_limit_wait: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "rate_limit_wait_seconds": self.rate_limit_wait,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class RunStats:
+    """
+    Request accounting for a sync run, per Notion endpoint and per markdown file.
+
+    The client records every response, retry and rate limiter wait here. Requests are attributed to the file set
+    with ``track_file``, or to no file for shared work such as indexing the page tree.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self.endpoints: dict[str, RequestStats] = {}
+        self.files: dict[str, RequestStats] = {}
+
+    def _get(self, endpoint: str) -> list[RequestStats]:
+        stats = [self.endpoints.setdefault(endpoint, RequestStats())]
+        file = current_file.get()
+        if file is not None:
+            stats.append(self.files.setdefault(file, RequestStats()))
+        return stats
+
+    def record_request(self, endpoint: str, seconds: float, error: bool = False) -> None:
+        for stats in self._get(endpoint):
+            stats.calls += 1
+            stats.errors += error
+            stats.latency.observe(seconds)
+
+    def record_retry(self, endpoint: str, rate_limited: bool) -> None:
+        for stats in self._get(endpoint):
+            stats.retries += 1
+            stats.rate_limited += rate_limited
+
+    def record_wait(self, endpoint: str, seconds: float) -> None:
+        for stats in self._get(endpoint):
+            stats.rate_limit_wait += seconds
+
+    @property
+    def total(self) -> RequestStats:
+        total = RequestStats()
+        for stats in self.endpoints.values():
+            total.calls += stats.calls
+            total.errors += stats.errors
+            total.retries += stats.retries
+            total.rate_limited += stats.rate_limited
+            total.rate_limit_wait += stats.rate_limit_wait
+            total.latency.counts = [a + b for a, b in zip(total.latency.counts, stats.latency.counts)]
+            total.latency.total += stats.latency.total
+            total.latency.max = max(total.latency.max, stats.latency.max)
+        return total
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": self._clock() - self.started,
+            "total": self.total.to_dict(),
+            "endpoints": {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())},
+            "files": {name: stats.to_dict() for name, stats in sorted(self.files.items())},
+        }
+
+    def to_markdown(self, slowest_files: int = 10) -> str:
+        """Renders the endpoint statistics and the files that spent the longest in requests as Markdown tables"""
+        lines = [
+            "## Notion requests",
+            "",
+            "| Endpoint | Calls | Errors | Retries | Rate limited | Rate limit wait (s) | p50 (ms) | p95 (ms) | Max (ms) |",
+            "|---|---:|---:|---:|---:|---:|---:|---:|---:|",
+        ]
+        rows = sorted(self.endpoints.items(), key=lambda item: -item[1].calls) + [("**Total**", self.total)]
+        for name, stats in rows:
+            lines.append(
+                f"| {name} | {stats.calls} | {stats.errors} | {stats.retries} | {stats.rate_limited} "
+                f"| {stats.rate_limit_wait:.1f} | {stats.latency.quantile(0.5) * 1000:.0f} "
+                f"| {stats.latency.quantile(0.95) * 1000:.0f} | {stats.latency.max * 1000:.0f} |"
+            )
+
+        if self.files:
+            lines += ["", "| File | Calls | Retries | Request time (s) |", "|---|---:|---:|---:|"]
+            files = sorted(self.files.items(), key=lambda item: -item[1].latency.total)[:slowest_files]
+            for name, stats in files:
+                lines.append(f"| `{name}` | {stats.calls} | {stats.retries} | {stats.latency.total:.1f} |")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    def append_markdown(self, path: Path) -> None:
+        """Appends the Markdown report, e.g. to the file in ``$GITHUB_STEP_SUMMARY`` that GitHub shows for a job"""
+        with open(path, "a") as f:
+            f.write(self.to_markdown())
@@ -0,0 +1,129 @@
+from unittest import TestCase
+
+from nogisync.batching import (
+    MAX_PAYLOAD_BYTES,
+    count_requests,
+    get_children,
+    iter_batches,
+    measure,
+    split_children,
+    split_first_batch,
+    without_children,
+)
+
+
+def paragraph(text: str = "Text") -> dict:
+    return {"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}}
+
+
+def item(text: str, children: list[dict] | None = None) -> dict:
+    payload: dict = {"rich_text": [{"text": {"content": text}}]}
+    if children is not None:
+        payload["children"] = children
+    return {"type": "bulleted_list_item", "bulleted_list_item": payload}
+
+
+def table(rows: int) -> dict:
+    cells = [[{"type": "text", "text": {"content": f"Row {i}"}}] for i in range(rows)]
+    children = [{"type": "table_row", "table_row": {"cells": [cell]}} for cell in cells]
+    return {"type": "table", "table": {"table_width": 1, "has_column_header": False, "children": children}}
+
+
+class TestBatching(TestCase):
+    def test_measure(self):
+        self.assertEqual(measure(paragraph()), (1, 1, 0))
+        self.assertEqual(measure(item("a", [item("b", [item("c"), item("d")]), item("e")])), (3, 5, 2))
+
+    def test_without_children(self):
+        block = item("a", [item("b")])
+        self.assertEqual(without_children(block), item("a"))
+        self.assertEqual(get_children(block), [item("b")])
+
+    def test_packs_by_count(self):
+        batches = list(iter_batches(paragraph() for _ in range(250)))
+        self.assertEqual([len(batch.blocks) for batch in batches], [100, 100, 50])
+
+    def test_packs_by_nested_block_count(self):
+        # Each item brings 51 blocks, so no more than 19 fit into the 1000 blocks of one request
+        blocks = [item(str(i), [item("child") for _ in range(50)]) for i in range(30)]
+        batches = list(iter_batches(blocks))
+        self.assertEqual([len(batch.blocks) for batch in batches], [19, 11])
+        self.assertEqual([batch.count for batch in batches], [969, 561])
+
+    def test_packs_by_size(self):
+        large = paragraph("x" * 100_000)
+        batches = list(iter_batches([large] * 12))
+        self.assertEqual([len(batch.blocks) for batch in batches], [4, 4, 4])
+        self.assertTrue(all(batch.size <= MAX_PAYLOAD_BYTES for batch in batches))
+
+    def test_defers_children_nested_too_deep(self):
+        deep = item("a", [item("b", [item("c")])])
+        shallow = item("d", [item("e")])
+
+        (batch,) = iter_batches([paragraph(), deep, shallow])
+
+        self.assertEqual(batch.blocks, [paragraph(), item("a"), shallow])
+        self.assertEqual(batch.deferred, {1: [item("b", [item("c")])]})
+
+    def test_defers_too_many_children(self):
+        wide = item("a", [item(str(i)) for i in range(150)])
+        (batch,) = iter_batches([wide])
+        self.assertEqual(batch.blocks, [item("a")])
+        self.assertEqual(len(batch.deferred[0]), 150)
+
+    def test_table_keeps_the_rows_that_fit(self):
+        large = table(1000)
+
+        (batch,) = iter_batches([paragraph(), large])
+
+        self.assertEqual(len(get_children(batch.blocks[1])), 100)
+        self.assertEqual(batch.count, 102)
+        self.assertEqual(batch.deferred[1], get_children(large)[100:])
+        # One request for the paragraph and the table with its first rows, then nine for the other 900 rows
+        self.assertEqual(count_requests(iter_batches([paragraph(), large])), 10)
+
+    def test_split_children_by_size(self):
+        block, deferred = split_children(table(3))
+        self.assertEqual((len(get_children(block)), len(deferred)), (3, 0))
+
+        wide = table(10)
+        for row in get_children(wide):
+            row["table_row"]["cells"][0][0]["text"]["content"] = "x" * 100_000
+        block, deferred = split_children(wide)
+        self.assertEqual((len(get_children(block)), len(deferred)), (4, 6))
+
+        block, deferred = split_children(item("a", [item("b")]))
+        self.assertEqual((block, deferred), (item("a"), [item("b")]))
+
+    def test_yields_full_batch_before_reading_on(self):
+        read = []
+
+        def blocks():
+            for i in range(150):
+                read.append(i)
+                yield paragraph()
+
+        batches = iter_batches(blocks())
+        next(batches)
+        self.assertEqual(len(read), 100)
+
+    def test_split_first_batch(self):
+        children, batches = split_first_batch(iter_batches([paragraph() for _ in range(150)]))
+        self.assertEqual(len(children), 100)
+        self.assertEqual([len(batch.blocks) for batch in batches], [50])
+
+        deep = item("a", [item("b", [item("c")])])
+        children, batches = split_first_batch(iter_batches([paragraph(), deep, paragraph()]))
+        self.assertEqual(children, [paragraph()])
+        (rest,) = batches
+        self.assertEqual(rest.blocks, [item("a"), paragraph()])
+        self.assertEqual(rest.deferred, {0: [item("b", [item("c")])]})
+
+        children, batches = split_first_batch(iter_batches([]))
+        self.assertEqual((children, list(batches)), ([], []))
+
+    def test_count_requests(self):
+        self.assertEqual(count_requests(iter_batches(paragraph() for _ in range(150))), 2)
+        # One request for the top level, one for the children of "a" and one for the children of "b"
+        deep = item("a", [item("b", [item("c", [item("d")])])])
+        self.assertEqual(count_requests(iter_batches([deep])), 3)
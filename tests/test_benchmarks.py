@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from benchmarks import corpora
+from benchmarks.bench_markdown import BenchmarkCase, compare_results, get_cases, run_case
+from nogisync.markdown import parse_md
+
+
+class TestBenchmarks(TestCase):
+    def test_corpora_are_deterministic(self):
+        self.assertEqual(corpora.generate_long_document(200), corpora.generate_long_document(200))
+        self.assertNotEqual(corpora.generate_long_document(200), corpora.generate_long_document(200, seed=1))
+
+    def test_corpora_sizes(self):
+        self.assertEqual(corpora.generate_long_document(500).count("\n") + 1, 500)
+        self.assertEqual(corpora.generate_wide_table(columns=5, rows=10).count("\n") + 1, 12)
+        self.assertEqual(corpora.generate_inline_heavy(20).count("\n") + 1, 20)
+
+    def test_corpora_parse(self):
+        blocks = parse_md(corpora.generate_long_document(500))
+        self.assertTrue({"paragraph", "heading_1", "bulleted_list_item", "code"} <= {block["type"] for block in blocks})
+        self.assertTrue(parse_md(corpora.generate_nested_lists(50)))
+        self.assertTrue(parse_md(corpora.generate_code_and_equations(20)))
+        self.assertTrue(parse_md(corpora.generate_adversarial_emphasis(20)))
+
+    def test_case_names_are_unique(self):
+        names = [case.name for case in get_cases()]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_run_case(self):
+        result = run_case(BenchmarkCase("parse_md/small", parse_md, "# Title\nText\nMore text"), repeat=2)
+
+        self.assertEqual(result["lines"], 3)
+        self.assertGreater(result["lines_per_second"], 0)
+
+    def test_compare_results(self):
+        baseline = {"results": {"fast": {"lines_per_second": 1000}, "slow": {"lines_per_second": 1000}}}
+        results = {
+            "results": {
+                "fast": {"lines_per_second": 900},
+                "slow": {"lines_per_second": 800},
+                "new": {"lines_per_second": 1},
+            }
+        }
+
+        regressions = compare_results(baseline, results, max_regression=0.15)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("slow: 800 lines/s is 20% below"))
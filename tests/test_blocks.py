@@ -0,0 +1,83 @@
+import pickle
+from unittest import TestCase
+
+from benchmarks import corpora
+from nogisync.blocks import PLAIN, Block, EquationRun, TextRun, get_annotations
+from nogisync.markdown import get_rich_text, parse_blocks, parse_md
+
+
+class TestBlocks(TestCase):
+    def test_annotations_are_shared(self):
+        self.assertIs(get_annotations(), PLAIN)
+        self.assertIs(get_annotations(bold=True), get_annotations(True, False, False, False))
+
+        runs = get_rich_text("**bold** and **more bold** and `code`")
+
+        self.assertIs(runs[0].annotations, runs[2].annotations)
+        self.assertIs(runs[1].annotations, PLAIN)
+
+    def test_annotations_stay_shared_after_pickling(self):
+        blocks = parse_blocks("Some **bold** text")
+
+        unpickled = pickle.loads(pickle.dumps(blocks))
+
+        self.assertEqual(unpickled, blocks)
+        self.assertIs(unpickled[0].rich_text[1].annotations, get_annotations(bold=True))
+        self.assertIs(unpickled[0].rich_text[0].annotations, PLAIN)
+
+    def test_plain_text_run(self):
+        self.assertEqual(TextRun("Text").to_notion(), {"type": "text", "text": {"content": "Text"}})
+
+    def test_formatted_text_run(self):
+        run = TextRun("Link", get_annotations(italic=True), "https://example.com")
+
+        self.assertEqual(
+            run.to_notion(),
+            {
+                "type": "text",
+                "text": {"content": "Link", "link": {"url": "https://example.com"}},
+                "annotations": {
+                    "bold": False,
+                    "italic": True,
+                    "strikethrough": False,
+                    "code": False,
+                    "underline": False,
+                    "color": "default",
+                },
+                "plain_text": "Link",
+                "href": "https://example.com",
+            },
+        )
+
+    def test_to_notion(self):
+        self.assertEqual(Block("divider").to_notion(), {"type": "divider", "divider": {}})
+        self.assertEqual(
+            Block("equation", expression="x^2").to_notion(), {"type": "equation", "equation": {"expression": "x^2"}}
+        )
+        self.assertEqual(
+            Block("code", [TextRun("x = 1")], language="python").to_notion(),
+            {
+                "object": "block",
+                "type": "code",
+                "code": {"language": "python", "rich_text": [{"type": "text", "text": {"content": "x = 1"}}]},
+            },
+        )
+        self.assertEqual(
+            Block("paragraph", [EquationRun("e")]).to_notion()["paragraph"],
+            {"rich_text": [{"type": "equation", "equation": {"expression": "e"}}]},
+        )
+
+    def test_from_notion_reverses_to_notion(self):
+        for text in (
+            corpora.generate_long_document(500),
+            corpora.generate_nested_lists(100),
+            corpora.generate_code_and_equations(20),
+            corpora.generate_inline_heavy(50),
+            corpora.generate_wide_table(5, 10),
+            "![Caption](https://example.com/image.png)\n\n![](https://example.com/other.png)",
+        ):
+            blocks = parse_blocks(text)
+            serialized = [block.to_notion() for block in blocks]
+
+            self.assertEqual(serialized, parse_md(text))
+            self.assertEqual([Block.from_notion(block) for block in serialized], blocks)
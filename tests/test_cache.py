@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from nogisync.cache import ParseCache
+from nogisync.markdown import PARSER_VERSION, parse_blocks
+
+
+class TestParseCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.directory = Path(self.tmp_dir.name, "cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_reuses_cached_blocks(self):
+        cache = ParseCache(self.directory)
+
+        with patch("nogisync.cache.parse_blocks", wraps=parse_blocks) as mock_parse:
+            first = cache.parse("# Title\n\nSome **text**")
+            second = ParseCache(self.directory).parse("# Title\n\nSome **text**")
+
+        mock_parse.assert_called_once()
+        self.assertEqual(first, parse_blocks("# Title\n\nSome **text**"))
+        self.assertEqual(second, first)
+
+    def test_parse_misses_for_other_content_or_parser_version(self):
+        cache = ParseCache(self.directory)
+        cache.parse("# Title")
+
+        self.assertIsNone(cache.get("# Other"))
+        with patch("nogisync.cache.PARSER_VERSION", PARSER_VERSION + 1):
+            self.assertIsNone(cache.get("# Title"))
+
+    def test_iter_blocks_stores_blocks_once_fully_read(self):
+        cache = ParseCache(self.directory)
+
+        blocks = cache.iter_blocks("First\n\nSecond")
+        next(blocks)
+        self.assertIsNone(cache.get("First\n\nSecond"))
+
+        self.assertEqual(len(list(blocks)), 1)
+        self.assertEqual(cache.get("First\n\nSecond"), parse_blocks("First\n\nSecond"))
+        self.assertEqual(list(cache.iter_blocks("First\n\nSecond")), parse_blocks("First\n\nSecond"))
+
+    def test_unreadable_entry_is_ignored(self):
+        cache = ParseCache(self.directory)
+        cache.parse("# Title")
+        next(self.directory.glob("*/*.json")).write_text("not json")
+
+        self.assertIsNone(cache.get("# Title"))
+        self.assertEqual(cache.parse("# Title"), parse_blocks("# Title"))
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = ParseCache(self.directory, max_size=3000)
+        contents = [f"{i} " + "x" * 800 for i in range(3)]
+        for i, content in enumerate(contents):
+            cache.parse(content)
+            os.utime(cache._get_path(content), (i, i))
+        # Reading the oldest entry makes it the most recently used
+        cache.get(contents[0])
+
+        cache.parse("3 " + "x" * 800)
+
+        self.assertIsNotNone(cache.get(contents[0]))
+        self.assertIsNone(cache.get(contents[1]))
+        self.assertIsNotNone(cache.get("3 " + "x" * 800))
+        self.assertLessEqual(sum(path.stat().st_size for path in self.directory.glob("*/*.json")), 3000)
+
+    def test_disabled_cache(self):
+        cache = ParseCache(None)
+
+        self.assertEqual(cache.parse("# Title"), parse_blocks("# Title"))
+        self.assertEqual(list(cache.iter_blocks("# Title")), parse_blocks("# Title"))
+        self.assertIsNone(cache.get("# Title"))
@@ -0,0 +1,89 @@
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from nogisync.changes import (
+    ADDED,
+    DELETED,
+    MODIFIED,
+    RENAMED,
+    FileChange,
+    GitError,
+    get_changed_markdown_files,
+    read_file_at,
+)
+
+
+def git(root: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+class TestChanges(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.repo = Path(self.tmp_dir.name)
+        self.docs = self.repo / "docs"
+        (self.docs / "guides").mkdir(parents=True)
+        git(self.repo, "init", "-q")
+        (self.docs / "modified.md").write_text("# Modified\n")
+        (self.docs / "deleted.md").write_text("---\ntitle: Gone\n---\n# Deleted\n")
+        (self.docs / "renamed.md").write_text("# Renamed\n\n" + "A long enough body for rename detection.\n" * 5)
+        (self.repo / "outside.md").write_text("# Outside\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "initial")
+        self.base = git(self.repo, "rev-parse", "HEAD")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_changed_markdown_files(self):
+        (self.docs / "modified.md").write_text("# Modified again\n")
+        (self.docs / "deleted.md").unlink()
+        git(self.repo, "mv", "docs/renamed.md", "docs/guides/moved.md")
+        (self.docs / "added.md").write_text("# Added\n")
+        (self.docs / "notes.txt").write_text("not markdown\n")
+        (self.repo / "outside.md").write_text("# Outside changed\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "change")
+
+        changes = get_changed_markdown_files(self.docs, self.base)
+
+        self.assertCountEqual(
+            changes,
+            [
+                FileChange(ADDED, Path("added.md")),
+                FileChange(MODIFIED, Path("modified.md")),
+                FileChange(DELETED, Path("deleted.md")),
+                FileChange(RENAMED, Path("guides/moved.md"), Path("renamed.md"), content_changed=False),
+            ],
+        )
+
+    def test_get_changed_markdown_files_edited_rename(self):
+        (self.docs / "renamed.md").unlink()
+        (self.docs / "moved.md").write_text(
+            "# Renamed\n\n" + "A long enough body for rename detection.\n" * 5 + "More\n"
+        )
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "rename and edit")
+
+        changes = get_changed_markdown_files(self.docs, self.base)
+
+        self.assertEqual(changes, [FileChange(RENAMED, Path("moved.md"), Path("renamed.md"), content_changed=True)])
+
+    def test_get_changed_markdown_files_unknown_ref(self):
+        with self.assertRaises(GitError):
+            get_changed_markdown_files(self.docs, "does-not-exist")
+
+    def test_read_file_at(self):
+        (self.docs / "deleted.md").unlink()
+        git(self.repo, "commit", "-q", "-am", "delete")
+
+        content = read_file_at(self.docs, self.base, Path("deleted.md"))
+
+        self.assertEqual(content, "---\ntitle: Gone\n---\n# Deleted\n")
@@ -1,75 +1,114 @@
+import asyncio
+import io
+import json
+from contextlib import redirect_stdout
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import ANY, AsyncMock, patch
 
-from nogisync.cli import get_content, get_title, main, process_page_hierarchy
+import click
+
+from benchmarks.fake_notion import FakeNotion, use_fake_notion
+from nogisync import ingest, notion
+from nogisync.changes import DELETED, RENAMED, FileChange
+from nogisync.cli import (
+    MarkdownFile,
+    SyncOptions,
+    get_roots,
+    get_title,
+    main,
+    parse_markdown_files,
+    plan_path,
+    plan_roots,
+    process_page_hierarchy,
+    read_markdown_file,
+    sync_file,
+    sync_path,
+    sync_roots,
+)
+from nogisync.config import SyncRoot
+from nogisync.index import PageIndex
+from nogisync.manifest import ManifestEntry, SyncManifest, hash_content
+from nogisync.markdown import parse_blocks
+from nogisync.plan import SyncPlan
 
 
 class TestCli(TestCase):
     def test_get_title_with_frontmatter(self):
-        post = {"attributes": {"title": "Test Title"}}
+        attributes = {"title": "Test Title"}
         md_file = Path("test_file.md")
-        self.assertEqual(get_title(md_file, post), "Test Title")
+        self.assertEqual(get_title(md_file, attributes), "Test Title")
 
     def test_get_title_without_frontmatter(self):
-        post = {}
+        attributes = {}
         md_file = Path("test_file_name.md")
-        self.assertEqual(get_title(md_file, post), "Test File Name")
+        self.assertEqual(get_title(md_file, attributes), "Test File Name")
 
-    def test_get_title_with_empty_frontmatter(self):
-        post = {"attributes": {}}
-        md_file = Path("test_file.md")
-        self.assertEqual(get_title(md_file, post), "Test File")
+    def test_get_title_with_non_string_title(self):
+        self.assertEqual(get_title(Path("test_file.md"), {"title": 2024}), "2024")
+        self.assertEqual(get_title(Path("test_file.md"), {"title": None}), "test_file")
 
-    def test_get_content_with_frontmatter(self):
-        post = {"body": "Test content"}
+    def test_read_markdown_file(self):
         md_file = Path("test.md")
-        self.assertEqual(get_content(md_file, post), "Test content")
+        data = b"---\ntitle: Test Title\n---\n\nTest content"
+
+        markdown_file = read_markdown_file(md_file, md_file, data, "hash")
+
+        self.assertEqual(markdown_file.title, "Test Title")
+        self.assertEqual(markdown_file.content, "Test content")
+        self.assertEqual(markdown_file.content_hash, "hash")
+
+    def test_read_markdown_file_without_frontmatter(self):
+        md_file = Path("test_file.md")
+        data = b"# Heading\n\n---\n\nText\n\n---\n"
 
-    @patch("nogisync.notion.find_notion_page")
-    @patch("nogisync.notion.create_notion_page")
-    def test_process_page_hierarchy_creates_new_pages(self, mock_create_page, mock_find_page):
-        mock_find_page.return_value = None
+        markdown_file = read_markdown_file(md_file, md_file, data, "hash")
+
+        self.assertEqual(markdown_file.title, "Test File")
+        self.assertEqual(markdown_file.content, data.decode())
+
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_process_page_hierarchy_creates_new_pages(self, mock_create_page):
         mock_create_page.side_effect = lambda client, parent_id, title, content: {"id": f"new_page_id_{title}"}
+        index = PageIndex()
 
         path = Path("dir1/dir2/file.md")
         base_parent_id = "base_id"
 
-        result = process_page_hierarchy(None, base_parent_id, path)
+        result = asyncio.run(process_page_hierarchy(None, index, base_parent_id, path))
 
         self.assertEqual(mock_create_page.call_count, 2)
         mock_create_page.assert_any_call(None, "base_id", "Dir1", "")
         mock_create_page.assert_any_call(None, "new_page_id_Dir1", "Dir2", "")
         self.assertEqual(result, "new_page_id_Dir2")
+        self.assertEqual(index.get("base_id", "Dir1"), "new_page_id_Dir1")
+        self.assertEqual(index.get("new_page_id_Dir1", "Dir2"), "new_page_id_Dir2")
 
-    @patch("nogisync.notion.find_notion_page")
-    @patch("nogisync.notion.create_notion_page")
-    def test_process_page_hierarchy_uses_existing_pages(self, mock_create_page, mock_find_page):
-        mock_find_page.side_effect = lambda client, title, parent_id: {"id": f"existing_page_id_{title}"}
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_process_page_hierarchy_uses_existing_pages(self, mock_create_page):
+        index = PageIndex()
+        index.add("base_id", "Dir1", "existing_page_id_Dir1")
+        index.add("existing_page_id_Dir1", "Dir2", "existing_page_id_Dir2")
 
         path = Path("dir1/dir2/file.md")
         base_parent_id = "base_id"
 
-        result = process_page_hierarchy(None, base_parent_id, path)
+        result = asyncio.run(process_page_hierarchy(None, index, base_parent_id, path))
 
         mock_create_page.assert_not_called()
         self.assertEqual(result, "existing_page_id_Dir2")
 
-    @patch("nogisync.notion.find_notion_page")
-    @patch("nogisync.notion.create_notion_page")
-    def test_process_page_hierarchy_mixed_existing_and_new(self, mock_create_page, mock_find_page):
-        def mock_find(client, title, parent_id):
-            if title == "Dir1":
-                return {"id": "existing_dir1"}
-            return None
-
-        mock_find_page.side_effect = mock_find
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_process_page_hierarchy_mixed_existing_and_new(self, mock_create_page):
+        index = PageIndex()
+        index.add("base_id", "Dir1", "existing_dir1")
         mock_create_page.side_effect = lambda client, parent_id, title, content: {"id": f"new_page_id_{title}"}
 
         path = Path("dir1/dir2/file.md")
         base_parent_id = "base_id"
 
-        result = process_page_hierarchy(None, base_parent_id, path)
+        result = asyncio.run(process_page_hierarchy(None, index, base_parent_id, path))
 
         mock_create_page.assert_called_once_with(None, "existing_dir1", "Dir2", "")
         self.assertEqual(result, "new_page_id_Dir2")
@@ -78,21 +117,240 @@ class TestCli(TestCase):
         path = Path("file.md")
         base_parent_id = "base_id"
 
-        result = process_page_hierarchy(None, base_parent_id, path)
+        result = asyncio.run(process_page_hierarchy(None, PageIndex(), base_parent_id, path))
 
         self.assertEqual(result, base_parent_id)
 
-    @patch("builtins.open")
-    def test_get_content_without_frontmatter(self, mock_open):
-        mock_open.return_value.__enter__.return_value.read.return_value = "File content"
-        post = {}
-        md_file = Path("test.md")
-        self.assertEqual(get_content(md_file, post), "File content")
-        mock_open.assert_called_once_with(md_file, "r")
+    @patch("nogisync.notion.get_notion_client")
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_sync_path_limits_concurrency(self, mock_create_page, mock_get_client):
+        mock_get_client.return_value = AsyncMock()
+        mock_get_client.return_value.blocks.children.list.return_value = {"results": [], "has_more": False}
+        active = 0
+        max_active = 0
+
+        async def create_page(client, parent_id, title, content, cache=None, blocks=None):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"id": f"new_page_id_{title}"}
+
+        mock_create_page.side_effect = create_page
+
+        with TemporaryDirectory() as tmp_dir:
+            for i in range(6):
+                Path(tmp_dir, f"file_{i}.md").write_text(f"# File {i}")
+            asyncio.run(sync_path("token", "base_id", Path(tmp_dir), SyncOptions(concurrency=2)))
+
+        self.assertEqual(mock_create_page.call_count, 6)
+        self.assertEqual(max_active, 2)
+        mock_get_client.assert_called_once()
+        mock_get_client.return_value.aclose.assert_awaited_once()
+
+    @patch("nogisync.notion.update_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_sync_file_updates_indexed_page(self, mock_create_page, mock_update_page):
+        index = PageIndex()
+        index.add("base_id", "Dir1", "existing_dir1")
+        index.add("existing_dir1", "Test File", "existing_page")
+
+        markdown_file = MarkdownFile(
+            Path("dir1/test_file.md"), Path("dir1/test_file.md"), "hash", "Test File", "# Content"
+        )
+        manifest = SyncManifest(None, "base_id")
+        mock_update_page.return_value = ["block1"]
+
+        asyncio.run(sync_file(None, index, "existing_dir1", markdown_file, asyncio.Semaphore(1), manifest))
+
+        mock_create_page.assert_not_called()
+        mock_update_page.assert_awaited_once_with(None, "existing_page", "# Content", cache=None, blocks=None)
+        self.assertEqual(
+            manifest.get(Path("dir1/test_file.md")), ManifestEntry("hash", "Test File", "existing_page", ["block1"])
+        )
+
+    @patch("nogisync.notion.update_notion_page", new_callable=AsyncMock)
+    def test_sync_file_forgets_stored_page_when_update_fails(self, mock_update_page):
+        markdown_file = MarkdownFile(Path("a.md"), Path("a.md"), "new_hash", "A", "# Content", page_id="stored_page")
+        manifest = SyncManifest(None, "base_id", {"a.md": ManifestEntry("old_hash", "A", "stored_page")})
+        mock_update_page.return_value = None
+
+        asyncio.run(sync_file(None, PageIndex(), None, markdown_file, asyncio.Semaphore(1), manifest))
+
+        mock_update_page.assert_awaited_once_with(None, "stored_page", "# Content", cache=None, blocks=None)
+        self.assertIsNone(manifest.get(Path("a.md")))
+
+    @patch("nogisync.notion.get_notion_client")
+    @patch("nogisync.notion.update_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_sync_path_with_manifest_skips_unchanged_files(self, mock_create_page, mock_update_page, mock_get_client):
+        mock_get_client.return_value = AsyncMock()
+        mock_update_page.return_value = ["block1"]
+
+        with TemporaryDirectory() as tmp_dir:
+            docs = Path(tmp_dir, "docs")
+            docs.mkdir()
+            Path(docs, "unchanged.md").write_text("# Unchanged")
+            Path(docs, "changed.md").write_text("# Changed")
+            manifest_path = Path(tmp_dir, "manifest.json")
+            SyncManifest(
+                manifest_path,
+                "base_id",
+                {
+                    "unchanged.md": ManifestEntry(hash_content(b"# Unchanged"), "Unchanged", "unchanged_page"),
+                    "changed.md": ManifestEntry("old_hash", "Changed", "changed_page"),
+                },
+            ).save()
+
+            asyncio.run(sync_path("token", "base_id", docs, SyncOptions(manifest_path=manifest_path)))
+
+            manifest = SyncManifest.load(manifest_path, "base_id")
+
+        # The changed file goes straight to its stored page, so the page tree is never listed
+        mock_get_client.return_value.blocks.children.list.assert_not_called()
+        mock_create_page.assert_not_called()
+        mock_update_page.assert_awaited_once_with(
+            mock_get_client.return_value, "changed_page", "# Changed", cache=ANY, blocks=None
+        )
+        self.assertEqual(manifest.get(Path("changed.md")).content_hash, hash_content(b"# Changed"))
+        self.assertEqual(manifest.get(Path("changed.md")).block_ids, ["block1"])
+
+    @patch("nogisync.changes.get_changed_markdown_files", return_value=[])
+    @patch("nogisync.notion.get_notion_client")
+    @patch("nogisync.notion.update_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_sync_path_resyncs_files_from_an_older_parser(
+        self, mock_create_page, mock_update_page, mock_get_client, mock_get_changes
+    ):
+        mock_get_client.return_value = AsyncMock()
+        mock_update_page.return_value = ["block1"]
+
+        for since in (None, "base"):
+            mock_update_page.reset_mock()
+            with TemporaryDirectory() as tmp_dir:
+                docs = Path(tmp_dir, "docs")
+                docs.mkdir()
+                Path(docs, "table.md").write_text("| a | b |")
+                Path(docs, "current.md").write_text("# Current")
+                manifest_path = Path(tmp_dir, "manifest.json")
+                SyncManifest(
+                    manifest_path,
+                    "base_id",
+                    {
+                        "table.md": ManifestEntry(hash_content(b"| a | b |"), "Table", "table_page", None, 1),
+                        "current.md": ManifestEntry(hash_content(b"# Current"), "Current", "current_page"),
+                        "gone.md": ManifestEntry("hash", "Gone", "gone_page", None, 1),
+                    },
+                ).save()
+
+                options = SyncOptions(manifest_path=manifest_path, since=since)
+                asyncio.run(sync_path("token", "base_id", docs, options))
+                manifest = SyncManifest.load(manifest_path, "base_id")
+
+            # The unchanged file goes into the page it has, and is up to date afterwards
+            mock_create_page.assert_not_called()
+            mock_update_page.assert_awaited_once_with(ANY, "table_page", "| a | b |", cache=ANY, blocks=None)
+            self.assertEqual(manifest.get_outdated(), [Path("gone.md")])
+
+    @patch("nogisync.changes.get_changed_markdown_files")
+    @patch("nogisync.notion.get_notion_client")
+    @patch("nogisync.notion.archive_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.rename_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.move_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.update_notion_page", new_callable=AsyncMock)
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    def test_sync_path_since_moves_renamed_and_archives_deleted_pages(
+        self,
+        mock_create_page,
+        mock_update_page,
+        mock_move_page,
+        mock_rename_page,
+        mock_archive_page,
+        mock_get_client,
+        mock_get_changes,
+    ):
+        client = mock_get_client.return_value = AsyncMock()
+        client.blocks.children.list.return_value = {
+            "results": [{"id": "guides_page", "type": "child_page", "child_page": {"title": "Guides"}}],
+            "has_more": False,
+        }
+        mock_archive_page.return_value = True
+        mock_get_changes.return_value = [
+            FileChange(RENAMED, Path("guides/new_name.md"), Path("old_name.md"), content_changed=False),
+            FileChange(DELETED, Path("deleted.md")),
+        ]
+
+        with TemporaryDirectory() as tmp_dir:
+            docs = Path(tmp_dir, "docs")
+            Path(docs, "guides").mkdir(parents=True)
+            Path(docs, "guides", "new_name.md").write_text("# Same content")
+            Path(docs, "untouched.md").write_text("# Not in the diff")
+            manifest_path = Path(tmp_dir, "manifest.json")
+            SyncManifest(
+                manifest_path,
+                "base_id",
+                {
+                    "old_name.md": ManifestEntry(hash_content(b"# Same content"), "Old Name", "renamed_page", ["b1"]),
+                    "deleted.md": ManifestEntry("hash", "Deleted", "deleted_page"),
+                },
+            ).save()
+
+            options = SyncOptions(manifest_path=manifest_path, since="base")
+            asyncio.run(sync_path("token", "base_id", docs, options))
+            manifest = SyncManifest.load(manifest_path, "base_id")
+
+        mock_get_changes.assert_called_once_with(docs, "base")
+        mock_move_page.assert_awaited_once_with(client, "renamed_page", "guides_page")
+        mock_rename_page.assert_awaited_once_with(client, "renamed_page", "New Name")
+        mock_archive_page.assert_awaited_once_with(client, "deleted_page")
+        mock_update_page.assert_not_called()
+        mock_create_page.assert_not_called()
+        self.assertEqual(
+            manifest.entries,
+            {"guides/new_name.md": ManifestEntry(hash_content(b"# Same content"), "New Name", "renamed_page", ["b1"])},
+        )
+
+    def test_get_roots(self):
+        with TemporaryDirectory() as tmp_dir:
+            config_path = Path(tmp_dir, "nogisync.toml")
+            config_path.write_text('[[roots]]\npath = "."\nparent_page_id = "config"\n')
+
+            roots = get_roots((Path("docs"),), ("docs",), str(config_path), None, mirror=False)
+            self.assertEqual(roots, [SyncRoot(Path("docs"), "docs"), SyncRoot(Path(tmp_dir).resolve(), "config")])
+            # Roots below the same parent page get manifests of their own
+            shared = get_roots((Path("a"), Path("b")), ("same", "same"), None, Path("m.json"), mirror=False)
+            self.assertNotEqual(shared[0].manifest_path, shared[1].manifest_path)
+            # A single root keeps the manifest it was given
+            self.assertEqual(get_roots((Path("docs"),), ("docs",), "", Path("m.json"), False)[0].manifest_path, None)
+
+            for paths, parent_page_ids, config, mirror in (
+                ((Path("a"),), (), None, False),
+                ((), (), "", False),
+                ((Path("a"), Path("b")), ("same", "same"), None, True),
+                ((), (), str(Path(tmp_dir, "missing.toml")), False),
+            ):
+                with self.assertRaises(click.UsageError):
+                    get_roots(paths, parent_page_ids, config, None, mirror)
+
+    def test_parse_markdown_files_with_parse_workers(self):
+        def read_files():
+            return [
+                read_markdown_file(Path(f"file_{i}.md"), Path(f"file_{i}.md"), f"# Heading {i}".encode(), f"hash{i}")
+                for i in range(6)
+            ]
+
+        serial = list(parse_markdown_files(read_files(), SyncOptions()))
+        parallel = list(parse_markdown_files(read_files(), SyncOptions(parse_workers=2)))
+
+        self.assertEqual([markdown_file.content_hash for markdown_file in parallel], [f"hash{i}" for i in range(6)])
+        self.assertEqual(parallel[3].blocks, parse_blocks("# Heading 3"))
+        self.assertIsNone(serial[3].blocks)
+        self.assertEqual([markdown_file.content for markdown_file in serial], [f.content for f in parallel])
 
     @patch("sys.argv", ["nogisync"])
     def test_main_without_required_args(self):
-        with self.assertRaises(TypeError):
+        with self.assertRaises(SystemExit):
             main()
 
     @patch("sys.argv", ["nogisync", "--help"])
@@ -109,3 +367,232 @@ class TestCli(TestCase):
     def test_main_with_version_flag(self):
         with self.assertRaises(SystemExit):
             main()
+
+
+class FakeNotionTestCase(TestCase):
+    """Syncs markdown files from a temporary directory to a page called Docs in a fake Notion workspace"""
+
+    def setUp(self):
+        self.fake = FakeNotion()
+        self.parent_page_id = self.fake.add_page("Docs")
+        self.tmp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.docs = self.tmp_dir / "docs"
+        self.docs.mkdir()
+        self.enterContext(use_fake_notion(self.fake))
+
+    def write(self, *names: str, text: str = "# Text") -> None:
+        for name in names:
+            Path(self.docs, name).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.docs, name).write_text(text)
+
+    def sync(self, options: SyncOptions | None = None) -> str:
+        """Syncs the docs directory with fresh request counts and returns what the sync printed"""
+        self.fake.reset_stats()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            asyncio.run(sync_path("token", self.parent_page_id, self.docs, options))
+        return output.getvalue()
+
+    def plan(self, options: SyncOptions | None = None) -> SyncPlan:
+        self.fake.reset_stats()
+        with redirect_stdout(io.StringIO()):
+            return asyncio.run(plan_path("token", self.parent_page_id, self.docs, options))
+
+    def get_child(self, page_id: str, title: str) -> str:
+        return self.fake.children[page_id][self.fake.get_child_titles(page_id).index(title)]
+
+
+class TestSyncWithFakeNotion(FakeNotionTestCase):
+    def test_sync_path_writes_request_reports(self):
+        self.write("guides/setup.md", text="# Setup")
+        options = SyncOptions(
+            stats_path=Path(self.tmp_dir, "stats.json"), summary_path=Path(self.tmp_dir, "summary.md")
+        )
+
+        self.sync(options)
+
+        stats = json.loads(options.stats_path.read_text())
+        self.assertEqual(self.fake.get_child_titles(self.parent_page_id), ["Guides"])
+        self.assertEqual(stats["total"]["calls"], self.fake.total_requests)
+        self.assertEqual(stats["endpoints"]["pages.create"]["calls"], 2)
+        self.assertEqual(stats["files"]["guides/setup.md"]["calls"], 1)
+        self.assertIn("| pages.create | 2 |", options.summary_path.read_text())
+
+    def test_sync_path_skips_ignored_and_excluded_files(self):
+        self.write("guides/setup.md", "guides/drafts/idea.md", "node_modules/pkg/README.md", "deep/a/b/c.md")
+        Path(self.docs, ".gitignore").write_text("node_modules/\n")
+
+        self.sync(SyncOptions(exclude=("drafts",), max_depth=2))
+
+        self.assertEqual(self.fake.get_child_titles(self.parent_page_id), ["Guides"])
+        self.assertEqual(self.fake.get_child_titles(self.get_child(self.parent_page_id, "Guides")), ["Setup"])
+
+    def test_sync_path_profiles_phases(self):
+        self.write("guides/setup.md", text="# Setup\n\nSome text")
+        options = SyncOptions(concurrency=1, profile_path=Path(self.tmp_dir, "sync.pstats"))
+
+        report = self.sync(options)
+
+        self.assertTrue(options.profile_path.exists())
+        for name in ("discovery", "read", "parse", "hierarchy", "append"):
+            self.assertRegex(report, rf"\n  {name} +\d+\.\d+s")
+        self.assertRegex(report, r"s guides/setup\.md \(.*append")
+
+    def test_plan_path_matches_sync_without_writing(self):
+        self.write("guides/setup.md", text="# Setup\n\nFirst\n\nSecond")
+        self.write("intro.md", text="# Intro")
+        options = SyncOptions(manifest_path=Path(self.tmp_dir, "manifest.json"))
+
+        def plan_and_sync() -> tuple[dict, dict]:
+            sync_plan = self.plan(options)
+            # Planning only reads
+            self.assertEqual(set(self.fake.requests), {"blocks.children.list"})
+            self.sync(options)
+            self.assertEqual(sum(sync_plan.requests.values()), self.fake.total_requests)
+            return {file.relative_path.as_posix(): file.action for file in sync_plan.files}, dict(sync_plan.requests)
+
+        actions, requests = plan_and_sync()
+        self.assertEqual(actions, {"guides/setup.md": "create", "intro.md": "create"})
+        self.assertEqual(requests, {"blocks.children.list": 1, "pages.create": 3})
+
+        self.write("guides/setup.md", text="# Setup\n\nFirst\n\nChanged")
+        actions, requests = plan_and_sync()
+        self.assertEqual(actions, {"guides/setup.md": "update", "intro.md": "unchanged"})
+        self.assertEqual(requests, {"blocks.children.list": 1, "blocks.update": 1})
+
+    def test_sync_path_lists_only_directory_pages(self):
+        names = [f"guides/advanced/{number}.md" for number in range(20)] + [f"api/{number}.md" for number in range(20)]
+        self.write(*names, "intro.md", text="# Text\n\nSome content")
+        options = SyncOptions(manifest_path=Path(self.tmp_dir, "manifest.json"))
+        self.sync(options)
+
+        self.write("guides/advanced/new.md", text="# New")
+        self.sync(options)
+
+        # The root, Guides and Advanced are listed, but none of the file pages
+        self.assertEqual(self.fake.requests["blocks.children.list"], 3)
+        self.assertEqual(self.fake.requests["pages.create"], 1)
+
+    def test_sync_path_updates_page_starting_with_table(self):
+        paragraphs = "\n\n".join(f"Paragraph {number}" for number in range(150))
+        self.write("page.md", text=f"| A | B |\n| - | - |\n| 1 | 2 |\n\n{paragraphs}")
+        options = SyncOptions(manifest_path=Path(self.tmp_dir, "manifest.json"))
+        self.sync(options)
+        page_id = self.fake.children[self.parent_page_id][0]
+
+        self.write("page.md", text=f"| A | B |\n| - | - |\n| 1 | 2 |\n\n{paragraphs}\n\nOne more")
+        self.sync(options)
+
+        # The table is matched through its rows, so the line is appended without touching anything else
+        self.assertEqual(self.fake.requests, {"blocks.children.list": 3, "blocks.children.append": 1})
+
+        self.write("page.md", text=f"| A | B |\n| - | - |\n| 1 | 3 |\n\n{paragraphs}\n\nOne more")
+        self.sync(options)
+
+        # Only the changed row is updated
+        self.assertEqual(self.fake.requests, {"blocks.children.list": 3, "blocks.update": 1})
+        self.assertEqual(self.fake.get_block_types(page_id), ["table"] + ["paragraph"] * 151)
+        table_id = self.fake.children[page_id][0]
+        cells = [self.fake.blocks[row]["table_row"]["cells"] for row in self.fake.children[table_id]]
+        self.assertEqual(cells[1][1][0]["plain_text"], "3")
+
+    def test_sync_path_mirror_archives_orphaned_pages(self):
+        self.write("guides/setup.md", "guides/old.md", "archive/gone.md", "intro.md")
+        options = SyncOptions(manifest_path=Path(self.tmp_dir, "manifest.json"), mirror=True)
+        self.sync(options)
+        guides_id = self.get_child(self.parent_page_id, "Guides")
+        setup_id = self.get_child(guides_id, "Setup")
+        self.fake.add_page("Meeting Notes", setup_id)
+        self.fake.add_page("Stray", self.parent_page_id)
+
+        Path(self.docs, "guides", "old.md").unlink()
+        Path(self.docs, "archive", "gone.md").unlink()
+        Path(self.docs, "archive").rmdir()
+        sync_plan = self.plan(options)
+        self.sync(options)
+
+        self.assertEqual(sorted(sync_plan.orphans), [Path("Archive"), Path("Guides/Old"), Path("Stray")])
+        self.assertEqual(sum(sync_plan.requests.values()), self.fake.total_requests)
+        # One walk of the page tree, and one archive call per orphan; the page below Archive goes with it
+        self.assertEqual(self.fake.requests["pages.update"], 3)
+        self.assertEqual(set(self.fake.requests), {"blocks.children.list", "pages.update"})
+        self.assertEqual(self.fake.get_child_titles(self.parent_page_id), ["Guides", "Intro"])
+        self.assertEqual(self.fake.get_child_titles(guides_id), ["Setup"])
+        self.assertEqual(self.fake.get_child_titles(setup_id), ["Meeting Notes"])
+
+        # A path without any markdown files is more likely a mistake than a request to archive everything
+        for md_file in self.docs.rglob("*.md"):
+            md_file.unlink()
+        with self.assertLogs(level="WARNING"):
+            self.sync(SyncOptions(mirror=True))
+        self.assertEqual(self.fake.get_child_titles(self.parent_page_id), ["Guides", "Intro"])
+
+    def test_sync_roots_share_one_client(self):
+        api_page_id = self.fake.add_page("API")
+        guides_page_id = self.fake.add_page("Guides")
+        self.write("api/users.md", "api/v2/orders.md", "guides/setup.md")
+        roots = get_roots(
+            (Path(self.docs, "api"), Path(self.docs, "guides")),
+            (api_page_id, guides_page_id),
+            None,
+            Path(self.tmp_dir, "manifest.json"),
+            mirror=True,
+        )
+        clients = []
+        fake_get_client = notion.get_notion_client
+
+        def get_client(*args, **kwargs):
+            clients.append(fake_get_client(*args, **kwargs))
+            return clients[-1]
+
+        with patch.object(notion, "get_notion_client", get_client), redirect_stdout(io.StringIO()):
+            asyncio.run(sync_roots("token", roots, SyncOptions(mirror=True)))
+            (api_plan, guides_plan) = asyncio.run(plan_roots("token", roots))
+        manifests = sorted(path.name for path in self.tmp_dir.glob("manifest-*.json"))
+
+        self.assertEqual(len(clients), 1)
+        self.assertEqual(self.fake.get_child_titles(api_page_id), ["V2", "Users"])
+        self.assertEqual(self.fake.get_child_titles(guides_page_id), ["Setup"])
+        # Mirroring one root leaves the pages of the other alone
+        self.assertEqual(self.fake.get_child_titles(self.fake.children[api_page_id][0]), ["Orders"])
+        self.assertEqual(
+            manifests,
+            sorted(root.manifest_path.name for root in roots if root.manifest_path is not None),
+        )
+        self.assertEqual(len(manifests), 2)
+        self.assertEqual({file.action for file in api_plan.files + guides_plan.files}, {"unchanged"})
+
+    def test_sync_roots_below_one_parent_create_each_page_once(self):
+        for name in ("a/guides/one.md", "a/intro.md", "b/guides/two.md", "b/intro.md"):
+            self.write(name, text=f"# {name}")
+        roots = get_roots(
+            (Path(self.docs, "a"), Path(self.docs, "b")),
+            (self.parent_page_id,) * 2,
+            None,
+            Path(self.tmp_dir, "manifest.json"),
+            False,
+        )
+
+        with redirect_stdout(io.StringIO()):
+            asyncio.run(sync_roots("token", roots))
+
+        self.assertEqual(sorted(self.fake.get_child_titles(self.parent_page_id)), ["Guides", "Intro"])
+        guides_id = self.get_child(self.parent_page_id, "Guides")
+        self.assertEqual(sorted(self.fake.get_child_titles(guides_id)), ["One", "Two"])
+        self.assertEqual(self.fake.requests["pages.create"], 4)
+
+    @patch("nogisync.ingest.parse_document", wraps=ingest.parse_document)
+    def test_sync_path_reads_each_changed_file_once(self, mock_parse_document):
+        self.write("plain.md", text="# Plain\n\n---\n\nNo front matter")
+        self.write("titled.md", text="---\ntitle: Custom\n---\n# Titled")
+        options = SyncOptions(manifest_path=Path(self.tmp_dir, "manifest.json"))
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            self.sync(options)
+        opened = [Path(call.args[0]).name for call in mock_open.call_args_list if str(call.args[0]).endswith(".md")]
+        # An unchanged file is only hashed
+        self.sync(options)
+
+        self.assertEqual(sorted(opened), ["plain.md", "titled.md"])
+        self.assertEqual(mock_parse_document.call_count, 2)
+        self.assertEqual(self.fake.get_child_titles(self.parent_page_id), ["Plain", "Custom"])
@@ -0,0 +1,56 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from nogisync.config import ConfigError, SyncRoot, get_manifest_path, load_config
+
+
+class TestConfig(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.directory = Path(self.tmp_dir.name)
+        Path(self.directory, "docs", "api").mkdir(parents=True)
+        Path(self.directory, "guides").mkdir()
+        self.config = self.directory / "nogisync.toml"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_config(self):
+        self.config.write_text(
+            '[[roots]]\npath = "docs/api"\nparent_page_id = "api"\nmanifest = ".nogisync/api.json"\n\n'
+            '[[roots]]\npath = "guides"\nparent_page_id = "guides"\n'
+        )
+
+        roots = load_config(self.config)
+
+        self.assertEqual(
+            roots,
+            [
+                SyncRoot((self.directory / "docs/api").resolve(), "api", self.directory / ".nogisync/api.json"),
+                SyncRoot((self.directory / "guides").resolve(), "guides"),
+            ],
+        )
+
+    def test_unusable_config(self):
+        for text, message in (
+            ("roots = [", "Could not read"),
+            ('path = "docs"', r"has no \[\[roots\]\]"),
+            ('[[roots]]\npath = "docs"', "needs a path and a parent_page_id"),
+            ('[[roots]]\npath = "docs"\nparent_page_id = "id"\nmanifest = 1', "should be a path"),
+            ('[[roots]]\npath = "missing"\nparent_page_id = "id"', "is not a directory"),
+        ):
+            self.config.write_text(text)
+            with self.assertRaisesRegex(ConfigError, message):
+                load_config(self.config)
+
+        with self.assertRaisesRegex(ConfigError, "Could not read"):
+            load_config(self.directory / "missing.toml")
+
+    def test_get_manifest_path(self):
+        manifest_path = get_manifest_path(Path("state/manifest.json"), SyncRoot(Path("docs"), "abc"))
+
+        self.assertRegex(manifest_path.as_posix(), r"^state/manifest-abc-[0-9a-f]{8}\.json$")
+        self.assertEqual(manifest_path, get_manifest_path(Path("state/manifest.json"), SyncRoot(Path("docs"), "abc")))
+        # Roots below the same parent page keep manifests of their own
+        self.assertNotEqual(manifest_path, get_manifest_path(Path("state/manifest.json"), SyncRoot(Path("api"), "abc")))
@@ -0,0 +1,232 @@
+import copy
+from unittest import TestCase
+
+from nogisync.diff import (
+    DELETE,
+    INSERT,
+    KEEP,
+    UPDATE,
+    BlockOperation,
+    block_fingerprint,
+    diff_blocks,
+    get_anchor,
+    get_update_payload,
+)
+from nogisync.markdown import parse_md
+
+
+def as_remote(block_id: str, block: dict, with_children: bool = False) -> dict:
+    """
+    Dresses a parsed block up the way Notion returns it from blocks.children.list, or with ``with_children`` the way
+    list_block_tree returns it
+    """
+    remote = copy.deepcopy(block)
+    payload = remote[remote["type"]]
+    if with_children and "children" in payload:
+        payload["children"] = [
+            as_remote(f"{block_id}.{i}", child, with_children) for i, child in enumerate(payload["children"])
+        ]
+    for item in payload.get("rich_text", []):
+        if item["type"] == "text":
+            item["text"].setdefault("link", None)
+            item.setdefault(
+                "annotations",
+                {
+                    "bold": False,
+                    "italic": False,
+                    "strikethrough": False,
+                    "underline": False,
+                    "code": False,
+                    "color": "default",
+                },
+            )
+            item.setdefault("plain_text", item["text"]["content"])
+            item.setdefault("href", None)
+    payload["color"] = "default"
+    if not with_children:
+        payload.pop("children", None)
+    return {"object": "block", "id": block_id, "has_children": "children" in block[block["type"]], **remote}
+
+
+def remote_page(markdown: str, with_children: bool = False) -> list[dict]:
+    return [as_remote(f"b{i}", block, with_children) for i, block in enumerate(parse_md(markdown))]
+
+
+class TestDiff(TestCase):
+    def test_block_fingerprint_matches_remote_block(self):
+        for block in parse_md("# Title\n\nSome **bold** and [a link](https://example.com)\n\n```python\nx = 1\n```"):
+            self.assertEqual(block_fingerprint(block), block_fingerprint(as_remote("id", block)))
+
+    def test_block_fingerprint_differs_on_content(self):
+        first, second = parse_md("Hello\n\nHello!")
+        self.assertNotEqual(block_fingerprint(first), block_fingerprint(second))
+
+    def test_block_fingerprint_merges_neighbouring_runs(self):
+        split = {"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "a"}}] * 2}}
+        merged = {"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "aa"}}]}}
+        self.assertEqual(block_fingerprint(split), block_fingerprint(merged))
+
+    def test_diff_blocks_unchanged(self):
+        operations = diff_blocks(remote_page("A\n\nB\n\nC"), parse_md("A\n\nB\n\nC"))
+
+        self.assertEqual([op.kind for op in operations], [KEEP, KEEP, KEEP])
+
+    def test_diff_blocks_updates_changed_block_in_place(self):
+        blocks = parse_md("A\n\nB changed\n\nC")
+
+        operations = diff_blocks(remote_page("A\n\nB\n\nC"), blocks)
+
+        self.assertEqual(
+            operations,
+            [BlockOperation(KEEP, "b0"), BlockOperation(UPDATE, "b1", [blocks[1]]), BlockOperation(KEEP, "b2")],
+        )
+
+    def test_diff_blocks_replaces_block_of_other_type(self):
+        blocks = parse_md("A\n\n# B\n\nC")
+
+        operations = diff_blocks(remote_page("A\n\nB\n\nC"), blocks)
+
+        self.assertEqual(
+            operations,
+            [
+                BlockOperation(KEEP, "b0"),
+                BlockOperation(DELETE, "b1"),
+                BlockOperation(INSERT, blocks=[blocks[1]]),
+                BlockOperation(KEEP, "b2"),
+            ],
+        )
+
+    def test_diff_blocks_inserts_and_deletes(self):
+        blocks = parse_md("A\n\nNew\n\nB\n\nD")
+
+        operations = diff_blocks(remote_page("A\n\nB\n\nC\n\nD"), blocks)
+
+        self.assertEqual(
+            operations,
+            [
+                BlockOperation(KEEP, "b0"),
+                BlockOperation(INSERT, blocks=[blocks[1]]),
+                BlockOperation(KEEP, "b1"),
+                BlockOperation(DELETE, "b2"),
+                BlockOperation(KEEP, "b3"),
+            ],
+        )
+
+    def test_diff_blocks_rewrites_page_for_insertion_at_the_top(self):
+        blocks = parse_md("# New\n\nA\n\nB")
+
+        operations = diff_blocks(remote_page("A\n\nB"), blocks)
+
+        self.assertEqual(
+            operations,
+            [BlockOperation(DELETE, "b0"), BlockOperation(DELETE, "b1"), BlockOperation(INSERT, blocks=blocks)],
+        )
+
+    def test_diff_blocks_reinserts_leading_blocks_after_first_deleted_block(self):
+        blocks = parse_md("# New\n\nA\n\nB\n\nD")
+
+        operations = diff_blocks(remote_page("A\n\nB\n\nC\n\nD"), blocks)
+
+        self.assertEqual(
+            operations,
+            [
+                BlockOperation(DELETE, "b0"),
+                BlockOperation(DELETE, "b1"),
+                BlockOperation(DELETE, "b2"),
+                BlockOperation(INSERT, blocks=blocks[:3]),
+                BlockOperation(KEEP, "b3"),
+            ],
+        )
+        self.assertEqual(get_anchor(operations), "b2")
+
+    def test_diff_blocks_anchors_replaced_first_block_to_itself(self):
+        blocks = parse_md("# A\n\n" + "\n\n".join(f"P{i}" for i in range(150)))
+
+        operations = diff_blocks(remote_page("A\n\n" + "\n\n".join(f"P{i}" for i in range(150))), blocks)
+
+        self.assertEqual(operations[:2], [BlockOperation(DELETE, "b0"), BlockOperation(INSERT, blocks=blocks[:1])])
+        self.assertEqual({op.kind for op in operations[2:]}, {KEEP})
+        self.assertEqual(get_anchor(operations), "b0")
+
+    def test_get_anchor_without_leading_insert(self):
+        self.assertIsNone(get_anchor(diff_blocks(remote_page("A\n\nB"), parse_md("A\n\nNew\n\nB"))))
+        self.assertIsNone(get_anchor(diff_blocks(remote_page("A"), parse_md("B\n\n# C"))))
+
+    def test_diff_blocks_appends_to_empty_page(self):
+        blocks = parse_md("A\n\nB")
+
+        self.assertEqual(diff_blocks([], blocks), [BlockOperation(INSERT, blocks=blocks)])
+
+    def test_diff_blocks_replaces_blocks_with_unlisted_children(self):
+        blocks = parse_md("- Item\n  - Nested")
+
+        operations = diff_blocks(remote_page("- Item\n  - Nested"), blocks)
+
+        self.assertEqual(operations, [BlockOperation(DELETE, "b0"), BlockOperation(INSERT, blocks=blocks)])
+
+    def test_diff_blocks_matches_blocks_with_listed_children(self):
+        markdown = "| A | B |\n| - | - |\n| 1 | 2 |\n\n- Item\n  - Nested\n\nText"
+        remote = remote_page(markdown, with_children=True)
+
+        self.assertEqual([op.kind for op in diff_blocks(remote, parse_md(markdown))], [KEEP, KEEP, KEEP])
+
+        blocks = parse_md(markdown.replace("Nested", "Changed"))
+        operations = diff_blocks(remote, blocks)
+
+        self.assertEqual(
+            operations,
+            [
+                BlockOperation(KEEP, "b0"),
+                BlockOperation(DELETE, "b1"),
+                BlockOperation(INSERT, blocks=[blocks[1]]),
+                BlockOperation(KEEP, "b2"),
+            ],
+        )
+
+    def test_diff_blocks_updates_table_rows(self):
+        markdown = "| A | B |\n| - | - |\n| 1 | 2 |\n| 3 | 4 |\n\nText"
+        remote = remote_page(markdown, with_children=True)
+        blocks = parse_md("| A | B |\n| - | - |\n| 1 | 5 |\n| 3 | 4 |\n| 6 | 7 |\n\nText")
+        rows = blocks[0]["table"]["children"]
+
+        operations = diff_blocks(remote, blocks)
+
+        self.assertEqual(
+            operations,
+            [
+                BlockOperation(
+                    UPDATE,
+                    "b0",
+                    [blocks[0]],
+                    [
+                        BlockOperation(KEEP, "b0.0"),
+                        BlockOperation(UPDATE, "b0.1", [rows[1]]),
+                        BlockOperation(KEEP, "b0.2"),
+                        BlockOperation(INSERT, blocks=[rows[3]]),
+                    ],
+                ),
+                BlockOperation(KEEP, "b1"),
+            ],
+        )
+
+    def test_diff_blocks_replaces_tables_of_another_shape(self):
+        remote = remote_page("| A | B |\n| - | - |\n| 1 | 2 |", with_children=True)
+
+        for markdown in ("| A | B | C |\n| - | - | - |\n| 1 | 2 | 3 |", "| A | B |\n| 1 | 2 |"):
+            blocks = parse_md(markdown)
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    diff_blocks(remote, blocks), [BlockOperation(DELETE, "b0"), BlockOperation(INSERT, blocks=blocks)]
+                )
+
+    def test_diff_blocks_ignores_child_pages(self):
+        remote = remote_page("A") + [{"id": "sub", "type": "child_page", "child_page": {"title": "Sub"}}]
+
+        operations = diff_blocks(remote, parse_md("A"))
+
+        self.assertEqual(operations, [BlockOperation(KEEP, "b0")])
+
+    def test_get_update_payload(self):
+        block = parse_md("Hello")[0]
+
+        self.assertEqual(get_update_payload(block), {"paragraph": block["paragraph"]})
@@ -0,0 +1,160 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from nogisync.discovery import FileFinder, IgnoreRule, match_rules, parse_rules
+
+
+class TestIgnoreRules(TestCase):
+    def assertMatches(self, pattern: str, path: str, is_dir: bool = False, matches: bool = True):
+        rule = IgnoreRule.parse(pattern)
+        assert rule is not None
+        self.assertEqual(rule.matches(path, is_dir), matches, f"{pattern!r} against {path!r}")
+
+    def test_parse_skips_blank_lines_and_comments(self):
+        self.assertIsNone(IgnoreRule.parse(""))
+        self.assertIsNone(IgnoreRule.parse("   "))
+        self.assertIsNone(IgnoreRule.parse("# comment"))
+        self.assertMatches("\\#notes.md", "#notes.md")
+
+    def test_pattern_without_slash_matches_at_any_depth(self):
+        self.assertMatches("*.md", "a.md")
+        self.assertMatches("*.md", "docs/guides/a.md")
+        self.assertMatches("node_modules", "web/node_modules", is_dir=True)
+        self.assertMatches("*.md", "docs/a.mdx", matches=False)
+
+    def test_pattern_with_slash_is_anchored(self):
+        self.assertMatches("/build", "build", is_dir=True)
+        self.assertMatches("/build", "docs/build", is_dir=True, matches=False)
+        self.assertMatches("docs/*.md", "docs/a.md")
+        self.assertMatches("docs/*.md", "docs/guides/a.md", matches=False)
+        self.assertMatches("docs/*.md", "other/docs/a.md", matches=False)
+
+    def test_double_asterisk(self):
+        self.assertMatches("**/drafts", "drafts", is_dir=True)
+        self.assertMatches("**/drafts", "a/b/drafts", is_dir=True)
+        self.assertMatches("docs/**/a.md", "docs/a.md")
+        self.assertMatches("docs/**/a.md", "docs/x/y/a.md")
+        self.assertMatches("docs/**", "docs/x/y/a.md")
+        self.assertMatches("docs/**", "docs", is_dir=True, matches=False)
+
+    def test_wildcards_and_ranges(self):
+        self.assertMatches("note?.md", "note1.md")
+        self.assertMatches("note?.md", "note/.md", matches=False)
+        self.assertMatches("[ab].md", "a.md")
+        self.assertMatches("[!ab].md", "a.md", matches=False)
+        self.assertMatches("[!ab].md", "c.md")
+
+    def test_directory_only_pattern(self):
+        self.assertMatches("cache/", "cache", is_dir=True)
+        self.assertMatches("cache/", "cache", is_dir=False, matches=False)
+
+    def test_base_directory(self):
+        rule = IgnoreRule.parse("/out", "docs/")
+        assert rule is not None
+        self.assertTrue(rule.matches("docs/out", True))
+        self.assertFalse(rule.matches("out", True))
+
+    def test_last_matching_rule_decides(self):
+        rules = parse_rules(["*.md", "!keep.md", "drafts/keep.md"])
+
+        self.assertTrue(match_rules(rules, "a.md", False))
+        self.assertFalse(match_rules(rules, "keep.md", False))
+        self.assertTrue(match_rules(rules, "drafts/keep.md", False))
+        self.assertFalse(match_rules(rules, "a.txt", False))
+
+
+class TestFileFinder(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name, "repo")
+        (self.root / ".git").mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, *paths: str, content: str = "# Title"):
+        for path in paths:
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_text(content)
+
+    def find(self, root: Path | None = None, **kwargs) -> list[str]:
+        root = root or self.root
+        return [path.relative_to(root).as_posix() for path in FileFinder(root, **kwargs)]
+
+    def test_finds_markdown_files_in_order(self):
+        self.write("b.md", "a.md", "notes.txt", "guides/c.md", "guides/deep/d.md", ".git/e.md")
+
+        self.assertEqual(self.find(), ["a.md", "b.md", "guides/c.md", "guides/deep/d.md"])
+
+    def test_honours_gitignore_files(self):
+        self.write(".gitignore", content="node_modules/\n/build\n*.draft.md\n")
+        self.write("guides/.gitignore", content="private/\n!keep.draft.md\n")
+        self.write(
+            "a.md",
+            "a.draft.md",
+            "node_modules/pkg/README.md",
+            "build/out.md",
+            "guides/build/b.md",
+            "guides/keep.draft.md",
+            "guides/private/c.md",
+            "guides/node_modules/d.md",
+        )
+
+        self.assertEqual(self.find(), ["a.md", "guides/build/b.md", "guides/keep.draft.md"])
+
+    def test_ignored_directories_are_not_read(self):
+        self.write(".gitignore", content="node_modules\n")
+        self.write("a.md", "node_modules/pkg/README.md", "docs/node_modules/b.md")
+        scanned = []
+        real_scandir = os.scandir
+
+        def scandir(path):
+            scanned.append(Path(path).relative_to(self.root).as_posix())
+            return real_scandir(path)
+
+        with patch("nogisync.discovery.os.scandir", side_effect=scandir):
+            self.assertEqual(self.find(), ["a.md"])
+
+        self.assertEqual(scanned, [".", "docs"])
+
+    def test_gitignore_files_above_the_root_count(self):
+        self.write(".gitignore", content="docs/generated/\n*.tmp.md\n")
+        self.write("docs/a.md", "docs/b.tmp.md", "docs/generated/c.md")
+
+        self.assertEqual(self.find(self.root / "docs"), ["a.md"])
+
+    def test_include_and_exclude(self):
+        self.write("a.md", "guides/b.md", "guides/drafts/c.md", "api/d.md", "api/e.md")
+
+        self.assertEqual(self.find(include=["guides"]), ["guides/b.md", "guides/drafts/c.md"])
+        self.assertEqual(self.find(include=["guides/*.md", "e.md"]), ["api/e.md", "guides/b.md"])
+        self.assertEqual(self.find(exclude=["drafts", "/a.md"]), ["api/d.md", "api/e.md", "guides/b.md"])
+        self.assertEqual(self.find(include=["guides"], exclude=["drafts"]), ["guides/b.md"])
+
+    def test_max_depth(self):
+        self.write("a.md", "one/b.md", "one/two/c.md")
+
+        self.assertEqual(self.find(max_depth=0), ["a.md"])
+        self.assertEqual(self.find(max_depth=1), ["a.md", "one/b.md"])
+        self.assertEqual(self.find(max_depth=None), ["a.md", "one/b.md", "one/two/c.md"])
+
+    def test_symlinked_directories_are_not_followed(self):
+        self.write("a.md")
+        (self.root / "loop").symlink_to(self.root, target_is_directory=True)
+
+        self.assertEqual(self.find(), ["a.md"])
+
+    def test_is_selected_agrees_with_the_walk(self):
+        self.write(".gitignore", content="vendor/\n")
+        self.write("docs/.gitignore", content="*.draft.md\n")
+        self.write("a.md", "vendor/b.md", "docs/c.md", "docs/d.draft.md", "docs/deep/e.md", "docs/old/f.md")
+        options = {"exclude": ["old"], "max_depth": 1}
+
+        finder = FileFinder(self.root, **options)
+        candidates = ["a.md", "vendor/b.md", "docs/c.md", "docs/d.draft.md", "docs/deep/e.md", "docs/old/f.md"]
+
+        self.assertEqual([path for path in candidates if finder.is_selected(Path(path))], self.find(**options))
+        self.assertEqual(self.find(**options), ["a.md", "docs/c.md"])
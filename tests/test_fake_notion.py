@@ -0,0 +1,188 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from notion_client import APIResponseError
+
+from benchmarks.bench_sync import run_load_test
+from benchmarks.fake_notion import FakeNotion
+from nogisync import notion
+
+
+class TestFakeNotion(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakeNotion(page_size=10)
+        self.root_id = self.fake.add_page("Docs")
+        self.client = notion.get_notion_client("token", rate_limit=1000, transport=self.fake)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_create_and_list_page_with_pagination(self):
+        content = "\n\n".join(f"Paragraph {i}" for i in range(25))
+
+        page = await notion.create_notion_page(self.client, self.root_id, "Page", content)
+        blocks = await notion.list_blocks(self.client, page["id"])
+
+        self.assertEqual(len(blocks), 25)
+        self.assertEqual(blocks[24]["paragraph"]["rich_text"][0]["plain_text"], "Paragraph 24")
+        self.assertEqual(self.fake.requests["blocks.children.list"], 3)
+        self.assertEqual(self.fake.get_child_titles(self.root_id), ["Page"])
+        self.assertEqual((await notion.list_child_pages(self.client, self.root_id))[0]["id"], page["id"])
+
+    async def test_create_page_with_deeply_nested_list(self):
+        content = "- a\n  - b\n    - c\n      - d\n- e"
+
+        page = await notion.create_notion_page(self.client, self.root_id, "Page", content)
+
+        # "a" is nested too deep to go along with the page, so the top level, the children of "a" and the children of
+        # "b" are appended one after another
+        self.assertEqual(self.fake.requests, {"pages.create": 1, "blocks.children.append": 3})
+        blocks = await notion.list_blocks(self.client, page["id"])
+        self.assertEqual([block["has_children"] for block in blocks], [True, False])
+        (b,) = await notion.list_blocks(self.client, blocks[0]["id"])
+        (c,) = await notion.list_blocks(self.client, b["id"])
+        (d,) = await notion.list_blocks(self.client, c["id"])
+        self.assertEqual(d["bulleted_list_item"]["rich_text"][0]["plain_text"], "d")
+
+    async def test_rejects_children_nested_too_deep(self):
+        page_id = self.fake.add_page("Page", self.root_id)
+        deep = {
+            "type": "paragraph",
+            "paragraph": {
+                "rich_text": [],
+                "children": [
+                    {
+                        "type": "paragraph",
+                        "paragraph": {
+                            "rich_text": [],
+                            "children": [{"type": "paragraph", "paragraph": {"rich_text": []}}],
+                        },
+                    }
+                ],
+            },
+        }
+
+        with self.assertRaises(APIResponseError) as context:
+            await self.client.blocks.children.append(block_id=page_id, children=[deep])
+
+        self.assertIn(
+            "children[0].paragraph.children[0].paragraph.children should be not present", str(context.exception)
+        )
+
+    async def test_create_page_with_large_table(self):
+        content = "| Name | Value |\n|---|---|\n" + "\n".join(f"| Row {i} | {i} |" for i in range(1000))
+
+        page = await notion.create_notion_page(self.client, self.root_id, "Page", content)
+
+        # The table goes with its first 100 rows, and the other 901 rows are appended in batches of 100
+        self.assertEqual(self.fake.requests, {"pages.create": 1, "blocks.children.append": 11})
+        self.assertEqual(self.fake.get_block_types(page["id"]), ["table"])
+        (table,) = await notion.list_blocks(self.client, page["id"])
+        self.assertTrue(table["table"]["has_column_header"])
+        rows = self.fake.children[table["id"]]
+        self.assertEqual(len(rows), 1001)
+        cells = self.fake.blocks[rows[-1]]["table_row"]["cells"]
+        self.assertEqual([cell[0]["plain_text"] for cell in cells], ["Row 999", "999"])
+
+    async def test_rejects_malformed_tables(self):
+        page_id = self.fake.add_page("Page", self.root_id)
+        row = {"type": "table_row", "table_row": {"cells": [[]]}}
+
+        for payload, message in (
+            ({"table_width": 1}, "children[0].table.children should be defined"),
+            ({"table_width": 2, "children": [row]}, "children[0].table_row.cells.length should be 2"),
+        ):
+            with self.assertRaises(APIResponseError) as context:
+                await self.client.blocks.children.append(
+                    block_id=page_id, children=[{"type": "table", "table": payload}]
+                )
+            self.assertIn(message, str(context.exception))
+
+    async def test_update_page_in_place(self):
+        page = await notion.create_notion_page(self.client, self.root_id, "Page", "# Title\n\nOld\n\nKept")
+        self.fake.reset_stats()
+
+        await notion.update_notion_page(self.client, page["id"], "# Title\n\nNew\n\nKept")
+
+        self.assertEqual(self.fake.requests, {"blocks.children.list": 1, "blocks.update": 1})
+        blocks = await notion.list_blocks(self.client, page["id"])
+        self.assertEqual(blocks[1]["paragraph"]["rich_text"][0]["plain_text"], "New")
+
+    async def test_nested_blocks(self):
+        page = await notion.create_notion_page(self.client, self.root_id, "Page", "- Item\n  - Nested")
+
+        (item,) = await notion.list_blocks(self.client, page["id"])
+
+        self.assertTrue(item["has_children"])
+        self.assertEqual(self.fake.get_block_types(item["id"]), ["bulleted_list_item"])
+
+    async def test_search_move_rename_and_archive(self):
+        other_id = self.fake.add_page("Other", self.root_id)
+        page = await notion.create_notion_page(self.client, self.root_id, "Guide", "Text")
+
+        self.assertEqual((await notion.find_notion_page(self.client, "Guide", self.root_id))["id"], page["id"])
+        await notion.move_notion_page(self.client, page["id"], other_id)
+        await notion.rename_notion_page(self.client, page["id"], "Renamed")
+        self.assertEqual(self.fake.get_child_titles(other_id), ["Renamed"])
+
+        self.assertTrue(await notion.archive_notion_page(self.client, page["id"]))
+        self.assertEqual(self.fake.get_child_titles(other_id), [])
+        self.assertIsNone(await notion.find_notion_page(self.client, "Renamed"))
+
+    async def test_rejects_too_many_blocks(self):
+        with self.assertRaises(APIResponseError):
+            await self.client.blocks.children.append(
+                block_id=self.root_id, children=[{"type": "divider", "divider": {}}] * 101
+            )
+
+    async def test_unknown_block(self):
+        with self.assertRaises(APIResponseError) as context:
+            await self.client.blocks.delete(block_id="missing")
+
+        self.assertEqual(context.exception.status, 404)
+
+    async def test_rate_limited_requests_are_retried(self):
+        fake = FakeNotion(rate_limit_probability=0.3, seed=1)
+        root_id = fake.add_page("Docs")
+        client = notion.get_notion_client("token", rate_limit=1000, transport=fake)
+        client.max_retries = 20
+
+        with self.assertLogs(level="WARNING"):
+            pages = await asyncio.gather(
+                *(notion.create_notion_page(client, root_id, f"Page {i}", "Text") for i in range(10))
+            )
+        await client.aclose()
+
+        self.assertTrue(all(pages))
+        self.assertGreater(fake.rate_limited, 0)
+        self.assertEqual(fake.requests["pages.create"], 10)
+
+    async def test_latency(self):
+        fake = FakeNotion(latency=0.05)
+        client = notion.get_notion_client("token", rate_limit=1000, transport=fake)
+        start = asyncio.get_running_loop().time()
+
+        await client.pages.retrieve(page_id=fake.add_page("Docs"))
+        await client.aclose()
+
+        self.assertGreaterEqual(asyncio.get_running_loop().time() - start, 0.05)
+
+
+class TestLoadTest(IsolatedAsyncioTestCase):
+    async def test_run_load_test(self):
+        with self.assertNoLogs(level="ERROR"):
+            results = await run_load_test(files=30, latency=0, rate_limit_probability=0)
+
+        initial, edited, without_manifest = results.values()
+        self.assertEqual(list(results), ["initial", "edited_3", "without_manifest"])
+        # Every file and every directory gets a page on the first run
+        self.assertGreaterEqual(initial["requests"]["pages.create"], 30)
+        self.assertEqual(initial["total_requests"], sum(initial["requests"].values()))
+        # With a manifest, only the edited files are touched again
+        self.assertNotIn("pages.create", edited["requests"])
+        # Inserting a line into a page neither deletes nor rewrites the blocks around it, nested ones included
+        self.assertNotIn("blocks.delete", edited["requests"])
+        self.assertLess(edited["requests"]["blocks.children.append"], 10)
+        # Without one, every page is listed and diffed, but nothing that is already there is written again
+        self.assertGreater(without_manifest["requests"]["blocks.children.list"], 30)
+        self.assertEqual(list(without_manifest["requests"]), ["blocks.children.list"])
@@ -0,0 +1,150 @@
+import asyncio
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from nogisync.hierarchy import (
+    find_directory_pages,
+    get_directory_title,
+    load_directory_pages,
+    plan_directories,
+    resolve_directory_pages,
+)
+from nogisync.index import PageIndex
+
+
+def child_page(page_id: str, title: str, has_children: bool = True) -> dict:
+    return {"id": page_id, "type": "child_page", "child_page": {"title": title}, "has_children": has_children}
+
+
+class TestHierarchy(IsolatedAsyncioTestCase):
+    def test_get_directory_title(self):
+        self.assertEqual(get_directory_title("foo_lives-here"), "Foo Lives Here")
+
+    def test_plan_directories_groups_by_depth(self):
+        relative_paths = [
+            Path("guides/advanced/a.md"),
+            Path("guides/advanced/b.md"),
+            Path("guides/basic.md"),
+            Path("api/reference/c.md"),
+            Path("README.md"),
+        ]
+
+        levels = plan_directories(relative_paths)
+
+        self.assertEqual(
+            levels,
+            [[Path("api"), Path("guides")], [Path("api/reference"), Path("guides/advanced")]],
+        )
+
+    def test_plan_directories_without_directories(self):
+        self.assertEqual(plan_directories([Path("README.md")]), [])
+
+    def test_find_directory_pages_without_creating(self):
+        index = PageIndex()
+        index.add("root", "Docs", "docs-id")
+        paths = [Path("docs/intro.md"), Path("docs/new_guides/setup.md"), Path("docs/new-guides/faq.md"), Path("a.md")]
+
+        directory_ids, missing = find_directory_pages(index, "root", paths)
+
+        self.assertEqual(directory_ids, {Path("."): "root", Path("docs"): "docs-id"})
+        # Both spellings share one title, so they need one page
+        self.assertEqual(missing, [Path("docs/new-guides")])
+
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    async def test_resolve_directory_pages_creates_each_directory_once(self, mock_create_page):
+        mock_create_page.side_effect = lambda client, parent_id, title, content: {"id": f"{parent_id}/{title}"}
+        index = PageIndex()
+        index.add("base_id", "Guides", "guides_id")
+        relative_paths = [Path(f"guides/advanced/{i}.md") for i in range(10)] + [Path("api/a.md")]
+
+        directory_ids = await resolve_directory_pages(None, index, "base_id", relative_paths)
+
+        self.assertEqual(mock_create_page.call_count, 2)
+        mock_create_page.assert_any_call(None, "base_id", "Api", "")
+        mock_create_page.assert_any_call(None, "guides_id", "Advanced", "")
+        self.assertEqual(
+            directory_ids,
+            {
+                Path("."): "base_id",
+                Path("api"): "base_id/Api",
+                Path("guides"): "guides_id",
+                Path("guides/advanced"): "guides_id/Advanced",
+            },
+        )
+        self.assertEqual(index.get("guides_id", "Advanced"), "guides_id/Advanced")
+
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    async def test_resolve_directory_pages_creates_siblings_concurrently(self, mock_create_page):
+        active = 0
+        max_active = 0
+
+        async def create_page(client, parent_id, title, content):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"id": f"{parent_id}/{title}"}
+
+        mock_create_page.side_effect = create_page
+        relative_paths = [Path("a/x/1.md"), Path("b/2.md"), Path("c/3.md")]
+
+        directory_ids = await resolve_directory_pages(None, PageIndex(), "base_id", relative_paths)
+
+        self.assertEqual(max_active, 3)
+        self.assertEqual(directory_ids[Path("a/x")], "base_id/A/X")
+
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    async def test_resolve_directory_pages_shares_page_for_same_title(self, mock_create_page):
+        mock_create_page.side_effect = lambda client, parent_id, title, content: {"id": f"{parent_id}/{title}"}
+
+        directory_ids = await resolve_directory_pages(
+            None, PageIndex(), "base_id", [Path("foo-bar/a.md"), Path("foo_bar/b.md")]
+        )
+
+        mock_create_page.assert_called_once_with(None, "base_id", "Foo Bar", "")
+        self.assertEqual(directory_ids[Path("foo-bar")], directory_ids[Path("foo_bar")])
+
+    @patch("nogisync.notion.create_notion_page", new_callable=AsyncMock)
+    async def test_resolve_directory_pages_raises_when_creation_fails(self, mock_create_page):
+        mock_create_page.return_value = {}
+
+        with self.assertRaises(Exception):
+            await resolve_directory_pages(None, PageIndex(), "base_id", [Path("dir/a.md")])
+
+    async def test_load_directory_pages_lists_only_local_directories(self):
+        responses = {
+            ("root", None): {
+                "results": [child_page("guides", "Guides"), {"id": "p1", "type": "paragraph"}],
+                "has_more": True,
+                "next_cursor": "cursor1",
+            },
+            ("root", "cursor1"): {
+                "results": [child_page("readme", "README"), child_page("stray", "Stray"), child_page("api", "Api")],
+                "has_more": False,
+                "next_cursor": None,
+            },
+            ("guides", None): {
+                "results": [child_page("advanced", "Advanced"), child_page("basic", "Basic Usage")],
+                "has_more": False,
+                "next_cursor": None,
+            },
+            ("advanced", None): {"results": [child_page("setup", "Setup")], "has_more": False, "next_cursor": None},
+        }
+        client = AsyncMock()
+        client.blocks.children.list.side_effect = lambda block_id, **kwargs: responses[
+            (block_id, kwargs.get("start_cursor"))
+        ]
+        index = PageIndex()
+        paths = [Path("README.md"), Path("guides/advanced/setup.md"), Path("guides/basic_usage.md"), Path("new/a.md")]
+
+        await load_directory_pages(client, index, "root", paths)
+
+        self.assertEqual(index.get("root", "Guides"), "guides")
+        self.assertEqual(index.get("root", "Stray"), "stray")
+        self.assertEqual(index.get("guides", "Basic Usage"), "basic")
+        self.assertEqual(index.get("advanced", "Setup"), "setup")
+        # File pages, pages of no local directory and directory pages without blocks are never listed
+        listed = [call.kwargs["block_id"] for call in client.blocks.children.list.call_args_list]
+        self.assertEqual(sorted(listed), ["advanced", "guides", "root", "root"])
@@ -0,0 +1,60 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from nogisync.index import PageIndex
+
+
+class TestPageIndex(IsolatedAsyncioTestCase):
+    def test_add_and_get(self):
+        index = PageIndex()
+        index.add("root", "Guides", "guides")
+
+        self.assertEqual(index.get("root", "Guides"), "guides")
+        self.assertIsNone(index.get("root", "Missing"))
+        self.assertIsNone(index.get("other", "Guides"))
+
+    def test_add_keeps_first_duplicate(self):
+        index = PageIndex()
+        index.add("root", "Guides", "first")
+        index.add("root", "Guides", "second")
+
+        self.assertEqual(index.get("root", "Guides"), "first")
+        self.assertEqual(len(index), 1)
+        self.assertEqual(list(index.pages()), [("first", "root", "Guides"), ("second", "root", "Guides")])
+
+        # Forgetting the duplicate keeps the page the title leads to
+        index.remove("second")
+        self.assertEqual(index.get("root", "Guides"), "first")
+        self.assertEqual(index.get_location("first"), ("root", "Guides"))
+        self.assertIsNone(index.get_location("second"))
+
+    def test_move_and_remove(self):
+        index = PageIndex()
+        index.add("root", "Old", "page1")
+
+        index.move("page1", "guides", "New")
+
+        self.assertIsNone(index.get("root", "Old"))
+        self.assertEqual(index.get("guides", "New"), "page1")
+
+        index.remove("page1")
+        index.remove("unknown")
+
+        self.assertIsNone(index.get("guides", "New"))
+        self.assertEqual(len(index), 0)
+
+    async def test_get_or_create_creates_each_page_once(self):
+        index = PageIndex()
+        created = []
+
+        async def create() -> str:
+            await asyncio.sleep(0)
+            created.append("new")
+            return f"page{len(created)}"
+
+        page_ids = await asyncio.gather(*(index.get_or_create("root", "Guides", create) for _ in range(3)))
+
+        self.assertEqual(page_ids, ["page1"] * 3)
+        self.assertEqual(created, ["new"])
+        self.assertEqual(await index.get_or_create("root", "Guides", create), "page1")
+        self.assertEqual(await index.get_or_create("root", "Other", create), "page2")
@@ -0,0 +1,117 @@
+import codecs
+import mmap
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from nogisync.ingest import find_front_matter, open_file, parse_document, read_document
+
+
+class TestIngest(TestCase):
+    def test_front_matter(self):
+        document = parse_document(b"---\ntitle: Setup\ntags: [a, b]\n---\n\n# Setup\n")
+
+        self.assertEqual(document.attributes, {"title": "Setup", "tags": ["a", "b"]})
+        self.assertEqual(document.content, "# Setup\n")
+
+    def test_without_front_matter(self):
+        data = b"# Title\n\nText\n"
+
+        with patch("nogisync.ingest.yaml.load") as mock_load:
+            document = parse_document(data)
+
+        mock_load.assert_not_called()
+        self.assertEqual(document.attributes, {})
+        self.assertEqual(document.content, "# Title\n\nText\n")
+
+    def test_dividers_in_the_body_are_not_front_matter(self):
+        for data in (
+            b"# Title\n\n---\n\nMiddle: part\n\n---\n\nEnd",
+            b"\n---\ntitle: Not front matter\n---\n",
+            b"Text\n---\nMore text---",
+        ):
+            document = parse_document(data)
+            self.assertEqual(document.attributes, {})
+            self.assertEqual(document.content, data.decode())
+
+    def test_unterminated_front_matter_is_content(self):
+        self.assertEqual(parse_document(b"---\ntitle: Open\n# Title").content, "---\ntitle: Open\n# Title")
+        self.assertIsNone(find_front_matter(b"----\ntitle: x\n----\n"))
+
+    def test_closing_delimiter_must_be_a_line_of_its_own(self):
+        document = parse_document(b"---\ntitle: a---b\n--- \nBody")
+
+        self.assertEqual(document.attributes, {"title": "a---b"})
+        self.assertEqual(document.content, "Body")
+
+    def test_empty_front_matter(self):
+        document = parse_document(b"---\n---\nBody")
+
+        self.assertEqual(document.attributes, {})
+        self.assertEqual(document.content, "Body")
+
+    def test_unusable_front_matter_is_content(self):
+        for data in (
+            b"---\nSome intro text\n---\nMore",
+            b"---\nJust a sentence\n---\nBody",
+            b"---\n- a\n- b\n---\nBody",
+        ):
+            document = parse_document(data, "doc.md")
+            self.assertEqual(document.attributes, {})
+            self.assertEqual(document.content, data.decode())
+
+        with self.assertLogs(level="WARNING"):
+            document = parse_document(b"---\ntitle: [\n---\nBody", "doc.md")
+        self.assertEqual(document.attributes, {})
+        self.assertEqual(document.content, "---\ntitle: [\n---\nBody")
+
+    def test_toml_front_matter(self):
+        document = parse_document(b'+++\ntitle = "Setup"\n+++\nBody')
+
+        self.assertEqual(document.attributes, {"title": "Setup"})
+        self.assertEqual(document.content, "Body")
+
+    def test_byte_order_marks(self):
+        text = "---\ntitle: Café\n---\nBody ✓"
+        for bom, encoding in (
+            (codecs.BOM_UTF8, "utf-8"),
+            (codecs.BOM_UTF16_LE, "utf-16-le"),
+            (codecs.BOM_UTF16_BE, "utf-16-be"),
+            (codecs.BOM_UTF32_LE, "utf-32-le"),
+        ):
+            document = parse_document(bom + text.encode(encoding))
+            self.assertEqual(document.attributes, {"title": "Café"}, encoding)
+            self.assertEqual(document.content, "Body ✓", encoding)
+
+    def test_invalid_utf8_falls_back_to_cp1252(self):
+        with self.assertLogs(level="WARNING"):
+            document = parse_document("Café “quoted”".encode("cp1252"), "legacy.md")
+
+        self.assertEqual(document.content, "Café “quoted”")
+
+    def test_line_breaks_are_normalized(self):
+        document = parse_document(b"---\r\ntitle: Windows\r\n---\r\n# Title\r\n\r\nText\rMore")
+
+        self.assertEqual(document.attributes, {"title": "Windows"})
+        self.assertEqual(document.content, "# Title\n\nText\nMore")
+
+    def test_large_files_are_mapped(self):
+        with TemporaryDirectory() as tmp_dir:
+            md_file = Path(tmp_dir, "large.md")
+            md_file.write_bytes(b"---\ntitle: Large\n---\n" + b"Text\n" * 1000)
+            empty_file = Path(tmp_dir, "empty.md")
+            empty_file.write_bytes(b"")
+
+            with patch("nogisync.ingest.MMAP_THRESHOLD", 100):
+                with open_file(md_file) as data:
+                    self.assertIsInstance(data, mmap.mmap)
+                document = read_document(md_file)
+                with open_file(empty_file) as data:
+                    self.assertEqual(data, b"")
+
+            with patch("nogisync.ingest.MMAP_THRESHOLD", 0), open_file(empty_file) as data:
+                self.assertEqual(data, b"")
+
+        self.assertEqual(document.attributes, {"title": "Large"})
+        self.assertEqual(document.content, "Text\n" * 1000)
@@ -0,0 +1,87 @@
+import dataclasses
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from nogisync.manifest import ManifestEntry, SyncManifest, hash_content
+from nogisync.markdown import PARSER_VERSION
+
+
+class TestSyncManifest(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name, "cache", "manifest.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hash_content(self):
+        self.assertEqual(hash_content(b"# Title"), hash_content(b"# Title"))
+        self.assertNotEqual(hash_content(b"# Title"), hash_content(b"# Title!"))
+
+    def test_load_missing_file(self):
+        manifest = SyncManifest.load(self.path, "parent")
+
+        self.assertEqual(manifest.entries, {})
+
+    def test_save_and_load_round_trip(self):
+        manifest = SyncManifest(self.path, "parent")
+        manifest.record(Path("guides/basic.md"), ManifestEntry("hash", "Basic", "page1", ["block1", "block2"]))
+        manifest.save()
+
+        loaded = SyncManifest.load(self.path, "parent")
+
+        self.assertEqual(
+            loaded.get(Path("guides/basic.md")), ManifestEntry("hash", "Basic", "page1", ["block1", "block2"])
+        )
+        self.assertTrue(loaded.is_unchanged(Path("guides/basic.md"), "hash"))
+        self.assertFalse(loaded.is_unchanged(Path("guides/basic.md"), "other"))
+        self.assertFalse(loaded.is_unchanged(Path("missing.md"), "hash"))
+        self.assertFalse(Path(f"{self.path}.tmp").exists())
+
+    def test_load_ignores_manifest_for_other_parent(self):
+        manifest = SyncManifest(self.path, "parent")
+        manifest.record(Path("a.md"), ManifestEntry("hash", "A", "page1"))
+        manifest.save()
+
+        loaded = SyncManifest.load(self.path, "other_parent")
+
+        self.assertEqual(loaded.entries, {})
+
+    def test_load_ignores_unreadable_manifest(self):
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text("not json")
+        self.assertEqual(SyncManifest.load(self.path, "parent").entries, {})
+
+        self.path.write_text(json.dumps({"version": 1, "parent_page_id": "parent", "files": {"a.md": {"x": 1}}}))
+        self.assertEqual(SyncManifest.load(self.path, "parent").entries, {})
+
+    def test_entries_from_an_older_parser_are_outdated(self):
+        self.path.parent.mkdir(parents=True)
+        entry = {"content_hash": "hash", "title": "A", "page_id": "page1", "block_ids": None}
+        files = {
+            "a.md": entry,
+            "b.md": {**entry, "parser_version": PARSER_VERSION - 1},
+            "c.md": dataclasses.asdict(ManifestEntry("hash", "C", "page3")),
+        }
+        self.path.write_text(json.dumps({"version": 1, "parent_page_id": "parent", "files": files}))
+
+        manifest = SyncManifest.load(self.path, "parent")
+
+        self.assertEqual(manifest.get_outdated(), [Path("a.md"), Path("b.md")])
+        self.assertFalse(manifest.is_unchanged(Path("a.md"), "hash"))
+        self.assertFalse(manifest.is_unchanged(Path("b.md"), "hash"))
+        self.assertTrue(manifest.is_unchanged(Path("c.md"), "hash"))
+        # The page is still known, so the file is synced into it again
+        self.assertEqual(manifest.get(Path("a.md")).page_id, "page1")
+
+    def test_remove(self):
+        manifest = SyncManifest(None, "parent", {"a.md": ManifestEntry("hash", "A", "page1")})
+        manifest.remove(Path("a.md"))
+        manifest.remove(Path("missing.md"))
+
+        self.assertEqual(manifest.entries, {})
+
+    def test_save_without_path(self):
+        SyncManifest(None, "parent").save()
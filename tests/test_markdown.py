@@ -1,39 +1,19 @@
 import textwrap
+import time
 from unittest import TestCase
+from unittest.mock import patch
 
 from nogisync.markdown import (
-    convert_markdown_table_to_latex,
+    get_rich_text,
+    iter_markdown_blocks,
     parse_markdown_to_notion_blocks,
     process_inline_formatting,
     replace_content_that_is_too_long,
+    tokenize_inline,
 )
 
 
 class TestMarkdown(TestCase):
-    def test_convert_markdown_table_to_latex(self):
-        # Test table without header
-        markdown_table = "| Cell 1 | Cell 2 |\n| Cell 3 | Cell 4 |"
-        result = convert_markdown_table_to_latex(markdown_table)
-        self.assertIn("\\begin{array}", result)
-        self.assertIn("Cell 1", result)
-        self.assertNotIn("\\textbf", result)  # No bold headers
-
-        # Test table with header
-        markdown_table = "| Header 1 | Header 2 |\n|----------|----------|\n| Cell 1 | Cell 2 |"
-        result = convert_markdown_table_to_latex(markdown_table)
-        self.assertIn("\\begin{array}", result)
-        self.assertIn("\\textbf{Header 1}", result)
-        self.assertIn("Cell 1", result)
-        self.assertIn("\\end{array}", result)
-
-        # Test table with bold header
-        markdown_table = "| **Header 1** | **Header 2** |\n|----------|----------|\n| Cell 1 | Cell 2 |"
-        result = convert_markdown_table_to_latex(markdown_table)
-        self.assertIn("\\begin{array}", result)
-        self.assertIn("\\textbf{Header 1}", result)
-        self.assertIn("Cell 1", result)
-        self.assertIn("\\end{array}", result)
-
     def test_parse_markdown_to_notion_blocks_blockquote(self):
         text = "> This is a quote"
         result = parse_markdown_to_notion_blocks(text)
@@ -144,6 +124,33 @@ class TestMarkdown(TestCase):
         self.assertEqual(nested2["type"], "bulleted_list_item")
         self.assertEqual(nested2["bulleted_list_item"]["rich_text"][0]["text"]["content"], "Nested 2")
 
+    def test_iter_markdown_blocks_yields_completed_blocks(self):
+        markdown = "# Title\nFirst\n- Item\n  - Nested\nLast\n" + "More\n" * 1000
+
+        with patch("nogisync.markdown.get_rich_text", wraps=get_rich_text) as mock_inline:
+            blocks = iter_markdown_blocks(markdown)
+
+            self.assertEqual(next(blocks).type, "heading_1")
+            self.assertEqual(mock_inline.call_count, 2)
+            self.assertEqual(next(blocks).type, "paragraph")
+            item = next(blocks)
+            self.assertEqual(len(item.children), 1)
+            self.assertEqual(mock_inline.call_count, 5)
+            self.assertEqual(len(list(blocks)), 1001)
+
+    def test_iter_markdown_blocks_matches_parse(self):
+        markdown = "# Title\n\n- One\n  - Two\n\n| A | B |\n|---|---|\n| 1 | 2 |\n\n    code\n\n```python\nx = 1\n```"
+        self.assertEqual(
+            [block.to_notion() for block in iter_markdown_blocks(markdown)], parse_markdown_to_notion_blocks(markdown)
+        )
+
+    def test_parse_markdown_to_notion_blocks_indented_item_without_parent(self):
+        blocks = parse_markdown_to_notion_blocks("  - First\n- Item\nParagraph\n  1. Second")
+        self.assertEqual(
+            [block["type"] for block in blocks],
+            ["bulleted_list_item", "bulleted_list_item", "paragraph", "numbered_list_item"],
+        )
+
     def test_parse_markdown_to_notion_blocks_numbered_lists(self):
         text = "1. First\n  1. Nested 1\n    1. Nested 2\n2. Second"
         result = parse_markdown_to_notion_blocks(text)
@@ -166,27 +173,65 @@ class TestMarkdown(TestCase):
         text = "| Header 1 | Header 2 |\n|----------|----------|\n| Cell 1 | Cell 2 |"
         result = parse_markdown_to_notion_blocks(text)
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["type"], "equation")
-        self.assertTrue("expression" in result[0]["equation"])
+        self.assertEqual(result[0]["type"], "table")
+        table = result[0]["table"]
+        self.assertEqual(table["table_width"], 2)
+        self.assertTrue(table["has_column_header"])
+        self.assertFalse(table["has_row_header"])
+        self.assertEqual(len(table["children"]), 2)
+        self.assertEqual(table["children"][1]["type"], "table_row")
+        cells = table["children"][1]["table_row"]["cells"]
+        self.assertEqual([cell[0]["text"]["content"] for cell in cells], ["Cell 1", "Cell 2"])
 
     def test_parse_markdown_to_notion_blocks_table_no_header(self):
         text = "| Cell 1 | Cell 2 |\n| Cell 3 | Cell 4 |"
         result = parse_markdown_to_notion_blocks(text)
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["type"], "equation")
-        latex = result[0]["equation"]["expression"]
-        self.assertIn("\\textsf{Cell 1}", latex)
-        self.assertNotIn("\\textbf", latex)
+        self.assertEqual(result[0]["type"], "table")
+        self.assertFalse(result[0]["table"]["has_column_header"])
+        self.assertEqual(len(result[0]["table"]["children"]), 2)
 
     def test_parse_markdown_to_notion_blocks_table_with_header(self):
-        # Test table with header row
-        text = "| Header 1 | Header 2 |\n|----------|----------|\n| Cell 1 | Cell 2 |"
+        # Test table with a formatted header row and aligned columns
+        text = "| **Header 1** | Header 2 |\n|:---------|:--------:|\n| Cell 1 | Cell 2 |"
         result = parse_markdown_to_notion_blocks(text)
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["type"], "equation")
-        latex = result[0]["equation"]["expression"]
-        self.assertIn("\\textbf{Header 1}", latex)
-        self.assertIn("Cell 1", latex)
+        table = result[0]["table"]
+        self.assertTrue(table["has_column_header"])
+        header = table["children"][0]["table_row"]["cells"][0][0]
+        self.assertEqual(header["text"]["content"], "Header 1")
+        self.assertTrue(header["annotations"]["bold"])
+
+    def test_parse_markdown_to_notion_blocks_table_cells(self):
+        text = "| a | b | c |\n|---|---|---|\n| `x \\| y` | |\n| 1 | 2 | 3 | 4 |"
+        rows = [row["table_row"]["cells"] for row in parse_markdown_to_notion_blocks(text)[0]["table"]["children"]]
+
+        # Short rows are padded, long rows cut to the width of the table, and escaped pipes stay in their cell
+        self.assertEqual([len(cells) for cells in rows], [3, 3, 3])
+        self.assertEqual(rows[1][0][0]["text"]["content"], "x | y")
+        self.assertTrue(rows[1][0][0]["annotations"]["code"])
+        self.assertEqual(rows[1][1:], [[], []])
+        self.assertEqual(rows[2][2][0]["text"]["content"], "3")
+
+    def test_parse_markdown_to_notion_blocks_line_after_table(self):
+        text = "| a | b |\n| c | d |\n# Heading\n|---|---|"
+        result = parse_markdown_to_notion_blocks(text)
+        self.assertEqual([block["type"] for block in result], ["table", "heading_1", "paragraph"])
+
+    def test_get_rich_text_scales_linearly_with_unmatched_delimiters(self):
+        text = "a* " * 100_000
+
+        def best_time(function) -> float:
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                function(text)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        # Building the runs adds little to tokenizing, which is linear. Copying the text of the run for every
+        # unmatched delimiter took more than twice as long as tokenizing at this size, and grows with its square.
+        self.assertLess(best_time(get_rich_text) / best_time(tokenize_inline), 1.7)
 
     def test_process_inline_formatting_bold(self):
         text = "This is **bold** text"
@@ -260,6 +305,35 @@ class TestMarkdown(TestCase):
         self.assertTrue(any(part.get("annotations", {}).get("bold") for part in result))
         # self.assertTrue(any(part.get("annotations", {}).get("italic") for part in result))
 
+    def test_process_inline_formatting_nested_emphasis(self):
+        result = process_inline_formatting("**Bold with *italic* inside**")
+        self.assertEqual([part["text"]["content"] for part in result], ["Bold with ", "italic", " inside"])
+        self.assertTrue(all(part["annotations"]["bold"] for part in result))
+        self.assertEqual([part["annotations"]["italic"] for part in result], [False, True, False])
+
+    def test_process_inline_formatting_formatted_link(self):
+        result = process_inline_formatting("[**bold** link](https://example.com)")
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]["annotations"]["bold"], True)
+        self.assertEqual(result[0]["href"], "https://example.com")
+        self.assertEqual(result[1]["text"], {"content": " link", "link": {"url": "https://example.com"}})
+
+    def test_process_inline_formatting_code_is_literal(self):
+        result = process_inline_formatting("Run `make *all*` now")
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[1]["text"]["content"], "make *all*")
+        self.assertEqual(result[1]["annotations"]["italic"], False)
+
+    def test_process_inline_formatting_unmatched_delimiters(self):
+        for text in ["5 * 3 * 2", "snake_case_name", "a **b", "price in $", "[not a link]", "`open"]:
+            result = process_inline_formatting(text)
+            self.assertEqual(result, [{"type": "text", "text": {"content": text}}])
+
+    def test_process_inline_formatting_many_unmatched_delimiters(self):
+        text = "a* _b ~c [d](" * 5000 + "`e $f"
+        result = process_inline_formatting(text)
+        self.assertEqual("".join(part["text"]["content"] for part in result), text)
+
     def test_process_inline_formatting_plain(self):
         text = "plain text"
         result = process_inline_formatting(text)
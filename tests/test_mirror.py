@@ -0,0 +1,40 @@
+from pathlib import Path
+from unittest import TestCase
+
+from nogisync.index import PageIndex
+from nogisync.mirror import find_orphaned_pages, get_page_path
+
+
+class TestMirror(TestCase):
+    def setUp(self):
+        self.index = PageIndex()
+        for parent_id, title, page_id in (
+            ("root", "Guides", "guides"),
+            ("guides", "Setup", "setup"),
+            ("setup", "Meeting Notes", "notes"),
+            ("guides", "Old", "old"),
+            ("guides", "Setup", "setup_copy"),
+            ("root", "Archive", "archive"),
+            ("archive", "Gone", "gone"),
+            ("root", "Intro", "intro"),
+        ):
+            self.index.add(parent_id, title, page_id)
+
+    def test_finds_pages_without_local_source(self):
+        titles = {Path("guides/setup.md"): "Setup", Path("intro.md"): "Intro"}
+
+        orphans = find_orphaned_pages(self.index, "root", titles)
+
+        # Pages below an orphan go with it, and pages below a file's page are not the sync's to archive
+        self.assertEqual(orphans, ["old", "setup_copy", "archive"])
+
+    def test_manifest_pages_are_kept(self):
+        titles = {Path("guides/setup.md"): "Setup", Path("intro.md"): "Introduction"}
+
+        orphans = find_orphaned_pages(self.index, "root", titles, ["intro", "setup_copy"])
+
+        self.assertEqual(orphans, ["old", "archive"])
+
+    def test_get_page_path(self):
+        self.assertEqual(get_page_path(self.index, "root", "notes"), Path("Guides/Setup/Meeting Notes"))
+        self.assertEqual(get_page_path(self.index, "root", "root"), Path("."))
@@ -1,46 +1,82 @@
-from unittest import TestCase
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
+from notion_client import APIErrorCode, APIResponseError
+
+from nogisync.blocks import Block
+from nogisync.markdown import iter_blocks
 from nogisync.notion import (
+    RateLimitedClient,
+    append_blocks,
     create_notion_page,
+    delete_blocks,
     find_notion_page,
     get_notion_client,
+    get_retry_after,
+    list_block_tree,
+    open_notion_client,
     update_notion_page,
 )
+from nogisync.ratelimit import TokenBucket
 
 
-class TestNotion(TestCase):
+class TestNotion(IsolatedAsyncioTestCase):
     def setUp(self):
-        self.mock_client = MagicMock()
+        self.mock_client = AsyncMock()
         self.mock_page_id = "test-page-id"
         self.mock_title = "Test Page"
         self.mock_content = "Test content"
+        self.mock_client.blocks.children.append.return_value = {"results": []}
 
-    @patch("notion_client.Client")
+    @patch("nogisync.notion.RateLimitedClient")
     def test_get_notion_client(self, mock_client):
         token = "test-token"
         client = get_notion_client(token)
-        mock_client.assert_called_once_with(auth=token)
+        mock_client.assert_called_once()
+        self.assertEqual(mock_client.call_args[1]["auth"], token)
+        self.assertEqual(mock_client.call_args[1]["limiter"].rate, 3.0)
         self.assertIsNotNone(client)
 
-    def test_find_notion_page(self):
+    @patch("httpx.AsyncClient")
+    def test_get_notion_client_configures_connection_pool(self, mock_http_client):
+        client = get_notion_client("test-token", timeout=12.5, max_connections=4)
+
+        limits = mock_http_client.call_args[1]["limits"]
+        self.assertEqual(limits.max_connections, 4)
+        self.assertEqual(limits.max_keepalive_connections, 4)
+        self.assertIs(client.client, mock_http_client.return_value)
+        self.assertEqual(client.options.timeout_ms, 12500)
+
+    @patch("nogisync.notion.get_notion_client")
+    async def test_open_notion_client_closes_connection_pool(self, mock_get_client):
+        mock_get_client.return_value = AsyncMock()
+
+        async with open_notion_client("test-token") as client:
+            self.assertIs(client, mock_get_client.return_value)
+            client.aclose.assert_not_awaited()
+
+        client.aclose.assert_awaited_once()
+
+    async def test_find_notion_page(self):
         mock_results = [{"id": "page1", "properties": {"title": {"title": [{"text": {"content": "Test Page"}}]}}}]
         self.mock_client.search.return_value = {"results": mock_results}
 
-        result = find_notion_page(self.mock_client, self.mock_title)
+        result = await find_notion_page(self.mock_client, self.mock_title)
 
         self.mock_client.search.assert_called_once()
         self.assertEqual(result["id"], "page1")
 
-    def test_find_notion_page_not_found(self):
+    async def test_find_notion_page_not_found(self):
         self.mock_client.search.return_value = {"results": []}
 
-        result = find_notion_page(self.mock_client, self.mock_title)
+        result = await find_notion_page(self.mock_client, self.mock_title)
 
         self.assertIsNone(result)
 
-    def test_create_notion_page(self):
-        create_notion_page(self.mock_client, self.mock_page_id, self.mock_title, self.mock_content)
+    async def test_create_notion_page(self):
+        await create_notion_page(self.mock_client, self.mock_page_id, self.mock_title, self.mock_content)
 
         self.mock_client.pages.create.assert_called_once()
         call_args = self.mock_client.pages.create.call_args[1]
@@ -48,16 +84,205 @@ class TestNotion(TestCase):
         self.assertEqual(call_args["parent"]["page_id"], self.mock_page_id)
         self.assertEqual(call_args["properties"]["title"][0]["text"]["content"], self.mock_title)
 
-    def test_update_notion_page(self):
-        update_notion_page(self.mock_client, self.mock_page_id, self.mock_content)
+    async def test_create_notion_page_streams_blocks(self):
+        self.mock_client.pages.create.return_value = {"id": "new-page"}
+        content = "\n\n".join(f"Paragraph {i}" for i in range(250))
+
+        with patch("nogisync.notion.iter_blocks", wraps=iter_blocks) as mock_iter_blocks:
+            await create_notion_page(self.mock_client, self.mock_page_id, self.mock_title, content)
+
+        mock_iter_blocks.assert_called_once_with(content)
+        # The first batch goes along with the new page
+        self.assertEqual(len(self.mock_client.pages.create.call_args[1]["children"]), 100)
+        calls = self.mock_client.blocks.children.append.call_args_list
+        self.assertEqual([len(call[1]["children"]) for call in calls], [100, 50])
+        self.assertEqual(calls[1][1]["children"][-1]["paragraph"]["rich_text"][0]["text"]["content"], "Paragraph 249")
+
+    async def test_update_notion_page(self):
+        self.mock_client.blocks.children.list.return_value = {"results": [], "has_more": False}
+        self.mock_client.blocks.children.append.return_value = {"results": [{"id": "block1"}]}
+
+        result = await update_notion_page(self.mock_client, self.mock_page_id, self.mock_content)
 
         self.mock_client.blocks.children.append.assert_called_once()
         call_args = self.mock_client.blocks.children.append.call_args[1]
 
         self.assertEqual(call_args["block_id"], self.mock_page_id)
         self.assertIn("children", call_args)
+        self.assertEqual(result, ["block1"])
+
+    async def test_update_notion_page_uses_parse_cache(self):
+        self.mock_client.blocks.children.list.return_value = {"results": [], "has_more": False}
+        cache = Mock()
+        cache.parse.return_value = [Block("divider")]
+
+        await update_notion_page(self.mock_client, self.mock_page_id, self.mock_content, cache=cache)
+
+        cache.parse.assert_called_once_with(self.mock_content)
+        self.assertEqual(
+            self.mock_client.blocks.children.append.call_args[1]["children"], [{"type": "divider", "divider": {}}]
+        )
+
+    @patch("nogisync.notion.parse_blocks")
+    async def test_update_notion_page_with_parsed_blocks(self, mock_parse_blocks):
+        self.mock_client.blocks.children.list.return_value = {"results": [], "has_more": False}
+
+        await update_notion_page(self.mock_client, self.mock_page_id, self.mock_content, blocks=[Block("divider")])
+
+        mock_parse_blocks.assert_not_called()
+        self.assertEqual(
+            self.mock_client.blocks.children.append.call_args[1]["children"], [{"type": "divider", "divider": {}}]
+        )
+
+    async def test_update_notion_page_only_sends_changes(self):
+        self.mock_client.blocks.children.list.return_value = {
+            "results": [
+                {
+                    "id": "b0",
+                    "type": "paragraph",
+                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": "A"}}]},
+                },
+                {
+                    "id": "b1",
+                    "type": "paragraph",
+                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": "B"}}]},
+                },
+                {
+                    "id": "b2",
+                    "type": "paragraph",
+                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": "C"}}]},
+                },
+                {
+                    "id": "b3",
+                    "type": "paragraph",
+                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": "D"}}]},
+                },
+            ],
+            "has_more": False,
+        }
+        self.mock_client.blocks.children.append.return_value = {"results": [{"id": "new"}]}
+
+        result = await update_notion_page(self.mock_client, self.mock_page_id, "A\n\nB2\n\nNew\n\nC")
+
+        self.mock_client.blocks.update.assert_awaited_once()
+        self.assertEqual(self.mock_client.blocks.update.call_args[1]["block_id"], "b1")
+        self.mock_client.blocks.children.append.assert_awaited_once()
+        self.assertEqual(self.mock_client.blocks.children.append.call_args[1]["after"], "b1")
+        self.mock_client.blocks.delete.assert_awaited_once_with(block_id="b3")
+        self.assertEqual(result, ["b0", "b1", "new", "b2"])
+
+    async def test_update_notion_page_inserts_in_front_of_first_block_after_deleted_block(self):
+        self.mock_client.blocks.children.list.return_value = {
+            "results": [
+                {
+                    "id": "b0",
+                    "type": "heading_1",
+                    "heading_1": {"rich_text": [{"type": "text", "text": {"content": "A"}}]},
+                },
+                {
+                    "id": "b1",
+                    "type": "paragraph",
+                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": "B"}}]},
+                },
+            ],
+            "has_more": False,
+        }
+        calls = []
+        self.mock_client.blocks.children.append.side_effect = lambda **kwargs: calls.append(
+            ("append", kwargs.get("after"))
+        ) or {"results": [{"id": "new"}]}
+        self.mock_client.blocks.delete.side_effect = lambda block_id: calls.append(("delete", block_id))
+
+        result = await update_notion_page(self.mock_client, self.mock_page_id, "New\n\nB")
+
+        # The replaced first block anchors the new one, so it is only deleted afterwards and B stays
+        self.assertEqual(calls, [("append", "b0"), ("delete", "b0")])
+        self.assertEqual(result, ["new", "b1"])
+
+    async def test_list_block_tree_lists_nested_blocks(self):
+        children = {
+            "page": [
+                {"id": "table", "type": "table", "table": {"table_width": 1}, "has_children": True},
+                {"id": "sub", "type": "child_page", "child_page": {"title": "Sub"}, "has_children": True},
+            ],
+            "table": [{"id": "row", "type": "table_row", "table_row": {"cells": [[]]}, "has_children": False}],
+        }
+        self.mock_client.blocks.children.list.side_effect = lambda block_id, **kwargs: {
+            "results": children[block_id],
+            "has_more": False,
+        }
+
+        blocks = await list_block_tree(self.mock_client, "page")
+
+        self.assertEqual(blocks[0]["table"]["children"], children["table"])
+        self.assertNotIn("children", blocks[1]["child_page"])
+        listed = [call.kwargs["block_id"] for call in self.mock_client.blocks.children.list.call_args_list]
+        self.assertEqual(listed, ["page", "table"])
+
+    async def test_append_blocks_in_batches_after_anchor(self):
+        self.mock_client.blocks.children.append.side_effect = lambda block_id, children, **kwargs: {
+            "results": [{"id": f"{kwargs.get('after')}+{i}"} for i in range(len(children))]
+        }
+        blocks = ({"type": "divider", "divider": {}} for _ in range(150))
+
+        result = await append_blocks(self.mock_client, self.mock_page_id, blocks, after="anchor")
+
+        calls = self.mock_client.blocks.children.append.call_args_list
+        self.assertEqual([len(call[1]["children"]) for call in calls], [100, 50])
+        self.assertEqual([call[1]["after"] for call in calls], ["anchor", "anchor+99"])
+        self.assertEqual(len(result), 150)
 
-    def test_find_notion_page_with_parent(self):
+    async def test_delete_blocks_concurrently(self):
+        in_flight = 0
+        peak = 0
+
+        async def delete(block_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+
+        self.mock_client.blocks.delete.side_effect = delete
+        block_ids = [f"b{i}" for i in range(250)]
+
+        with patch("builtins.print") as mock_print:
+            await delete_blocks(self.mock_client, block_ids, concurrency=5)
+
+        self.assertEqual(self.mock_client.blocks.delete.await_count, 250)
+        self.assertEqual(peak, 5)
+        mock_print.assert_called_with("Deleted 250/250 blocks")
+
+    async def test_delete_blocks_retries_failures(self):
+        attempts = {}
+
+        async def delete(block_id):
+            attempts[block_id] = attempts.get(block_id, 0) + 1
+            if block_id == "flaky" and attempts[block_id] == 1:
+                raise APIResponseError(httpx.Response(409), "Conflict", APIErrorCode.ConflictError)
+            if block_id == "gone":
+                raise APIResponseError(httpx.Response(404), "Not found", APIErrorCode.ObjectNotFound)
+
+        self.mock_client.blocks.delete.side_effect = delete
+
+        await delete_blocks(self.mock_client, ["ok", "flaky", "gone"])
+
+        self.assertEqual(attempts, {"ok": 1, "flaky": 2, "gone": 1})
+
+    async def test_delete_blocks_gives_up(self):
+        error = APIResponseError(httpx.Response(400), "Invalid", APIErrorCode.ValidationError)
+        self.mock_client.blocks.delete.side_effect = error
+
+        with self.assertRaises(APIResponseError):
+            await delete_blocks(self.mock_client, ["b1", "b2"], rounds=2)
+
+        self.assertEqual(self.mock_client.blocks.delete.await_count, 4)
+
+    async def test_append_blocks_without_blocks(self):
+        self.assertEqual(await append_blocks(self.mock_client, self.mock_page_id, []), [])
+        self.mock_client.blocks.children.append.assert_not_called()
+
+    async def test_find_notion_page_with_parent(self):
         mock_results = [
             {
                 "id": "page1",
@@ -68,7 +293,7 @@ class TestNotion(TestCase):
         self.mock_client.search.return_value = {"results": mock_results}
         parent_id = "parent-id"
 
-        result = find_notion_page(self.mock_client, self.mock_title, parent_id=parent_id)
+        result = await find_notion_page(self.mock_client, self.mock_title, parent_id=parent_id)
 
         self.mock_client.search.assert_called_once()
         search_args = self.mock_client.search.call_args[1]
@@ -76,3 +301,52 @@ class TestNotion(TestCase):
         self.assertEqual(search_args["filter"]["property"], "object")
         self.assertEqual(search_args["filter"]["value"], "page")
         self.assertEqual(result["id"], "page1")
+
+
+class TestRateLimitedClient(IsolatedAsyncioTestCase):
+    def get_client(self, responses: list[httpx.Response], max_retries: int = 5) -> RateLimitedClient:
+        self.requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return responses.pop(0)
+
+        return RateLimitedClient(
+            auth="test-token",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            limiter=TokenBucket(rate=1000),
+            max_retries=max_retries,
+        )
+
+    def rate_limited(self, retry_after: str = "0") -> httpx.Response:
+        return httpx.Response(
+            429, headers={"Retry-After": retry_after}, json={"code": "rate_limited", "message": "Slow down"}
+        )
+
+    async def test_request_retries_after_rate_limit(self):
+        client = self.get_client([self.rate_limited(), httpx.Response(200, json={"id": "page1"})])
+
+        result = await client.pages.retrieve(page_id="page1")
+
+        self.assertEqual(result, {"id": "page1"})
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(client.limiter.rate, 550)
+
+    async def test_request_gives_up_after_max_retries(self):
+        client = self.get_client([self.rate_limited() for _ in range(3)], max_retries=2)
+
+        with self.assertRaises(APIResponseError):
+            await client.pages.retrieve(page_id="page1")
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_request_does_not_retry_client_errors(self):
+        client = self.get_client([httpx.Response(400, json={"code": "validation_error", "message": "Bad"})])
+
+        with self.assertRaises(APIResponseError):
+            await client.pages.retrieve(page_id="page1")
+        self.assertEqual(len(self.requests), 1)
+
+    def test_get_retry_after(self):
+        self.assertEqual(get_retry_after(httpx.Headers({"Retry-After": "2"})), 2.0)
+        self.assertIsNone(get_retry_after(httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})))
+        self.assertIsNone(get_retry_after(httpx.Headers()))
@@ -0,0 +1,106 @@
+from collections import Counter
+from pathlib import Path
+from unittest import TestCase
+
+from nogisync.diff import DELETE, INSERT, KEEP, UPDATE, BlockOperation
+from nogisync.plan import (
+    ARCHIVE,
+    CREATE,
+    UNCHANGED,
+    FilePlan,
+    SyncPlan,
+    count_pages,
+    get_create_requests,
+    get_update_requests,
+)
+
+
+def paragraphs(count: int) -> list[dict]:
+    return [{"type": "paragraph", "paragraph": {"rich_text": []}} for _ in range(count)]
+
+
+class TestPlan(TestCase):
+    def test_count_pages(self):
+        self.assertEqual([count_pages(blocks) for blocks in (0, 1, 100, 101, 250)], [1, 1, 1, 2, 3])
+
+    def test_get_create_requests(self):
+        # The first 100 blocks go along with the page
+        self.assertEqual(get_create_requests(paragraphs(150)), {"pages.create": 1, "blocks.children.append": 1})
+        self.assertEqual(+get_create_requests([]), {"pages.create": 1})
+
+    def test_get_update_requests(self):
+        operations = [
+            BlockOperation(KEEP, "a"),
+            BlockOperation(DELETE, "b"),
+            BlockOperation(DELETE, "c"),
+            BlockOperation(UPDATE, "d", paragraphs(1)),
+            BlockOperation(INSERT, blocks=paragraphs(120)),
+        ]
+
+        requests = get_update_requests(paragraphs(4), operations)
+
+        self.assertEqual(
+            requests,
+            {"blocks.children.list": 1, "blocks.delete": 2, "blocks.update": 1, "blocks.children.append": 2},
+        )
+        self.assertEqual(get_update_requests(paragraphs(201), [])["blocks.children.list"], 3)
+
+    def test_get_update_requests_with_table_rows(self):
+        rows = [{"type": "table_row", "table_row": {"cells": [[]]}} for _ in range(3)]
+        table = {"type": "table", "table": {"table_width": 1}, "has_children": True}
+        remote_blocks = [{**table, "table": {**table["table"], "children": rows}}, *paragraphs(1)]
+        operations = [
+            BlockOperation(
+                UPDATE,
+                "table",
+                children=[
+                    BlockOperation(KEEP, "r0"),
+                    BlockOperation(UPDATE, "r1", rows[:1]),
+                    BlockOperation(DELETE, "r2"),
+                ],
+            ),
+            BlockOperation(KEEP, "p0"),
+        ]
+
+        requests = get_update_requests(remote_blocks, operations)
+
+        # The rows are listed along with the page, and only the changed rows are written
+        self.assertEqual(requests, {"blocks.children.list": 2, "blocks.update": 1, "blocks.delete": 1})
+
+    def test_sync_plan_totals_and_estimate(self):
+        sync_plan = SyncPlan(
+            files=[
+                FilePlan(Path("b.md"), CREATE, get_create_requests(paragraphs(10))),
+                FilePlan(Path("a.md"), UNCHANGED),
+                FilePlan(Path("old.md"), ARCHIVE, Counter({"pages.update": 1})),
+            ],
+            directories=[Path("guides")],
+            shared_requests=Counter({"blocks.children.list": 2, "pages.create": 1}),
+        )
+
+        self.assertEqual(
+            sync_plan.requests,
+            {"blocks.children.list": 2, "pages.create": 2, "pages.update": 1},
+        )
+        self.assertEqual(sync_plan.estimate_seconds(2.5), 2.0)
+
+        lines = sync_plan.to_text(2.5).split("\n")
+        self.assertEqual(
+            lines[:4],
+            [
+                "unchanged  a.md",
+                "create     b.md: 1 pages.create",
+                "archive    old.md: 1 pages.update",
+                "create     guides/ (directory page)",
+            ],
+        )
+        self.assertIn(
+            "Plan: 1 to create, 0 to update, 0 to move, 1 to archive, 1 unchanged, 1 directory pages", lines[4]
+        )
+        self.assertIn("Requests: 5", lines)
+
+        sync_plan.orphans = [Path("Guides/Old")]
+        lines = sync_plan.to_text(2.5).split("\n")
+        self.assertEqual(lines[4], "archive    Guides/Old (orphaned page)")
+        self.assertTrue(lines[5].endswith(", 1 orphaned pages to archive"))
+        self.assertEqual(lines[-1], "Estimated duration: 0:00:02 at 2.5 requests per second")
@@ -0,0 +1,90 @@
+import pstats
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from nogisync.profiling import APPEND, PARSE, PhaseProfile, active_profile, phase, profile_run, timed
+from nogisync.stats import track_file
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.profile = PhaseProfile(clock=self.clock)
+        self.token = active_profile.set(self.profile)
+
+    def tearDown(self):
+        active_profile.reset(self.token)
+
+    def test_nested_phase_is_not_counted_twice(self):
+        with track_file("guide.md"), phase(APPEND):
+            self.clock.now += 1.0
+            with phase(PARSE):
+                self.clock.now += 0.25
+            self.clock.now += 0.5
+
+        self.assertEqual(self.profile.phases[APPEND], 1.5)
+        self.assertEqual(self.profile.phases[PARSE], 0.25)
+        self.assertEqual(self.profile.files, {"guide.md": {APPEND: 1.5, PARSE: 0.25}})
+
+    def test_timed_counts_producing_items(self):
+        def produce():
+            for item in range(3):
+                self.clock.now += 0.5
+                yield item
+
+        with phase(APPEND):
+            for _ in timed(produce(), PARSE):
+                self.clock.now += 1.0
+
+        self.assertEqual(self.profile.phases[PARSE], 1.5)
+        self.assertEqual(self.profile.phases[APPEND], 3.0)
+
+    def test_to_text_names_slowest_files(self):
+        with track_file("slow.md"), phase(APPEND):
+            self.clock.now += 2.0
+        with track_file("fast.md"), phase(PARSE):
+            self.clock.now += 0.5
+
+        text = self.profile.to_text(slowest_files=1)
+
+        self.assertIn("append         2.00s  80.0%", text)
+        self.assertIn("2.00s slow.md (append 2.00s)", text)
+        self.assertNotIn("fast.md", text)
+
+    def test_phase_without_profile(self):
+        active_profile.set(None)
+        with phase(APPEND):
+            self.clock.now += 1.0
+        self.assertEqual(self.profile.phases[APPEND], 0.0)
+
+
+class TestProfileRun(TestCase):
+    def test_disabled(self):
+        with profile_run(False) as profile:
+            self.assertIsNone(profile)
+            self.assertIsNone(active_profile.get())
+
+    def test_writes_pstats(self):
+        with TemporaryDirectory() as tmp_dir:
+            pstats_path = Path(tmp_dir, "out", "sync.pstats")
+            output = StringIO()
+            with redirect_stdout(output), profile_run(False, pstats_path) as profile:
+                self.assertIs(active_profile.get(), profile)
+                with phase(PARSE):
+                    sum(range(1000))
+
+            self.assertIsNone(active_profile.get())
+            self.assertGreater(pstats.Stats(str(pstats_path)).total_calls, 0)
+        self.assertIn("parse", output.getvalue())
+        self.assertIn(f"Wrote cProfile statistics to {pstats_path}", output.getvalue())
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from nogisync.ratelimit import TokenBucket
+
+
+class TestTokenBucket(IsolatedAsyncioTestCase):
+    async def test_acquire_allows_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+
+        waits = [await bucket.acquire() for _ in range(3)]
+
+        self.assertEqual(waits, [0.0, 0.0, 0.0])
+
+    async def test_acquire_paces_requests_to_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        # The first token is already in the bucket, the other four refill at 50 per second.
+        self.assertGreaterEqual(elapsed, 4 / 50 * 0.9)
+
+    async def test_acquire_concurrent_callers_share_the_rate(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, 5 / 100 * 0.9)
+
+    async def test_penalize_halves_rate_and_blocks_for_retry_after(self):
+        bucket = TokenBucket(rate=100, capacity=10)
+
+        bucket.penalize(retry_after=0.05)
+        waited = await bucket.acquire()
+
+        self.assertEqual(bucket.rate, 50)
+        self.assertGreaterEqual(waited, 0.05)
+
+    def test_penalize_does_not_drop_below_min_rate(self):
+        bucket = TokenBucket(rate=8, min_rate=2)
+
+        for _ in range(5):
+            bucket.penalize(retry_after=0)
+
+        self.assertEqual(bucket.rate, 2)
+
+    def test_reward_recovers_rate_up_to_max(self):
+        bucket = TokenBucket(rate=10)
+        bucket.penalize(retry_after=0)
+
+        for _ in range(100):
+            bucket.reward()
+
+        self.assertEqual(bucket.rate, 10)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from benchmarks.fake_notion import FakeNotion
+from nogisync import notion
+from nogisync.stats import LatencyHistogram, RunStats, get_endpoint, track_file
+
+
+class TestStats(TestCase):
+    def test_get_endpoint(self):
+        self.assertEqual(get_endpoint("GET", "blocks/abc/children?page_size=100"), "blocks.children.list")
+        self.assertEqual(get_endpoint("PATCH", "blocks/abc/children"), "blocks.children.append")
+        self.assertEqual(get_endpoint("PATCH", "blocks/abc"), "blocks.update")
+        self.assertEqual(get_endpoint("DELETE", "blocks/abc"), "blocks.delete")
+        self.assertEqual(get_endpoint("POST", "pages"), "pages.create")
+        self.assertEqual(get_endpoint("POST", "pages/abc/move"), "pages.move")
+        self.assertEqual(get_endpoint("POST", "search"), "search")
+        self.assertEqual(get_endpoint("GET", "users"), "other")
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.01] * 90 + [0.3] * 9 + [12.0]:
+            histogram.observe(seconds)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.quantile(0.5), 0.05)
+        self.assertEqual(histogram.quantile(0.95), 0.5)
+        self.assertEqual(histogram.quantile(1.0), 12.0)
+        self.assertEqual(histogram.to_dict()["buckets"]["inf"], 1)
+
+    def test_run_stats_by_endpoint_and_file(self):
+        stats = RunStats()
+        stats.record_request("search", 0.2)
+        with track_file("guide.md"):
+            stats.record_wait("pages.create", 1.5)
+            stats.record_request("pages.create", 0.4, error=True)
+            stats.record_retry("pages.create", rate_limited=True)
+            stats.record_request("pages.create", 0.1)
+
+        self.assertEqual(stats.endpoints["pages.create"].calls, 2)
+        self.assertEqual(stats.endpoints["pages.create"].errors, 1)
+        self.assertEqual(stats.endpoints["pages.create"].rate_limited, 1)
+        self.assertEqual(list(stats.files), ["guide.md"])
+        self.assertEqual(stats.files["guide.md"].rate_limit_wait, 1.5)
+        self.assertEqual(stats.total.calls, 3)
+        self.assertAlmostEqual(stats.total.latency.total, 0.7)
+
+        summary = stats.to_dict()
+        self.assertEqual(summary["total"]["retries"], 1)
+        self.assertEqual(summary["endpoints"]["search"]["calls"], 1)
+
+        markdown = stats.to_markdown()
+        self.assertIn("| pages.create | 2 | 1 | 1 | 1 | 1.5 |", markdown)
+        self.assertIn("| **Total** | 3 |", markdown)
+        self.assertIn("| `guide.md` | 2 | 1 | 0.5 |", markdown)
+
+    def test_write_reports(self):
+        stats = RunStats()
+        stats.record_request("search", 0.2)
+        with TemporaryDirectory() as tmp_dir:
+            json_path = Path(tmp_dir, "out", "stats.json")
+            summary_path = Path(tmp_dir, "summary.md")
+            summary_path.write_text("# Earlier step\n")
+
+            stats.write_json(json_path)
+            stats.append_markdown(summary_path)
+
+            self.assertEqual(json.loads(json_path.read_text())["total"]["calls"], 1)
+            self.assertTrue(summary_path.read_text().startswith("# Earlier step\n## Notion requests"))
+
+
+class TestClientStats(IsolatedAsyncioTestCase):
+    async def test_client_records_requests_and_retries(self):
+        fake = FakeNotion(rate_limit_probability=0.3, seed=3)
+        root_id = fake.add_page("Docs")
+        stats = RunStats()
+        client = notion.get_notion_client("token", rate_limit=1000, transport=fake, stats=stats)
+        client.max_retries = 20
+
+        async def create(number: int) -> None:
+            with track_file(f"page_{number}.md"):
+                await notion.create_notion_page(client, root_id, f"Page {number}", "Text")
+
+        with self.assertLogs(level="WARNING"):
+            await asyncio.gather(*(create(number) for number in range(5)))
+        await client.aclose()
+
+        self.assertEqual(stats.endpoints["pages.create"].calls - stats.endpoints["pages.create"].retries, 5)
+        self.assertEqual(stats.total.calls, fake.total_requests + fake.rate_limited)
+        self.assertEqual(stats.total.rate_limited, fake.rate_limited)
+        self.assertEqual(sorted(stats.files), [f"page_{number}.md" for number in range(5)])
+        self.assertEqual(sum(file.calls for file in stats.files.values()), stats.total.calls)